@@ -0,0 +1,107 @@
+"""Throughput of attribute reads of model instances.
+
+Reads loaded columns, a loaded relationship and a method of many
+:class:`biggr.models.CompartmentalizedComponent` instances, without any requests.
+As a baseline, the same reads are done on instances of a subclass that overrides
+`__getattribute__` like :class:`biggr.models.DeclarativeBase` did before the
+lazy-loading descriptors. Reports the best of several runs, in reads per second.
+
+Usage: `python benchmarks/attributes.py [n_objects] [n_runs]`
+"""
+
+import os
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biggr import models  # noqa: E402
+
+
+class GetattributeComponent(models.CompartmentalizedComponent):
+    """Compartmentalized component with the former `__getattribute__` override,
+    which checks every value read for :class:`biggr.models.PropertyNotLoaded`."""
+
+    def __getattribute__(self, name):
+        val = object.__getattribute__(self, name)
+        if val is models.PropertyNotLoaded:
+            return object.__getattribute__(self, "_load_property")(name)
+        return val
+
+
+def read_columns(objs: List[models.CompartmentalizedComponent]) -> int:
+    for x in objs:
+        x.id
+        x.bigg_id
+        x.component_id
+        x.compartment_id
+    return 4 * len(objs)
+
+
+def read_relationship(objs: List[models.CompartmentalizedComponent]) -> int:
+    for x in objs:
+        x.component
+        x.component
+        x.component
+        x.component
+    return 4 * len(objs)
+
+
+def read_method(objs: List[models.CompartmentalizedComponent]) -> int:
+    for x in objs:
+        x._to_shallow_dict
+    return len(objs)
+
+
+def best_rate(f: Callable[[List], int], objs: List, n_runs: int) -> float:
+    """Get the highest number of reads per second of `f` over `n_runs` runs."""
+    best = 0.0
+    for _ in range(n_runs):
+        t = time.perf_counter()
+        n_reads = f(objs)
+        best = max(best, n_reads / (time.perf_counter() - t))
+    return best
+
+
+def instances(cls: type, n_objects: int) -> List[models.CompartmentalizedComponent]:
+    """Create instances of `cls` with a loaded `component` relationship."""
+    component = models.Component.from_dict({"id": 1, "bigg_id": "m", "charge": 0})
+    objs = [
+        cls.from_dict(
+            {
+                "id": i,
+                "bigg_id": f"m{i}_c",
+                "component_id": 1,
+                "compartment_id": 1,
+                "universal_compartmentalized_component_id": i,
+            }
+        )
+        for i in range(n_objects)
+    ]
+    for x in objs:
+        x.component = component
+    return objs
+
+
+def main(n_objects: int, n_runs: int):
+    models.set_identity_map()
+    objs = instances(models.CompartmentalizedComponent, n_objects)
+    baseline = instances(GetattributeComponent, n_objects)
+    print(f"{'M reads/s':<20} {'__getattribute__':>16} {'descriptors':>12}")
+    for label, f in [
+        ("column reads", read_columns),
+        ("loaded relationship", read_relationship),
+        ("method lookup", read_method),
+    ]:
+        before = best_rate(f, baseline, n_runs) / 1e6
+        after = best_rate(f, objs, n_runs) / 1e6
+        print(f"{label:<20} {before:>16.1f} {after:>12.1f}")
+    models.set_identity_map()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 100_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 7,
+    )
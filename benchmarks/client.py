@@ -0,0 +1,55 @@
+"""Request throughput with and without connection pooling.
+
+Requests single objects from a local server (:mod:`fake_api`) using `requests.post`
+per request, a :class:`biggr.client.Client` without keep-alive and a pooled
+:class:`biggr.client.Client`. The time per request is mostly connection setup for
+the first two, which is larger for the real (HTTPS) API than for a local server.
+
+Usage: `python benchmarks/client.py [n_requests]`
+"""
+
+import os
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+
+from benchmarks.fake_api import FakeAPI  # noqa: E402
+from biggr import client, models, objects  # noqa: E402
+
+
+def throughput(f: Callable[[int], None], n_requests: int) -> float:
+    """Get the number of calls of `f` per second."""
+    t = time.perf_counter()
+    for i in range(n_requests):
+        f(i)
+    return n_requests / (time.perf_counter() - t)
+
+
+def main(n_requests: int):
+    api = FakeAPI()
+    for i in range(n_requests):
+        api.add(models.Compartment, id=i, bigg_id=f"c{i}", name=f"Compartment {i}")
+    api.serve()
+
+    def get_unpooled(i: int):
+        data = {"type": "Compartment", "id": i}
+        requests.post(objects.OBJECTS_API_URL, json=data).json()
+
+    print(f"{'requests.post':<28} {throughput(get_unpooled, n_requests):>8.0f} req/s")
+    for label, c in [
+        ("Client(keep_alive=False)", client.Client(keep_alive=False)),
+        ("Client", client.Client()),
+    ]:
+        client.set_client(c)
+        rate = throughput(lambda i: objects.get_raw("Compartment", i), n_requests)
+        print(f"{label:<28} {rate:>8.0f} req/s")
+        c.close()
+    client.set_client(None)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
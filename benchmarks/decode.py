@@ -0,0 +1,95 @@
+"""Time of parsing and decoding a large API response.
+
+Generates the JSON body of a list of model reactions with embedded reactions (like
+the response to a `Model.model_reactions` request), and measures the time of
+parsing it with `json.loads`, with the parser of the clients (orjson if
+installed) and of decoding the parsed objects into model instances. Reports the
+best of several runs.
+
+Usage: `python benchmarks/decode.py [n_objects] [n_runs]`
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biggr import client, models, objects  # noqa: E402
+
+
+def response_body(n_objects: int, seed: int = 0) -> bytes:
+    """Generate the JSON body of a response with `n_objects` model reactions."""
+    rnd = random.Random(seed)
+    raw = []
+    for i in range(n_objects):
+        participants = sorted(
+            f"m{rnd.randrange(2000)}_{rnd.choice('ce')}" for _ in range(4)
+        )
+        reaction_hash = "/".join(
+            f"{rnd.choice([-2, -1, 0.5, 1, 2])}${x}" for x in participants
+        )
+        raw.append(
+            {
+                "_type": "ModelReaction",
+                "id": i,
+                "bigg_id": f"R{i}",
+                "id_in_original_model": f"R{i}",
+                "reaction_id": i,
+                "reversed": False,
+                "model_id": 1,
+                "copy_number": 1,
+                "objective_coefficient": 0.0,
+                "lower_bound": -1000.0 if i % 2 else 0.0,
+                "upper_bound": 1000.0,
+                "gene_reaction_rule": f"b{rnd.randrange(10000):04d}",
+                "original_gene_reaction_rule": None,
+                "subsystem": None,
+                "reaction": {
+                    "_type": "Reaction",
+                    "id": i,
+                    "bigg_id": f"R{i}",
+                    "hash": reaction_hash,
+                    "collection_id": None,
+                    "copy_number": 1,
+                    "universal_reaction_id": i,
+                },
+            }
+        )
+    return json.dumps({"objects": raw}).encode()
+
+
+def best_time(f: Callable[[], object], n_runs: int) -> float:
+    """Get the lowest time of `f` in seconds over `n_runs` runs, each with a new
+    identity map."""
+    best = float("inf")
+    for _ in range(n_runs):
+        models.set_identity_map()
+        t = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - t)
+    models.set_identity_map()
+    return best
+
+
+def main(n_objects: int, n_runs: int):
+    body = response_body(n_objects)
+    parsed = json.loads(body)
+    parser = "json" if client.orjson is None else "orjson"
+    print(f"{n_objects:,} objects, {len(body) / 2**20:.1f} MiB")
+    for label, f in [
+        ("parse, json.loads", lambda: json.loads(body)),
+        (f"parse, client ({parser})", lambda: client._json_loads(body)),
+        ("decode", lambda: objects._convert_result_to_models(parsed["objects"])),
+    ]:
+        print(f"{label:<24} {best_time(f, n_runs) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 20_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 5,
+    )
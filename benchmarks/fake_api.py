@@ -0,0 +1,145 @@
+"""In-memory stand-in for the BiGGr objects API, served by a local HTTP server.
+
+Used by the benchmarks that measure request patterns, such that they do not depend
+on the network or on the contents of the public database. Rows are added per model
+class using :meth:`FakeAPI.add`, and object requests are answered like the BiGGr
+API does:
+
+- `{"type": "<Class>", "id": ...}` by internal ID or BiGG ID;
+- `{"type": "<Class>", "ids": [...]}` with a list of objects (status 400 if
+  `batch` is False);
+- `{"type": "<Class>.<name>", "id": ...}` for relationships, foreign keys using
+  the `<name>_id` column and list relationships using the foreign keys of the
+  related class that refer to `<Class>`.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from biggr import models, objects
+
+
+class FakeAPI:
+    """Rows of model classes, answering object requests.
+
+    Parameters
+    ----------
+    batch: bool
+        Whether requests for multiple IDs are supported.
+    """
+
+    def __init__(self, batch: bool = True):
+        self.batch = batch
+        self.tables: Dict[type, Dict[int, Dict[str, Any]]] = {}
+        #: Number of requests answered.
+        self.requests = 0
+        self._next_id: Dict[type, int] = {}
+        self._indexes: Dict[Tuple[type, str], Dict[Any, List[Dict[str, Any]]]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, cls: type, **row) -> Dict[str, Any]:
+        """Add a row of `cls`, with the next free ID if `row` has no `id`."""
+        row.setdefault("id", self._next_id.get(cls, 1))
+        self._next_id[cls] = max(self._next_id.get(cls, 1), row["id"] + 1)
+        self.tables.setdefault(cls, {})[row["id"]] = row
+        self._indexes.clear()
+        return row
+
+    def _raw(self, cls: type, row: Optional[Dict[str, Any]]) -> Optional[Any]:
+        return None if row is None else {"_type": cls.__name__, **row}
+
+    def _find(self, cls: type, obj_id: Any) -> Optional[Dict[str, Any]]:
+        table = self.tables.get(cls, {})
+        if isinstance(obj_id, int):
+            return self._raw(cls, table.get(obj_id))
+        index = self._index(cls, "bigg_id")
+        rows = index.get(obj_id)
+        return self._raw(cls, rows[0]) if rows else None
+
+    def _index(self, cls: type, column: str) -> Dict[Any, List[Dict[str, Any]]]:
+        key = (cls, column)
+        index = self._indexes.get(key)
+        if index is None:
+            index = {}
+            for row in self.tables.get(cls, {}).values():
+                index.setdefault(row.get(column), []).append(row)
+            self._indexes[key] = index
+        return index
+
+    def _related(self, cls: type, name: str, obj_id: int) -> Tuple[bool, Any]:
+        """Helper to get relationship `name`, returns whether it is a list too."""
+        target = models._foreign_key_class(cls, name)
+        if target is not None:
+            row = self.tables.get(cls, {}).get(obj_id) or {}
+            fk = row.get(f"{name}_id")
+            return False, None if fk is None else self._find(target, fk)
+        base_type = cls.__attr_base_classes__.get(name)
+        if getattr(base_type, "__origin__", None) is not list:
+            return False, None
+        target = base_type.__args__[0]
+        target = getattr(target, "__forward_arg__", target)
+        if isinstance(target, str):
+            target = objects._get_model_class(target)
+        rows = []
+        for fk, fk_type in target.__attr_base_classes__.items():
+            if fk_type in (cls, cls.__name__) and hasattr(target, f"{fk}_id"):
+                rows.extend(self._index(target, f"{fk}_id").get(obj_id, []))
+        return True, [self._raw(target, x) for x in rows]
+
+    def _answer(self, obj_type: str, obj_id: Any) -> Tuple[bool, Any]:
+        if "." in obj_type:
+            cls_name, name = obj_type.split(".", 1)
+            return self._related(objects._get_model_class(cls_name), name, obj_id)
+        return False, self._find(objects._get_model_class(obj_type), obj_id)
+
+    def handle(self, data: Dict[str, Any]) -> Tuple[int, Any]:
+        """Answer a request, returns the status code and the JSON result."""
+        with self._lock:
+            self.requests += 1
+        if "ids" in data:
+            if not self.batch:
+                return 400, {"detail": "Unknown parameter 'ids'."}
+            return 200, {
+                "objects": [self._answer(data["type"], x)[1] for x in data["ids"]]
+            }
+        is_list, result = self._answer(data["type"], data["id"])
+        if is_list:
+            return 200, {"objects": result}
+        return 200, {"object": result}
+
+    def serve(self) -> str:
+        """Serve the API on a free local port, and use it as the objects API.
+
+        Returns the URL of the API. The server runs in a daemon thread.
+        """
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                n = int(self.headers.get("Content-Length", 0))
+                status, result = api.handle(json.loads(self.rfile.read(n)))
+                body = json.dumps(result).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                if self.headers.get("Connection", "").lower() == "close":
+                    self.send_header("Connection", "close")
+                    self.close_connection = True
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/api/v3/"
+        objects.OBJECTS_API_URL = url + "objects/"
+        objects.IDENTIFIERS_API_URL = url + "identifiers/"
+        return url
@@ -0,0 +1,71 @@
+"""Throughput of the scalar and batch reaction hashing.
+
+Hashes random reactions (2-8 participants each) using
+:meth:`biggr.models.Reaction.generate_hash` per reaction, and using
+:func:`biggr.hashing.reaction_hashes` in the current process and in a process pool.
+The results of all methods are checked to be identical.
+
+Usage: `python benchmarks/hashing.py [n_reactions] [max_workers]`
+"""
+
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biggr import hashing  # noqa: E402
+from biggr.models import Reaction  # noqa: E402
+
+
+def random_participants(
+    n_reactions: int, seed: int = 0
+) -> Tuple[List[int], List[str], List[float]]:
+    """Generate random columnar reaction participants."""
+    rnd = random.Random(seed)
+    met_ids = [f"m{i}_{c}" for i in range(5000) for c in "cep"]
+    coeff_values = [1.0, 2.0, 0.5, 3.0, 1.5, 4.0, 0.25]
+    reaction_index = []
+    participant_ids = []
+    coefficients = []
+    for r in range(n_reactions):
+        for j, met_id in enumerate(rnd.sample(met_ids, rnd.randint(2, 8))):
+            reaction_index.append(r)
+            participant_ids.append(met_id)
+            sign = -1 if j % 2 == 0 else 1
+            coefficients.append(sign * rnd.choice(coeff_values))
+    return reaction_index, participant_ids, coefficients
+
+
+def main(n_reactions: int, max_workers: int):
+    reaction_index, participant_ids, coefficients = random_participants(n_reactions)
+    participants: Dict[int, List[Dict[str, Any]]] = {}
+    for r, p_id, coeff in zip(reaction_index, participant_ids, coefficients):
+        participants.setdefault(r, []).append(
+            {"compartmentalized_component_bigg_id": p_id, "coefficient": coeff}
+        )
+    t = time.perf_counter()
+    expected = {r: Reaction.generate_hash(x) for r, x in participants.items()}
+    print(
+        f"{'scalar':16s} {n_reactions / (time.perf_counter() - t):12,.0f} reactions/s"
+    )
+    # Use the process pool regardless of the input size.
+    hashing.PARALLEL_MIN_PARTICIPANTS = 0
+    for label, workers in (("batch", 1), (f"batch ({max_workers} proc)", max_workers)):
+        t = time.perf_counter()
+        hashes = hashing.reaction_hashes(
+            reaction_index, participant_ids, coefficients, max_workers=workers
+        )
+        elapsed = time.perf_counter() - t
+        if hashes != expected:
+            raise RuntimeError(f"Hashes of {label} differ from the scalar hashes.")
+        print(f"{label:16s} {n_reactions / elapsed:12,.0f} reactions/s")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1,
+    )
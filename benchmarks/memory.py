@@ -0,0 +1,83 @@
+"""Memory used by model instances.
+
+Creates model instances from raw API objects (like the decoder of
+:mod:`biggr.objects` does) and measures the memory they use with tracemalloc,
+after removing them from the identity map. The raw objects are created before
+measuring, such that shared values are not counted.
+
+Usage: `python benchmarks/memory.py [n_objects]`
+"""
+
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from biggr import models, objects  # noqa: E402
+
+
+def raw_objects(cls: type, n: int) -> List[Dict[str, Any]]:
+    """Generate raw API objects of `cls` with the columns the API returns."""
+    if cls is models.ReactionMatrix:
+        columns = {
+            "reaction_id": 1,
+            "universal_reaction_matrix_id": 1,
+            "compartmentalized_component_id": 1,
+        }
+    elif cls is models.CompartmentalizedComponent:
+        columns = {
+            "bigg_id": "m_c",
+            "component_id": 1,
+            "compartment_id": 1,
+            "universal_compartmentalized_component_id": 1,
+        }
+    else:
+        columns = {
+            "bigg_id": "R",
+            "reaction_id": 1,
+            "reversed": False,
+            "model_id": 1,
+            "copy_number": 1,
+            "objective_coefficient": 0.0,
+            "lower_bound": -1000.0,
+            "upper_bound": 1000.0,
+            "gene_reaction_rule": "",
+            "original_gene_reaction_rule": None,
+            "subsystem": None,
+            "id_in_original_model": "R",
+        }
+    return [{"_type": cls.__name__, "id": i, **columns} for i in range(n)]
+
+
+def main(n_objects: int):
+    print(f"Python {sys.version.split()[0]}, {n_objects:,} objects per class")
+    for cls in (
+        models.ReactionMatrix,
+        models.CompartmentalizedComponent,
+        models.ModelReaction,
+    ):
+        raw = raw_objects(cls, n_objects)
+        models.set_identity_map()
+        gc.collect()
+        tracemalloc.start()
+        t = time.perf_counter()
+        objs = objects._convert_result_to_models(raw)
+        elapsed = time.perf_counter() - t
+        models.set_identity_map()
+        gc.collect()
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(
+            f"{cls.__name__:28s} {used / 2**20:7.1f} MiB "
+            f"({used / n_objects:4.0f} B/object), decoded in {elapsed:.2f} s"
+        )
+        del objs, raw
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,127 @@
+"""Requests and time of updating the metabolites of a model.
+
+Updates the metabolites of a cobra model from their matching compartmentalized
+components using :func:`biggr.cobra.update_metabolite` per metabolite and using
+:func:`biggr.cobra.update_metabolites`, with a local server (:mod:`fake_api`). The
+updated annotations of both methods are checked to be identical. Requires cobra.
+
+Usage: `python benchmarks/update_metabolites.py [n_metabolites]`
+"""
+
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cobra  # noqa: E402
+
+from benchmarks.fake_api import FakeAPI  # noqa: E402
+from biggr import cobra as biggr_cobra  # noqa: E402
+from biggr import models, objects  # noqa: E402
+
+
+def fake_components(api: FakeAPI, n_metabolites: int) -> List[int]:
+    """Add components with references and annotations, returns the IDs of their
+    compartmentalized components."""
+    compartment = api.add(models.Compartment, bigg_id="c", name="cytosol")
+    chebi = api.add(models.DataSource, bigg_id="CHEBI", name="ChEBI", url_prefix=None)
+    seed = api.add(
+        models.DataSource, bigg_id="seed.compound", name="SEED", url_prefix=None
+    )
+    cc_ids = []
+    for i in range(n_metabolites):
+        uc = api.add(models.UniversalComponent, bigg_id=f"m{i}", name=f"met {i}")
+        c = api.add(
+            models.Component,
+            bigg_id=f"m{i}",
+            universal_component_id=uc["id"],
+            name=f"met {i}",
+            formula="C6H12O6",
+            charge=0,
+        )
+        inchi = api.add(
+            models.InChI,
+            formula="C6H12O6",
+            key_major="WQZGKKKJIJFFOK",
+            key_minor=f"{i:010d}",
+            key_proton="N",
+        )
+        rc = api.add(
+            models.ReferenceCompound,
+            bigg_id=f"CHEBI:{i}",
+            name=f"met {i}",
+            inchi_id=inchi["id"],
+        )
+        api.add(
+            models.ComponentReferenceMapping,
+            component_id=c["id"],
+            reference_compound_id=rc["id"],
+        )
+        for owner, mapping_cls, column in [
+            (rc, models.ReferenceCompoundAnnotationMapping, "reference_compound_id"),
+            (c, models.ComponentAnnotationMapping, "component_id"),
+        ]:
+            annotation = api.add(models.Annotation, bigg_id=f"{column}{i}")
+            api.add(
+                mapping_cls, **{column: owner["id"]}, annotation_id=annotation["id"]
+            )
+            for ds, identifier in [(chebi, f"CHEBI:{i}"), (seed, f"cpd{i:05d}")]:
+                api.add(
+                    models.AnnotationLink,
+                    identifier=identifier,
+                    data_source_id=ds["id"],
+                    annotation_id=annotation["id"],
+                )
+        ucc = api.add(
+            models.UniversalCompartmentalizedComponent,
+            bigg_id=f"m{i}_c",
+            universal_component_id=uc["id"],
+            compartment_id=compartment["id"],
+        )
+        cc = api.add(
+            models.CompartmentalizedComponent,
+            bigg_id=f"m{i}_c",
+            component_id=c["id"],
+            compartment_id=compartment["id"],
+            universal_compartmentalized_component_id=ucc["id"],
+        )
+        cc_ids.append(cc["id"])
+    return cc_ids
+
+
+def main(n_metabolites: int):
+    api = FakeAPI()
+    cc_ids = fake_components(api, n_metabolites)
+    api.serve()
+    annotations: Dict[str, Dict[int, Dict[str, List[str]]]] = {}
+    for method in ("update_metabolite", "update_metabolites"):
+        model = cobra.Model("iTEST")
+        model.add_metabolites(
+            [cobra.Metabolite(f"x{i}_c", compartment="c") for i in cc_ids]
+        )
+        models.set_identity_map()
+        ccs = objects.get_many(models.CompartmentalizedComponent, cc_ids)
+        matches = dict(zip(model.metabolites, ccs))
+        n_requests = api.requests
+        t = time.perf_counter()
+        if method == "update_metabolite":
+            for metabolite, cc in matches.items():
+                biggr_cobra.update_metabolite(metabolite, cc)
+        else:
+            biggr_cobra.update_metabolites(model, matches)
+        dt = time.perf_counter() - t
+        print(
+            f"{method:<20} {len(matches)} metabolites, "
+            f"{api.requests - n_requests:>6} requests, {dt:.2f} s"
+        )
+        annotations[method] = {
+            i: dict(m.annotation) for i, m in zip(cc_ids, model.metabolites)
+        }
+    assert annotations["update_metabolite"] == annotations["update_metabolites"]
+    models.set_identity_map()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -1 +1,16 @@
 __version__ = "0.1.0"
+
+# Attributes that are imported lazily, such that the version can be read without the
+# dependencies being installed.
+_LAZY_ATTRIBUTES = {
+    "batch": "biggr.models",
+    "Session": "biggr.session",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+
+        return getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,377 @@
+"""Asyncio counterparts of the functions in :mod:`biggr.objects`.
+
+Requires the `httpx` package (the `aio` extra). Objects loaded using this module are
+not lazy-loaded when their relationships are accessed, since that would block the
+event loop. Instead, relationships are loaded explicitly using :func:`load` or
+:meth:`biggr.models.Base.aload`:
+
+>>> model = await aio.get("model", "iML1515")
+>>> taxon = await model.aload("taxon")
+"""
+
+import asyncio
+import contextvars
+import logging
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, List, Optional, Type, Union
+
+import httpx
+
+from biggr import models, objects
+from biggr.cache import ResponseCache
+from biggr.client import BATCH_UNSUPPORTED_STATUS_CODES, _json_loads
+from biggr.identity_map import IdentityMap
+from biggr.objects import (
+    DEFAULT_BATCH_SIZE,
+    _convert_result_to_models,
+    _get_model_class,
+)
+from biggr.session import Session
+
+logger = logging.getLogger(__name__)
+
+#: Default maximum number of concurrent requests per client.
+DEFAULT_CONCURRENCY = 8
+
+
+class AsyncClient:
+    """Asynchronous HTTP client for the BiGGr API.
+
+    Reuses connections from a connection pool and limits the number of concurrent
+    requests.
+
+    Parameters
+    ----------
+    concurrency: int
+        Maximum number of concurrent requests.
+    max_keepalive_connections: int
+        Maximum number of idle connections kept alive.
+    timeout: float
+        Timeout in seconds.
+    identity_map: IdentityMap, optional
+        Identity map to store the loaded objects in. A new unbounded identity map is
+        created if None.
+    cache: ResponseCache, optional
+        Persistent cache to answer repeated requests from, see
+        :class:`biggr.cache.ResponseCache`.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_keepalive_connections: int = DEFAULT_CONCURRENCY,
+        timeout: float = 120.0,
+        identity_map: Optional[IdentityMap] = None,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=concurrency,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+            timeout=timeout,
+        )
+        self.cache = cache
+        #: Session holding the identity map of the objects loaded by this client. It
+        #: makes no requests itself, so it has no (synchronous) client of its own.
+        self.session = Session(
+            client=False, identity_map=identity_map, lazy_loading=False
+        )
+        #: Number of requests made using this client.
+        self.request_count = 0
+        #: Whether the API accepts multiple IDs per object request, see
+        #: :attr:`biggr.client.Client.supports_batch`.
+        self.supports_batch: Optional[bool] = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._in_flight: Dict[Any, asyncio.Future] = {}
+
+    async def request(self, api_url: str, data: Dict[str, Any]) -> Optional[Any]:
+        """Post `data` as JSON to `api_url` and return the JSON result.
+
+        Returns None if the request was not successful. The cache is accessed in a
+        worker thread, since SQLite calls block.
+        """
+        if self.cache is not None:
+            result = await asyncio.to_thread(self.cache.get, api_url, data)
+            if result is not None:
+                return result
+        async with self._semaphore:
+            self.request_count += 1
+            r = await self.http.post(api_url, json=data)
+        if r.status_code != 200:
+            logger.warning("Status code %d for request %s.", r.status_code, data)
+            if "ids" in data and r.status_code in BATCH_UNSUPPORTED_STATUS_CODES:
+                self.supports_batch = False
+            return None
+        result = _json_loads(r.content)
+        if self.cache is not None and result is not None:
+            await asyncio.to_thread(self.cache.set, api_url, data, result)
+        return result
+
+    async def coalesce(self, key: Any, fetch) -> Any:
+        """Await `fetch()`, unless a fetch for `key` is already running."""
+        future = self._in_flight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await fetch()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved if nobody else was waiting.
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    def convert(self, o: Any) -> Any:
+        """Convert a raw API result to models, registering them in the session."""
+        with self.session.activate():
+            return _convert_result_to_models(o)
+
+    async def aclose(self):
+        """Close all pooled connections."""
+        await self.http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+
+_client_var: contextvars.ContextVar[Optional[AsyncClient]] = contextvars.ContextVar(
+    "biggr_aio_client", default=None
+)
+# Default client per event loop, since connections can not be shared between loops.
+_default_clients = weakref.WeakKeyDictionary()
+# Tasks closing the default clients, see _close_on_shutdown.
+_closers = weakref.WeakKeyDictionary()
+
+
+async def _close_on_shutdown(loop: asyncio.AbstractEventLoop, client: AsyncClient):
+    """Helper task that closes the default client of `loop` when cancelled.
+
+    `asyncio.run` cancels all remaining tasks before closing the loop, such that
+    the pooled connections of the default client are closed.
+
+    :noindex:
+    """
+    try:
+        await loop.create_future()
+    finally:
+        if _default_clients.get(loop) is client:
+            del _default_clients[loop]
+            _closers.pop(loop, None)
+            await client.aclose()
+
+
+def get_client() -> AsyncClient:
+    """Get the async client for the current context.
+
+    Returns the client set using :func:`use_client`, or otherwise the default client
+    of the running event loop (created on first use). The default client is closed
+    using :func:`close_default_client`, or when the tasks of the loop are cancelled
+    at shutdown (as done by `asyncio.run`).
+    """
+    client = _client_var.get()
+    if client is not None:
+        return client
+    loop = asyncio.get_running_loop()
+    client = _default_clients.get(loop)
+    if client is None:
+        client = AsyncClient()
+        _default_clients[loop] = client
+        _closers[loop] = loop.create_task(_close_on_shutdown(loop, client))
+    return client
+
+
+async def close_default_client():
+    """Close the default client of the running event loop, if it was created.
+
+    A new default client is created when it is used again.
+    """
+    loop = asyncio.get_running_loop()
+    client = _default_clients.pop(loop, None)
+    closer = _closers.pop(loop, None)
+    if closer is not None:
+        closer.cancel()
+    if client is not None:
+        await client.aclose()
+
+
+@asynccontextmanager
+async def use_client(client: AsyncClient):
+    """Async context manager to use `client` within the current context."""
+    token = _client_var.set(client)
+    try:
+        yield client
+    finally:
+        _client_var.reset(token)
+
+
+async def get_raw(
+    obj_type: Union[str, Type[models.Base]], obj_id: Union[str, int]
+) -> Optional[Any]:
+    """Async version of :func:`biggr.objects.get_raw`."""
+    if not isinstance(obj_type, str):
+        obj_type = obj_type.__name__
+    return await get_client().request(
+        objects.OBJECTS_API_URL, {"type": obj_type, "id": obj_id}
+    )
+
+
+async def get(obj_type: Union[str, Type[models.Base]], obj_id: Union[str, int]):
+    """Async version of :func:`biggr.objects.get`.
+
+    Concurrent calls for the same object are coalesced into a single request.
+    """
+    client = get_client()
+
+    async def _fetch():
+        result = await get_raw(obj_type, obj_id)
+        if result is None:
+            return None
+        if "object" in result:
+            return client.convert(result["object"])
+        return client.convert(result["objects"])
+
+    cls = _get_model_class(obj_type)
+    return await client.coalesce((obj_type if cls is None else cls, obj_id), _fetch)
+
+
+async def _get_raw_single(obj_type: str, obj_id: Union[str, int]) -> Optional[Any]:
+    result = await get_raw(obj_type, obj_id)
+    if result is None:
+        return None
+    if "object" in result:
+        return result["object"]
+    return result.get("objects")
+
+
+async def _get_raw_batch(
+    obj_type: str, obj_ids: List[Union[str, int]]
+) -> Optional[List]:
+    result = await get_client().request(
+        objects.OBJECTS_API_URL, {"type": obj_type, "ids": obj_ids}
+    )
+    if result is None:
+        return None
+    objs = result.get("objects")
+    if not isinstance(objs, list) or len(objs) != len(obj_ids):
+        return None
+    return objs
+
+
+async def get_many_raw(
+    obj_type: Union[str, Type[models.Base]],
+    obj_ids: Iterable[Union[str, int]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> List[Optional[Any]]:
+    """Async version of :func:`biggr.objects.get_many_raw`.
+
+    The number of concurrent requests is limited by the client.
+    """
+    if not isinstance(obj_type, str):
+        obj_type = obj_type.__name__
+    obj_ids = list(obj_ids)
+    if not obj_ids:
+        return []
+    client = get_client()
+    batches = [obj_ids[i : i + batch_size] for i in range(0, len(obj_ids), batch_size)]
+    results = []
+    if client.supports_batch is None:
+        first_result = await _get_raw_batch(obj_type, batches[0])
+        if first_result is not None:
+            client.supports_batch = True
+            results.extend(first_result)
+            batches = batches[1:]
+    if client.supports_batch:
+        batch_results = await asyncio.gather(
+            *(_get_raw_batch(obj_type, x) for x in batches)
+        )
+        for batch, batch_result in zip(batches, batch_results):
+            if batch_result is None:
+                batch_result = [None] * len(batch)
+            results.extend(batch_result)
+        return results
+    return list(await asyncio.gather(*(_get_raw_single(obj_type, x) for x in obj_ids)))
+
+
+async def get_many(
+    obj_type: Union[str, Type[models.Base]],
+    obj_ids: Iterable[Union[str, int]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    refresh: bool = False,
+) -> List[Optional[Any]]:
+    """Async version of :func:`biggr.objects.get_many`."""
+    client = get_client()
+    obj_ids = list(obj_ids)
+    cls = _get_model_class(obj_type)
+    results = [None] * len(obj_ids)
+    positions = {}
+    for i, obj_id in enumerate(obj_ids):
+        if not refresh and cls is not None:
+            cached_object = client.session.identity_map.get((cls, obj_id))
+            if cached_object is not None:
+                results[i] = cached_object
+                continue
+        positions.setdefault(obj_id, []).append(i)
+    fetch_ids = list(positions.keys())
+    raw_results = await get_many_raw(obj_type, fetch_ids, batch_size=batch_size)
+    for obj_id, raw_result in zip(fetch_ids, raw_results):
+        if raw_result is None:
+            continue
+        obj = client.convert(raw_result)
+        for i in positions[obj_id]:
+            results[i] = obj
+    return results
+
+
+async def get_metabolites_by_identifiers(
+    identifiers: Union[str, Iterable], model_bigg_id: Optional[str] = None
+):
+    """Async version of :func:`biggr.objects.get_metabolites_by_identifiers`."""
+    if isinstance(identifiers, str):
+        identifiers = [identifiers]
+    identifiers = list(identifiers)
+    for identifier in identifiers:
+        if not ":" in identifier:
+            raise ValueError("Identifiers should be supplied as '<namespace>:<id>'.")
+    query = {
+        "type": "metabolite",
+        "identifiers": identifiers,
+        "model_bigg_id": model_bigg_id,
+    }
+    client = get_client()
+    result = await client.request(objects.IDENTIFIERS_API_URL, query)
+    return client.convert(result)
+
+
+async def load_many(
+    objs: Iterable[models.Base], name: str, batch_size: int = DEFAULT_BATCH_SIZE
+):
+    """Load relationship `name` for all `objs` using bulk requests.
+
+    Async version of :func:`biggr.models.load_relationship`.
+    """
+    identity_map = get_client().session.identity_map
+    for obj_type, obj_ids, pending in models._relationship_requests(
+        objs, name, identity_map
+    ):
+        vals = dict(
+            zip(obj_ids, await get_many(obj_type, obj_ids, batch_size=batch_size))
+        )
+        for x, idval in pending:
+            setattr(x, name, vals[idval])
+
+
+async def load(obj: models.Base, name: str) -> Any:
+    """Load relationship `name` of `obj` (if not loaded yet) and return it."""
+    await load_many([obj], name)
+    return getattr(obj, name)
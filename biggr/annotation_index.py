@@ -0,0 +1,294 @@
+"""Persistent local inverted index of annotations.
+
+An :class:`AnnotationIndex` maps external identifiers, `(DataSource.bigg_id,
+AnnotationLink.identifier)` pairs such as `("CHEBI", "CHEBI:15422")`, to the
+components, reference compounds and reactions they annotate. The index is stored
+in a SQLite file, which is memory-mapped when opened, such that external
+identifiers are resolved without any API requests:
+
+>>> index = AnnotationIndex("~/.cache/biggr/annotations.sqlite")
+>>> index.add_model("iML1515")
+>>> index.lookup("CHEBI", "CHEBI:15422")
+[AnnotatedObject(type='Component', id=123, bigg_id='atp')]
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Type, Union
+
+from biggr import models, objects
+from biggr.objects import DEFAULT_BATCH_SIZE
+
+#: Classes of which the annotations can be indexed.
+ANNOTATED_CLASSES = (
+    models.Component,
+    models.ReferenceCompound,
+    models.Reaction,
+    models.ReferenceReaction,
+)
+#: Maximum number of bytes of the index file that are memory-mapped.
+MMAP_SIZE = 1 << 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotation_link (
+    namespace TEXT NOT NULL COLLATE NOCASE,
+    identifier TEXT NOT NULL,
+    type TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    bigg_id TEXT NOT NULL,
+    PRIMARY KEY (namespace, identifier, type, id)
+) WITHOUT ROWID;
+"""
+
+
+class AnnotatedObject(NamedTuple):
+    """Object found in an :class:`AnnotationIndex`."""
+
+    #: Class name of the object, e.g. "Component".
+    type: str
+    #: Internal ID of the object.
+    id: int
+    bigg_id: str
+
+
+def _type_name(cls: Union[str, Type[models.Base]]) -> str:
+    """Helper to get the class name of an annotated object type.
+
+    :noindex:
+    """
+    klass = objects._get_model_class(cls)
+    if klass not in ANNOTATED_CLASSES:
+        name = getattr(cls, "__name__", cls)
+        raise ValueError(f"Objects of type {name} do not have annotations.")
+    return klass.__name__
+
+
+class AnnotationIndex:
+    """SQLite-backed inverted index from external identifiers to objects.
+
+    Objects are added using bulk requests by :meth:`add_objects` and
+    :meth:`add_model`. Namespaces (data source BiGG IDs) are matched
+    case-insensitively, identifiers exactly.
+
+    Parameters
+    ----------
+    path: str
+        Path of the SQLite database file. Parent directories are created if needed.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        if (dirname := os.path.dirname(self.path)) and not os.path.isdir(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def add(
+        self,
+        cls: Union[str, Type[models.Base]],
+        bigg_ids: Dict[int, str],
+        annotations: Dict[int, Dict[str, List[str]]],
+    ) -> int:
+        """Add the annotations of objects of type `cls`.
+
+        Parameters
+        ----------
+        cls: str or type
+            Class of the objects.
+        bigg_ids: dict
+            Dictionary mapping the internal IDs of the objects to their BiGG IDs.
+        annotations: dict
+            Dictionary mapping the internal IDs to annotation dictionaries, as
+            returned by :func:`biggr.objects.get_annotations`.
+
+        Returns
+        -------
+        int
+            The number of added `(namespace, identifier, object)` entries.
+        """
+        obj_type = _type_name(cls)
+        rows = [
+            (namespace, identifier, obj_type, obj_id, bigg_ids[obj_id])
+            for obj_id, annotation in annotations.items()
+            if obj_id in bigg_ids
+            for namespace, identifiers in annotation.items()
+            for identifier in identifiers
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO annotation_link "
+                "(namespace, identifier, type, id, bigg_id) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def add_objects(
+        self,
+        cls: Union[str, Type[models.Base]],
+        obj_ids: Iterable[int],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Request the objects of type `cls` and their annotations in bulk, and add
+        them.
+
+        Returns the number of added `(namespace, identifier, object)` entries.
+        """
+        _type_name(cls)
+        raw_objs = objects._get_raw_by_id(cls, obj_ids, batch_size)
+        bigg_ids = {k: v["bigg_id"] for k, v in raw_objs.items() if v is not None}
+        return self.add(
+            cls, bigg_ids, objects.get_annotations(cls, bigg_ids.keys(), batch_size)
+        )
+
+    def add_model(
+        self, model_bigg_id: str, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> int:
+        """Add the annotations of the metabolites and reactions of a model.
+
+        Adds the components of the model metabolites, their reference compounds, and
+        the reactions of the model, using a few bulk requests per level. Returns the
+        number of added `(namespace, identifier, object)` entries.
+        """
+        result = objects.get_raw(models.Model, model_bigg_id)
+        model = None if result is None else result.get("object")
+        if model is None:
+            raise ValueError(f"Model '{model_bigg_id}' not found.")
+        result = objects.get_raw(
+            "Model.model_compartmentalized_components", model["id"]
+        )
+        mccs = [] if result is None else result.get("objects") or []
+        ccs = objects._get_related_raw(
+            mccs,
+            "compartmentalized_component",
+            models.CompartmentalizedComponent,
+            batch_size,
+        )
+        components = objects._get_related_raw(
+            (x for x in ccs.values() if x is not None),
+            "component",
+            models.Component,
+            batch_size,
+        )
+        reference_mappings = objects._get_raw_by_id(
+            "Component.reference_mappings", components.keys(), batch_size
+        )
+        reference_compounds = objects._get_related_raw(
+            (x for maps in reference_mappings.values() for x in maps or []),
+            "reference_compound",
+            models.ReferenceCompound,
+            batch_size,
+        )
+        result = objects.get_raw("Model.model_reactions", model["id"])
+        model_reactions = [] if result is None else result.get("objects") or []
+        reactions = objects._get_related_raw(
+            model_reactions, "reaction", models.Reaction, batch_size
+        )
+        n = 0
+        for cls, raw_objs in (
+            (models.Component, components),
+            (models.ReferenceCompound, reference_compounds),
+            (models.Reaction, reactions),
+        ):
+            bigg_ids = {k: v["bigg_id"] for k, v in raw_objs.items() if v is not None}
+            n += self.add(
+                cls, bigg_ids, objects.get_annotations(cls, bigg_ids.keys(), batch_size)
+            )
+        return n
+
+    def lookup(
+        self,
+        namespace: str,
+        identifier: str,
+        cls: Optional[Union[str, Type[models.Base]]] = None,
+    ) -> List[AnnotatedObject]:
+        """Get the objects annotated with an identifier.
+
+        Parameters
+        ----------
+        namespace: str
+            BiGG ID of the data source, e.g. "CHEBI".
+        identifier: str
+            The identifier, as in :class:`biggr.models.AnnotationLink`.
+        cls: str or type, optional
+            Only get objects of this class.
+
+        Returns
+        -------
+        list of AnnotatedObject
+            The annotated objects, empty if the identifier is not in the index.
+        """
+        query = (
+            "SELECT type, id, bigg_id FROM annotation_link "
+            "WHERE namespace = ? AND identifier = ?"
+        )
+        params = [namespace, identifier]
+        if cls is not None:
+            query += " AND type = ?"
+            params.append(_type_name(cls))
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [AnnotatedObject(*row) for row in rows]
+
+    def resolve(
+        self,
+        identifiers: Iterable[str],
+        cls: Optional[Union[str, Type[models.Base]]] = None,
+    ) -> Dict[str, List[AnnotatedObject]]:
+        """Get the objects annotated with identifiers of the form
+        '<namespace>:<id>'.
+
+        The identifier is looked up both with and without the namespace prefix
+        (e.g. "CHEBI:15422" and "15422" in namespace "CHEBI"), since data sources
+        differ in whether their identifiers include it.
+
+        Parameters
+        ----------
+        identifiers: iterable of str
+            The identifiers, like for
+            :func:`biggr.objects.get_metabolites_by_identifiers`.
+        cls: str or type, optional
+            Only get objects of this class.
+
+        Returns
+        -------
+        dict
+            Dictionary mapping the identifiers to the annotated objects.
+        """
+        result = {}
+        for identifier in identifiers:
+            if ":" not in identifier:
+                raise ValueError(
+                    "Identifiers should be supplied as '<namespace>:<id>'."
+                )
+            namespace, bare_id = identifier.split(":", 1)
+            found = self.lookup(namespace, identifier, cls)
+            found.extend(
+                x for x in self.lookup(namespace, bare_id, cls) if x not in found
+            )
+            result[identifier] = found
+        return result
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM annotation_link"
+            ).fetchone()[0]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
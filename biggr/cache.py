@@ -0,0 +1,279 @@
+"""Persistent on-disk cache for BiGGr API responses."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Union
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS response (
+    key TEXT PRIMARY KEY,
+    api_url TEXT NOT NULL,
+    request TEXT NOT NULL,
+    body TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS response_accessed ON response (accessed);
+CREATE INDEX IF NOT EXISTS response_api_url ON response (api_url);
+"""
+
+#: Number of cache hits after which their access times are written to the database.
+ACCESS_FLUSH_SIZE = 256
+
+
+def _canonical_request(data: Dict[str, Any]) -> str:
+    return json.dumps(data, sort_keys=True, separators=(",", ":"))
+
+
+class ResponseCache:
+    """SQLite-backed cache of API responses.
+
+    Responses are keyed by the API URL and the canonicalized (key-sorted) JSON
+    request body. The cache can be shared between processes, for example by CI jobs
+    or workers that request the same objects.
+
+    Parameters
+    ----------
+    path: str
+        Path of the SQLite database file. Parent directories are created if needed.
+    ttl: float, optional
+        Time in seconds after which cached responses expire. Never expires if None.
+    max_size: int, optional
+        Maximum total size in bytes of the cached response bodies. When exceeded, the
+        least recently used responses are evicted. Unbounded if None.
+
+    The access times used for eviction are updated in bulk, after
+    :data:`ACCESS_FLUSH_SIZE` hits or with the next write, instead of with a write
+    per hit.
+    """
+
+    def __init__(
+        self, path: str, ttl: Optional[float] = None, max_size: Optional[int] = None
+    ):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.max_size = max_size
+        if (dirname := os.path.dirname(self.path)) and not os.path.isdir(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._size = self.size()
+        # Access times of cache hits that are not written yet, by key.
+        self._accessed: Dict[str, float] = {}
+        #: Number of requests answered from the cache.
+        self.hits = 0
+        #: Number of requests not found in the cache.
+        self.misses = 0
+
+    @staticmethod
+    def make_key(api_url: str, data: Dict[str, Any]) -> str:
+        """Get the cache key for a request."""
+        return hashlib.sha256(
+            f"{api_url}\n{_canonical_request(data)}".encode()
+        ).hexdigest()
+
+    def get(self, api_url: str, data: Dict[str, Any]) -> Optional[Any]:
+        """Get the cached response for a request, None if not cached or expired."""
+        key = self.make_key(api_url, data)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, created FROM response WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            body, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM response WHERE key = ?", (key,))
+                self._conn.commit()
+                self._accessed.pop(key, None)
+                self._size -= len(body)
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self._flush_accessed()
+                self._conn.commit()
+            self.hits += 1
+        return json.loads(body)
+
+    def _flush_accessed(self):
+        """Write the pending access times, without committing.
+
+        :noindex:
+        """
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE response SET accessed = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def set(self, api_url: str, data: Dict[str, Any], result: Any):
+        """Store the response `result` for a request."""
+        key = self.make_key(api_url, data)
+        body = json.dumps(result, separators=(",", ":"))
+        now = time.time()
+        with self._lock:
+            self._flush_accessed()
+            self._accessed.pop(key, None)
+            row = self._conn.execute(
+                "SELECT size FROM response WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response "
+                "(key, api_url, request, body, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, api_url, _canonical_request(data), body, len(body), now, now),
+            )
+            self._conn.commit()
+            # A replaced response does not count anymore.
+            self._size += len(body) - (0 if row is None else row[0])
+            if self.max_size is not None and self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Remove least recently used responses until below the size limit."""
+        self._size = self._query_size()
+        if self._size <= self.max_size:
+            return
+        excess = self._size - self.max_size
+        removed = 0
+        keys = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM response ORDER BY accessed"
+        ):
+            keys.append((key,))
+            removed += size
+            if removed >= excess:
+                break
+        self._conn.executemany("DELETE FROM response WHERE key = ?", keys)
+        self._conn.commit()
+        self._size -= removed
+
+    def invalidate(
+        self, api_url: Optional[str] = None, data: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Remove cached responses.
+
+        Parameters
+        ----------
+        api_url: str, optional
+            Only remove responses for this API URL. All responses are removed if both
+            `api_url` and `data` are None.
+        data: dict, optional
+            Only remove the response for this exact request (requires `api_url`).
+
+        Returns
+        -------
+        int
+            The number of removed responses.
+        """
+        with self._lock:
+            if data is not None:
+                if api_url is None:
+                    raise ValueError("An api_url is required to invalidate a request.")
+                cursor = self._conn.execute(
+                    "DELETE FROM response WHERE key = ?",
+                    (self.make_key(api_url, data),),
+                )
+            elif api_url is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM response WHERE api_url = ?", (api_url,)
+                )
+            else:
+                cursor = self._conn.execute("DELETE FROM response")
+            self._conn.commit()
+            self._size = self._query_size()
+            return cursor.rowcount
+
+    def invalidate_objects(
+        self, obj_types: Iterable[str], obj_ids: Iterable[Union[str, int]]
+    ) -> int:
+        """Remove the cached responses of object requests for specific objects.
+
+        Removes the responses of requests with a type in `obj_types` and an ID (or
+        one of the batched IDs) in `obj_ids`.
+
+        Parameters
+        ----------
+        obj_types: iterable of str
+            Request types, e.g. `["Model", "model", "Model.model_reactions"]`.
+        obj_ids: iterable of str or int
+            Internal IDs or BiGG IDs.
+
+        Returns
+        -------
+        int
+            The number of removed responses.
+        """
+        obj_types = list(obj_types)
+        obj_ids = list(obj_ids)
+        if not obj_types or not obj_ids:
+            return 0
+        type_params = ", ".join("?" for _ in obj_types)
+        id_params = ", ".join("?" for _ in obj_ids)
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM response WHERE "
+                f"json_extract(request, '$.type') IN ({type_params}) AND ("
+                f"json_extract(request, '$.id') IN ({id_params}) OR EXISTS ("
+                "SELECT 1 FROM json_each(request, '$.ids') "
+                f"WHERE json_each.value IN ({id_params})))",
+                obj_types + obj_ids + obj_ids,
+            )
+            self._conn.commit()
+            self._size = self._query_size()
+            return cursor.rowcount
+
+    def clear(self):
+        """Remove all cached responses."""
+        self.invalidate()
+
+    def purge_expired(self) -> int:
+        """Remove all expired responses and return the number of removed responses."""
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM response WHERE created < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+            self._size = self._query_size()
+            return cursor.rowcount
+
+    def _query_size(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM response"
+        ).fetchone()[0]
+
+    def size(self) -> int:
+        """Total size in bytes of the cached response bodies."""
+        with self._lock:
+            return self._query_size()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response").fetchone()[0]
+
+    def flush(self):
+        """Write the pending access times of cache hits to the database."""
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+
+    def close(self):
+        """Close the database connection, after writing the pending access times."""
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
@@ -0,0 +1,274 @@
+"""HTTP client used to communicate with the BiGGr API."""
+
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from biggr.cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+#: Default (connect, read) timeout in seconds for API requests.
+DEFAULT_TIMEOUT = (10.0, 120.0)
+
+# Parses JSON response bodies, using the faster `orjson` package if installed.
+_json_loads = json.loads if orjson is None else orjson.loads
+
+#: Status codes of requests for multiple IDs that mean that the API does not support
+#: them (the `ids` parameter is rejected or unknown).
+BATCH_UNSUPPORTED_STATUS_CODES = (400, 404)
+
+#: Size in bytes of the chunks read from streamed responses.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Matches the start of a response with an `objects` list, which can be streamed.
+_OBJECTS_LIST_START = re.compile(rb'\s*\{\s*"objects"\s*:\s*\[')
+
+
+def _result_items(result: Optional[Dict[str, Any]]) -> List[Any]:
+    """Helper to get the raw objects of a (non-streamed) API result.
+
+    :noindex:
+    """
+    if result is None:
+        return []
+    if "object" in result:
+        return [result["object"]]
+    objs = result.get("objects")
+    return [] if objs is None else objs
+
+
+class _ChunkReader:
+    """File-like object reading from an iterator of byte chunks, as used by ijson.
+
+    :noindex:
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+
+    def read(self, size: int = -1) -> bytes:
+        if size == 0:
+            return b""
+        return next(self._chunks, b"")
+
+
+class Client:
+    """Pooled HTTP client for the BiGGr API.
+
+    Owns a `requests.Session` with a connection pool, such that consecutive API
+    requests reuse the same (keep-alive) TCP+TLS connection instead of setting up a
+    new one for every request.
+
+    Parameters
+    ----------
+    pool_connections: int
+        Number of connection pools to cache (one pool per host).
+    pool_maxsize: int
+        Maximum number of connections kept alive per host. Should be at least the
+        number of threads that share this client.
+    timeout: float or tuple of float
+        Timeout in seconds, either a single value or a (connect, read) tuple.
+    keep_alive: bool
+        Keep connections open between requests. Disabling this makes every request
+        set up a new connection.
+    max_retries: int
+        Number of retries for failed connection attempts.
+    cache: ResponseCache, optional
+        Persistent cache to answer repeated requests from, without using the network.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 4,
+        pool_maxsize: int = 16,
+        timeout: Union[float, Tuple[float, float]] = DEFAULT_TIMEOUT,
+        keep_alive: bool = True,
+        max_retries: int = 0,
+        cache: Optional[ResponseCache] = None,
+    ):
+        self.timeout = timeout
+        self.cache = cache
+        self.keep_alive = keep_alive
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=max_retries,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+        #: Number of requests made using this client.
+        self.request_count = 0
+        #: Whether the API accepts multiple IDs per object request. None if this has
+        #: not been determined yet. Set to False by :meth:`request` if a request for
+        #: multiple IDs is rejected (see :data:`BATCH_UNSUPPORTED_STATUS_CODES`).
+        self.supports_batch: Optional[bool] = None
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def post(
+        self, api_url: str, data: Dict[str, Any], stream: bool = False
+    ) -> requests.Response:
+        """Post `data` as JSON to `api_url` and return the response.
+
+        If `stream` is True, the body is not downloaded until it is read.
+        """
+        with self._lock:
+            self.request_count += 1
+        return self.session.post(
+            api_url, json=data, timeout=self.timeout, stream=stream
+        )
+
+    def request(
+        self, api_url: str, data: Dict[str, Any], use_cache: bool = True
+    ) -> Optional[Any]:
+        """Post `data` as JSON to `api_url` and return the JSON result.
+
+        If the client has a response cache, cached responses are returned without
+        making a request (unless `use_cache` is False), and successful responses are
+        stored in the cache. Returns None if the request was not successful.
+        """
+        if self.cache is not None and use_cache:
+            result = self.cache.get(api_url, data)
+            if result is not None:
+                return result
+        r = self.post(api_url, data)
+        if r.status_code != 200:
+            logger.warning("Status code %d for request %s.", r.status_code, data)
+            if "ids" in data and r.status_code in BATCH_UNSUPPORTED_STATUS_CODES:
+                self.supports_batch = False
+            return None
+        result = _json_loads(r.content)
+        if self.cache is not None and result is not None:
+            self.cache.set(api_url, data, result)
+        return result
+
+    def request_iter(
+        self, api_url: str, data: Dict[str, Any], use_cache: bool = True
+    ) -> Iterator[Any]:
+        """Post `data` as JSON to `api_url` and iterate over the resulting objects.
+
+        Yields the raw items of the `objects` list of the JSON result, or the single
+        `object`. If the `ijson` package is installed, the `objects` list is parsed
+        incrementally while the response is downloaded, such that only one item is
+        held in memory at a time. Streamed responses are not stored in the response
+        cache; cached responses are still used (unless `use_cache` is False).
+
+        Without `ijson`, or if the result has another form, the whole response is
+        parsed first, as in :meth:`request`.
+        """
+        if ijson is None:
+            yield from _result_items(self.request(api_url, data, use_cache=use_cache))
+            return
+        if self.cache is not None and use_cache:
+            result = self.cache.get(api_url, data)
+            if result is not None:
+                yield from _result_items(result)
+                return
+        with self.post(api_url, data, stream=True) as r:
+            if r.status_code != 200:
+                logger.warning("Status code %d for request %s.", r.status_code, data)
+                return
+            chunks = (x for x in r.iter_content(STREAM_CHUNK_SIZE) if x)
+            head = b""
+            for chunk in chunks:
+                head += chunk
+                if len(head) >= 64:
+                    break
+            if _OBJECTS_LIST_START.match(head) is None:
+                yield from _result_items(_json_loads(head + b"".join(chunks)))
+                return
+            reader = _ChunkReader(itertools.chain([head], chunks))
+            yield from ijson.items(reader, "objects.item", use_float=True)
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+_default_client: Optional[Client] = None
+_default_lock = threading.Lock()
+_local = threading.local()
+
+
+def _forked(client: Client) -> bool:
+    return getattr(client, "_pid", None) not in (None, os.getpid())
+
+
+def get_client() -> Client:
+    """Get the client used for API requests from the current thread.
+
+    Returns the client set for the current thread using :func:`use_client` or
+    :func:`set_client` with `thread_local=True`, and the process-wide client
+    otherwise. A new process-wide client is created when none exists yet, or when
+    the existing one was created in a parent process (pooled connections can not be
+    shared safely after a fork).
+    """
+    client = getattr(_local, "client", None)
+    if client is not None:
+        return client
+    global _default_client
+    client = _default_client
+    if client is None or _forked(client):
+        with _default_lock:
+            if _default_client is None or _forked(_default_client):
+                _default_client = Client()
+            client = _default_client
+    return client
+
+
+def set_client(client: Optional[Client], thread_local: bool = False):
+    """Set the client used for API requests.
+
+    Parameters
+    ----------
+    client: Client or None
+        The client to use. If None, the thread-specific client is removed or a new
+        process-wide client will be created on the next request.
+    thread_local: bool
+        Only use `client` for requests made from the current thread.
+    """
+    global _default_client
+    if thread_local:
+        _local.client = client
+    else:
+        with _default_lock:
+            _default_client = client
+
+
+@contextmanager
+def use_client(client: Client):
+    """Context manager to temporarily use `client` in the current thread."""
+    prev_client = getattr(_local, "client", None)
+    _local.client = client
+    try:
+        yield client
+    finally:
+        _local.client = prev_client
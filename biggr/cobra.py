@@ -1,107 +1,319 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
 import cobra as cobrapy
 
 from biggr import objects
+from biggr.formula import same_formula, same_inchi_formula
 from biggr.models import (
+    Compartment,
     CompartmentalizedComponent,
     Component,
+    Gene,
+    InChI,
+    Reaction,
     UniversalCompartmentalizedComponent,
     UniversalComponent,
+    UniversalReaction,
 )
+from biggr.reaction_index import ReactionIndex
 
 METABOLITE_ANNOTATION_PRIORITY = ["BiGGr", "BiGG", "CHEBI", "seed.compound"]
+#: Default maximum number of identifiers per request in :func:`find_metabolites`.
+IDENTIFIER_BATCH_SIZE = 500
+
+
+def _annotation_identifiers(
+    metabolite: cobrapy.Metabolite, ann_type: str, cobra_id_namespace: str
+) -> List[str]:
+    """Helper to get the '<namespace>:<id>' identifiers of one annotation type."""
+    ann_ids = []
+    if ann_type in metabolite.annotation:
+        ann_ids.extend(metabolite.annotation[ann_type])
+    if ann_type.upper() == cobra_id_namespace.upper():
+        ann_ids.append(metabolite.id)
+    return [
+        (x if x.upper().startswith(f"{ann_type.upper()}:") else f"{ann_type}:{x}")
+        for x in ann_ids
+    ]
+
+
+def _identifier_key(identifier: str) -> Tuple[str, str]:
+    """Helper to normalize a '<namespace>:<id>' identifier for lookups.
+
+    The namespace is compared case-insensitively, and the identifier with or without
+    the namespace prefix (e.g. "CHEBI:15422" and "CHEBI:CHEBI:15422"), like
+    :meth:`biggr.annotation_index.AnnotationIndex.resolve` does.
+
+    :noindex:
+    """
+    namespace, _, bare_id = identifier.partition(":")
+    namespace = namespace.upper()
+    if bare_id.upper().startswith(f"{namespace}:"):
+        bare_id = bare_id[len(namespace) + 1 :]
+    return namespace, bare_id
+
+
+def _component_inchis(component: Component) -> List[InChI]:
+    """Helper to get the InChIs of the reference compounds of a component.
+
+    :noindex:
+    """
+    inchis = []
+    for mapping in component.reference_mappings or []:
+        compound = mapping.reference_compound
+        if compound is not None and compound.inchi is not None:
+            inchis.append(compound.inchi)
+    return inchis
+
+
+def _same_species(
+    component: Component,
+    metabolite: cobrapy.Metabolite,
+    proton_adjusted: bool = False,
+) -> bool:
+    """Helper to compare the formula and charge of a candidate to `metabolite`.
+
+    The formulas are compared by element counts (see
+    :func:`biggr.formula.same_formula`). Unless `proton_adjusted`, the charges have
+    to be equal as well. If `proton_adjusted` and the component has no formula or
+    charge, the species of the InChIs of its reference compounds are compared
+    instead (see :func:`biggr.formula.same_inchi_formula`). Metabolites with an
+    unknown or non-integer charge do not match in that case.
+
+    :noindex:
+    """
+    if not proton_adjusted:
+        if float(component.charge) != float(metabolite.charge):
+            return False
+        return same_formula(component.formula, metabolite.formula)
+    if metabolite.charge is None:
+        return False
+    if component.formula and component.charge is not None:
+        return same_formula(
+            component.formula, metabolite.formula, component.charge, metabolite.charge
+        )
+    return any(
+        same_inchi_formula(metabolite.formula, metabolite.charge, inchi)
+        for inchi in _component_inchis(component)
+    )
+
+
+def _candidate_components(m: List[Any]) -> Iterable[Component]:
+    """Helper to get the components compared by :func:`_match_candidates`.
+
+    :noindex:
+    """
+    for x in m:
+        if isinstance(x, CompartmentalizedComponent):
+            yield x.component
+        elif isinstance(x, UniversalCompartmentalizedComponent):
+            for cc in x.compartmentalized_components:
+                yield cc.component
+        elif isinstance(x, Component):
+            yield x
+        elif isinstance(x, UniversalComponent):
+            yield from x.components
+
+
+def _match_candidates(
+    metabolite: cobrapy.Metabolite,
+    m: List[Any],
+    default_compartment=None,
+    proton_adjusted: bool = False,
+) -> Tuple[Optional[CompartmentalizedComponent], Optional[str]]:
+    """Helper to select the compartmentalized component matching `metabolite`.
+
+    Returns the match, or None and the reason why no match was selected.
+    """
+    result = []
+
+    # Best case is to match a compartmentalized component.
+    m_sel = [x for x in m if isinstance(x, CompartmentalizedComponent)]
+    for x in m_sel:
+        if not _same_species(x.component, metabolite, proton_adjusted):
+            continue
+        result.append(x)
+    if len(result) == 1:
+        return result[0], None
+    elif len(result) > 1:
+        return None, "multiple compartmentalized components match"
+
+    # Next best case is to match a universal compartmentalized component.
+    m_sel = [x for x in m if isinstance(x, UniversalCompartmentalizedComponent)]
+    for x in m_sel:
+        for cc in x.compartmentalized_components:
+            if not _same_species(cc.component, metabolite, proton_adjusted):
+                continue
+            result.append(cc)
+
+    if len(result) == 1:
+        return result[0], None
+    elif len(result) > 1:
+        return None, "multiple universal compartmentalized components match"
+
+    if default_compartment is None:
+        return None, "no compartmentalized match and no default compartment"
+
+    # If a default compartment is specified, we can use a component.
+    m_sel = [x for x in m if isinstance(x, Component)]
+    for x in m_sel:
+        if not _same_species(x, metabolite, proton_adjusted):
+            continue
+        for cc in x.compartmentalized_components:
+            if cc.compartment.bigg_id == default_compartment:
+                result.append(cc)
+
+    if len(result) == 1:
+        return result[0], None
+    elif len(result) > 1:
+        return None, "multiple components match in the default compartment"
+
+    # If a default compartment is specified, we can use a universal component.
+    m_sel = [x for x in m if isinstance(x, UniversalComponent)]
+    for x in m_sel:
+        for c in x.components:
+            if not _same_species(c, metabolite, proton_adjusted):
+                continue
+            for cc in c.compartmentalized_components:
+                if cc.compartment.bigg_id == default_compartment:
+                    result.append(cc)
+
+    if len(result) == 1:
+        return result[0], None
+    elif len(result) > 1:
+        return None, "multiple universal components match in the default compartment"
+    return None, "no candidate with matching charge and formula"
 
 
 def find_metabolite(
-    metabolite: cobrapy.Metabolite, cobra_id_namespace="BiGGr", default_compartment=None
+    metabolite: cobrapy.Metabolite,
+    cobra_id_namespace="BiGGr",
+    default_compartment=None,
+    proton_adjusted: bool = False,
 ):
     model_bigg_id = model.id if (model := metabolite.model) is not None else None
 
     for ann_type in METABOLITE_ANNOTATION_PRIORITY:
-        ann_ids = []
-        if ann_type in metabolite.annotation:
-            ann_ids.extend(metabolite.annotation[ann_type])
-        if ann_type.upper() == cobra_id_namespace.upper():
-            ann_ids.append(metabolite.id)
+        ann_ids = _annotation_identifiers(metabolite, ann_type, cobra_id_namespace)
         if not ann_ids:
             continue
-        ann_ids = [
-            (x if x.upper().startswith(f"{ann_type.upper()}:") else f"{ann_type}:{x}")
-            for x in ann_ids
-        ]
         m = objects.get_metabolites_by_identifiers(ann_ids, model_bigg_id=model_bigg_id)
-        m = [x for x in m.values() if x is not None]
+        m = [x for x in (m or {}).values() if x is not None]
         if not m:
             continue
-        result = []
+        return _match_candidates(metabolite, m, default_compartment, proton_adjusted)[0]
 
-        # Best case is to match a compartmentalized component.
-        m_sel = [x for x in m if isinstance(x, CompartmentalizedComponent)]
-        for x in m_sel:
-            if float(x.component.charge) != float(metabolite.charge):
-                continue
-            # TODO: Proper formula comparison
-            if x.component.formula != metabolite.formula:
-                continue
-            result.append(x)
-        if len(result) == 1:
-            return result[0]
-        elif len(result) > 1:
-            return None
-
-        # Next best case is to match a universal compartmentalized component.
-        m_sel = [x for x in m if isinstance(x, UniversalCompartmentalizedComponent)]
-        for x in m_sel:
-            for cc in x.compartmentalized_components:
-                if float(cc.component.charge) != float(metabolite.charge):
-                    continue
-                # TODO: Proper formula comparison
-                if cc.component.formula != metabolite.formula:
-                    continue
-                result.append(cc)
 
-        if len(result) == 1:
-            return result[0]
-        elif len(result) > 1:
-            return None
+#: Relationships used by the matching logic, per type of candidate.
+_CANDIDATE_INCLUDES = {
+    CompartmentalizedComponent: ["component"],
+    UniversalCompartmentalizedComponent: ["compartmentalized_components.component"],
+    Component: ["compartmentalized_components.compartment"],
+    UniversalComponent: ["components.compartmentalized_components.compartment"],
+}
 
-        if default_compartment is None:
-            return None
 
-        # If a default compartment is specified, we can use a component.
-        m_sel = [x for x in m if isinstance(x, Component)]
-        for x in m_sel:
-            if float(x.charge) != float(metabolite.charge):
-                continue
-            # TODO: Proper formula comparison
-            if x.formula != metabolite.formula:
-                continue
-            for cc in x.compartmentalized_components:
-                if cc.compartment.bigg_id == default_compartment:
-                    result.append(cc)
+def find_metabolites(
+    model: cobrapy.Model,
+    cobra_id_namespace="BiGGr",
+    default_compartment=None,
+    batch_size: int = IDENTIFIER_BATCH_SIZE,
+    proton_adjusted: bool = False,
+) -> Tuple[
+    Dict[cobrapy.Metabolite, CompartmentalizedComponent],
+    Dict[cobrapy.Metabolite, str],
+]:
+    """Find the matching compartmentalized components for all metabolites of a model.
 
-        if len(result) == 1:
-            return result[0]
-        elif len(result) > 1:
-            return None
-
-        # If a default compartment is specified, we can use a universal component.
-        m_sel = [x for x in m if isinstance(x, UniversalComponent)]
-        for x in m_sel:
-            for c in x.components:
-                if float(c.charge) != float(metabolite.charge):
-                    continue
-                # TODO: Proper formula comparison
-                if c.formula != metabolite.formula:
-                    continue
-                for cc in c.compartmentalized_components:
-                    if cc.compartment.bigg_id == default_compartment:
-                        result.append(cc)
-
-        if len(result) == 1:
-            return result[0]
-        elif len(result) > 1:
-            return None
-        return None
+    Gives the same results as calling :func:`find_metabolite` for every metabolite,
+    but resolves the identifiers of all metabolites using a few bulk requests per
+    annotation type, and loads the relationships needed for matching in bulk.
+
+    Parameters
+    ----------
+    model: cobra.Model
+        The model with the metabolites to find.
+    cobra_id_namespace: str
+        Annotation type that the metabolite IDs belong to.
+    default_compartment: str, optional
+        BiGG ID of the compartment to use for metabolites that only match a
+        component (not a compartmentalized component).
+    batch_size: int
+        Maximum number of identifiers per request.
+    proton_adjusted: bool
+        Whether candidates whose charge and formula differ from the metabolite by
+        (de)protonation match as well (see :func:`biggr.formula.same_formula`).
+        Candidates without formula or charge are compared using the InChIs of
+        their reference compounds, metabolites with an unknown or non-integer
+        charge do not match. By default, the charges have to be equal and the
+        formulas are compared by element counts.
+
+    Returns
+    -------
+    tuple of dict
+        A dictionary mapping metabolites to their matching compartmentalized
+        component, and a dictionary mapping the metabolites without a match to the
+        reason why no match was found.
+    """
+    model_bigg_id = model.id
+    matches = {}
+    failures = {}
+    remaining = list(model.metabolites)
+    for ann_type in METABOLITE_ANNOTATION_PRIORITY:
+        met_ids = {}
+        for metabolite in remaining:
+            ann_ids = _annotation_identifiers(metabolite, ann_type, cobra_id_namespace)
+            if ann_ids:
+                met_ids[metabolite] = list(dict.fromkeys(ann_ids))
+        all_ids = list(dict.fromkeys(x for ids in met_ids.values() for x in ids))
+        # The results are keyed by normalized identifiers, since the API does not
+        # necessarily return the identifiers exactly as requested. Failed requests
+        # (None) give no candidates.
+        found = {}
+        for i in range(0, len(all_ids), batch_size):
+            result = objects.get_metabolites_by_identifiers(
+                all_ids[i : i + batch_size], model_bigg_id=model_bigg_id
+            )
+            for ann_id, x in (result or {}).items():
+                if x is not None:
+                    found.setdefault(_identifier_key(ann_id), x)
+        candidates = {}
+        for metabolite, ann_ids in met_ids.items():
+            keys = dict.fromkeys(_identifier_key(x) for x in ann_ids)
+            m = [x for key in keys if (x := found.get(key)) is not None]
+            if m:
+                candidates[metabolite] = m
+        for cls, include in _CANDIDATE_INCLUDES.items():
+            cls_objs = {
+                id(x): x for m in candidates.values() for x in m if isinstance(x, cls)
+            }
+            if cls_objs:
+                objects.prefetch(list(cls_objs.values()), include)
+        if proton_adjusted:
+            # Components without formula or charge are compared using InChIs.
+            components = {
+                id(x): x
+                for m in candidates.values()
+                for x in _candidate_components(m)
+                if x is not None and not (x.formula and x.charge is not None)
+            }
+            if components:
+                objects.prefetch(
+                    list(components.values()),
+                    ["reference_mappings.reference_compound.inchi"],
+                )
+        for metabolite, m in candidates.items():
+            match, reason = _match_candidates(
+                metabolite, m, default_compartment, proton_adjusted
+            )
+            if match is None:
+                failures[metabolite] = f"{reason} ({ann_type})"
+            else:
+                matches[metabolite] = match
+        remaining = [x for x in remaining if x not in candidates]
+    for metabolite in remaining:
+        failures[metabolite] = "no candidates found for any annotation"
+    return matches, failures
 
 
 def update_metabolite(
@@ -158,3 +370,255 @@ def update_metabolite(
                 metabolite.annotation[namespace] = [identifier]
 
     return metabolite
+
+
+#: Relationships of a compartmentalized component used by :func:`update_metabolite`.
+_UPDATE_INCLUDES = [
+    "universal_compartmentalized_component",
+    "component.reference_mappings.reference_compound.inchi",
+    "component.reference_mappings.reference_compound.annotation_mappings"
+    ".annotation.links.data_source",
+    "component.annotation_mappings.annotation.links.data_source",
+]
+
+
+def update_metabolites(
+    model: cobrapy.Model,
+    matches: Dict[cobrapy.Metabolite, CompartmentalizedComponent],
+) -> List[cobrapy.Metabolite]:
+    """Update multiple metabolites using their matching compartmentalized components.
+
+    Gives the same results as calling :func:`update_metabolite` for every match,
+    but first loads all relationships that are needed to update the annotations,
+    for all matches at once, one level at a time (see
+    :func:`biggr.objects.prefetch`). The annotations are then rewritten without any
+    further API requests.
+
+    Parameters
+    ----------
+    model: cobra.Model
+        The model that contains the metabolites.
+    matches: dict
+        Dictionary mapping metabolites to compartmentalized components, for example
+        as returned by :func:`find_metabolites`.
+
+    Returns
+    -------
+    list of cobra.Metabolite
+        The updated metabolites.
+    """
+    for metabolite in matches.keys():
+        if metabolite.model is not model:
+            raise ValueError(f"Metabolite {metabolite.id} is not part of the model.")
+    ccs = {id(x): x for x in matches.values() if x is not None}
+    objects.prefetch(list(ccs.values()), _UPDATE_INCLUDES)
+    return [
+        update_metabolite(metabolite, cc)
+        for metabolite, cc in matches.items()
+        if cc is not None
+    ]
+
+
+def to_cobra_model(
+    model_bigg_id: str, batch_size: int = objects.DEFAULT_BATCH_SIZE
+) -> cobrapy.Model:
+    """Build a cobrapy model from a BiGGr model.
+
+    All data is requested as raw API objects using a few bulk requests per level
+    (see :func:`biggr.objects.get_model_rows`), without lazy loading: the reactions
+    with their stoichiometry, bounds, objective coefficients and gene-reaction
+    rules, the metabolites with their names, formulas, charges and compartments,
+    the gene names, and the annotations of metabolites and reactions. The
+    metabolites and reactions are then added to the cobrapy model at once.
+
+    Parameters
+    ----------
+    model_bigg_id: str
+        BiGG ID of the model.
+    batch_size: int
+        Maximum number of IDs per request.
+
+    Returns
+    -------
+    cobra.Model
+        The model, with metabolite IDs and reaction IDs as used in the BiGGr model.
+    """
+    model, model_reactions, mccs, participants = objects.get_model_rows(
+        model_bigg_id, batch_size
+    )
+    ccs = objects._get_related_raw(
+        mccs, "compartmentalized_component", CompartmentalizedComponent, batch_size
+    )
+    met_ids = {
+        cc_id: mcc["bigg_id"]
+        for mcc in mccs
+        if (cc_id := mcc["compartmentalized_component_id"]) is not None
+    }
+    extra_ids = [
+        cc_id
+        for x in participants.values()
+        for cc_id, _ in x
+        if cc_id not in met_ids and cc_id not in ccs
+    ]
+    ccs.update(
+        objects._get_raw_by_id(CompartmentalizedComponent, extra_ids, batch_size)
+    )
+    ccs = {k: v for k, v in ccs.items() if v is not None}
+    components = objects._get_related_raw(
+        ccs.values(), "component", Component, batch_size
+    )
+    compartments = objects._get_related_raw(
+        ccs.values(), "compartment", Compartment, batch_size
+    )
+    reactions = objects._get_related_raw(
+        model_reactions, "reaction", Reaction, batch_size
+    )
+    universal_reactions = objects._get_related_raw(
+        (x for x in reactions.values() if x is not None),
+        "universal_reaction",
+        UniversalReaction,
+        batch_size,
+    )
+    result = objects.get_raw("Model.model_genes", model["id"])
+    model_genes = [] if result is None else result.get("objects") or []
+    genes = objects._get_related_raw(model_genes, "gene", Gene, batch_size)
+    component_annotations = objects.get_annotations(
+        Component, components.keys(), batch_size
+    )
+    reaction_annotations = objects.get_annotations(
+        Reaction, reactions.keys(), batch_size
+    )
+
+    cobra_model = cobrapy.Model(model_bigg_id)
+    cobra_model.compartments = {
+        x["bigg_id"]: x.get("name") or x["bigg_id"]
+        for x in compartments.values()
+        if x is not None
+    }
+    metabolites = {}
+    for cc_id, cc in ccs.items():
+        component = components.get(cc.get("component_id")) or {}
+        compartment = compartments.get(cc.get("compartment_id")) or {}
+        annotation = {"BiGGr": [cc["bigg_id"]]}
+        for namespace, identifiers in component_annotations.get(
+            cc.get("component_id"), {}
+        ).items():
+            annotation.setdefault(namespace, []).extend(identifiers)
+        metabolite = cobrapy.Metabolite(
+            met_ids.get(cc_id, cc["bigg_id"]),
+            formula=component.get("formula"),
+            name=component.get("name") or "",
+            charge=component.get("charge"),
+            compartment=compartment.get("bigg_id"),
+        )
+        metabolite.annotation = annotation
+        metabolites[cc_id] = metabolite
+
+    cobra_reactions = []
+    objective = {}
+    for mr in model_reactions:
+        reaction = reactions.get(mr["reaction_id"]) or {}
+        universal_reaction = (
+            universal_reactions.get(reaction.get("universal_reaction_id")) or {}
+        )
+        cobra_reaction = cobrapy.Reaction(
+            mr["bigg_id"],
+            name=universal_reaction.get("name") or "",
+            subsystem=mr.get("subsystem") or "",
+            lower_bound=mr["lower_bound"],
+            upper_bound=mr["upper_bound"],
+        )
+        sign = -1 if mr.get("reversed") else 1
+        stoichiometry = {}
+        for cc_id, coefficient in participants.get(mr["reaction_id"]) or ():
+            metabolite = metabolites.get(cc_id)
+            if metabolite is not None:
+                stoichiometry[metabolite] = (
+                    stoichiometry.get(metabolite, 0) + sign * coefficient
+                )
+        cobra_reaction.add_metabolites(stoichiometry)
+        cobra_reaction.gene_reaction_rule = mr.get("gene_reaction_rule") or ""
+        annotation = {"BiGGr": [reaction["bigg_id"]]} if "bigg_id" in reaction else {}
+        annotation.update(reaction_annotations.get(mr["reaction_id"], {}))
+        cobra_reaction.annotation = annotation
+        if mr.get("objective_coefficient"):
+            objective[cobra_reaction] = mr["objective_coefficient"]
+        cobra_reactions.append(cobra_reaction)
+    # Metabolites are added after building the reactions, since cobrapy copies
+    # metabolites that belong to a model when adding them to a reaction without one.
+    cobra_model.add_metabolites(list(metabolites.values()))
+    cobra_model.add_reactions(cobra_reactions)
+
+    gene_names = {
+        x["bigg_id"]: x.get("name") or "" for x in genes.values() if x is not None
+    }
+    for gene in cobra_model.genes:
+        gene.name = gene_names.get(gene.id, gene.name)
+    if objective:
+        cobra_model.objective = objective
+    return cobra_model
+
+
+def _metabolite_bigg_id(metabolite: cobrapy.Metabolite) -> str:
+    """Helper to get the BiGG ID of the compartmentalized component of a metabolite.
+
+    Uses the BiGGr annotation (see :func:`update_metabolite`), or the metabolite ID
+    if the metabolite has no BiGGr annotation.
+
+    :noindex:
+    """
+    bigg_ids = metabolite.annotation.get("BiGGr")
+    if isinstance(bigg_ids, str):
+        return bigg_ids
+    if bigg_ids:
+        return bigg_ids[0]
+    return metabolite.id
+
+
+def reaction_hash(reaction: cobrapy.Reaction) -> Optional[str]:
+    """Generate the :meth:`biggr.models.Reaction.generate_hash` hash of a reaction.
+
+    The metabolites should be mapped to BiGGr compartmentalized components, see
+    :func:`update_metabolites`. Returns None for reactions without metabolites.
+    """
+    if not reaction.metabolites:
+        return None
+    return Reaction.generate_hash(
+        {
+            "compartmentalized_component_bigg_id": _metabolite_bigg_id(metabolite),
+            "coefficient": coefficient,
+        }
+        for metabolite, coefficient in reaction.metabolites.items()
+    )
+
+
+def find_reactions(
+    reactions: Union[cobrapy.Model, Iterable[cobrapy.Reaction]], index: ReactionIndex
+) -> Dict[cobrapy.Reaction, List[str]]:
+    """Find the BiGGr reactions with the same stoichiometry as cobrapy reactions.
+
+    Looks up the hash of every reaction (see :func:`reaction_hash`) in a local
+    :class:`biggr.reaction_index.ReactionIndex`, without any API requests. The
+    direction of the reactions does not matter.
+
+    Parameters
+    ----------
+    reactions: cobra.Model or iterable of cobra.Reaction
+        The reactions to find, or a model to find all reactions of.
+    index: ReactionIndex
+        Index of the BiGGr reactions, for example filled using
+        :meth:`biggr.reaction_index.ReactionIndex.add_model`.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping the reactions to the BiGG IDs of the matching reactions.
+        Reactions without a match are mapped to an empty list.
+    """
+    if isinstance(reactions, cobrapy.Model):
+        reactions = reactions.reactions
+    result = {}
+    for reaction in reactions:
+        hash_str = reaction_hash(reaction)
+        result[reaction] = [] if hash_str is None else index.lookup(hash_str)
+    return result
@@ -0,0 +1,184 @@
+"""Parsing and comparison of chemical formulas.
+
+Formulas are parsed into normalized element counts, a tuple of `(element, count)`
+pairs sorted by element, such that formulas are compared independent of the order
+of the elements:
+
+>>> formula.parse_formula("H2O")
+(('H', 2), ('O', 1))
+>>> formula.same_formula("C6H12O6", "H12O6C6")
+True
+
+Parsed formulas are cached by string, so comparing the formulas of many candidates
+(see :func:`biggr.cobra.find_metabolites`) only parses every distinct formula once.
+"""
+
+import functools
+import re
+from typing import Dict, Optional, Tuple
+
+from biggr.models import InChI
+
+#: Maximum number of parsed formulas that are cached.
+FORMULA_CACHE_SIZE = 65536
+
+_TOKEN = re.compile(r"([A-Z][a-z]*)(\d*)|(\()|\)(\d*)")
+
+ElementCounts = Tuple[Tuple[str, int], ...]
+
+
+@functools.lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def parse_formula(formula: str) -> Optional[ElementCounts]:
+    """Parse a formula into normalized element counts.
+
+    Supports nested groups with a multiplier, e.g. "Ca(OH)2". Elements with a
+    total count of zero are left out.
+
+    Parameters
+    ----------
+    formula: str
+        The formula, e.g. "C6H12O6".
+
+    Returns
+    -------
+    tuple or None
+        The `(element, count)` pairs sorted by element, or None if the formula can
+        not be parsed (e.g. "(C5H8O4)n").
+    """
+    stack = [{}]
+    pos = 0
+    for m in _TOKEN.finditer(formula):
+        if m.start() != pos:
+            return None
+        pos = m.end()
+        element, count, group_open, group_count = m.groups()
+        if element is not None:
+            counts = stack[-1]
+            counts[element] = counts.get(element, 0) + (int(count) if count else 1)
+        elif group_open is not None:
+            stack.append({})
+        else:
+            if len(stack) == 1:
+                return None
+            group = stack.pop()
+            n = int(group_count) if group_count else 1
+            counts = stack[-1]
+            for element, count in group.items():
+                counts[element] = counts.get(element, 0) + n * count
+    if pos != len(formula) or len(stack) != 1:
+        return None
+    return tuple(sorted((k, v) for k, v in stack[0].items() if v != 0))
+
+
+def _remove_protons(counts: ElementCounts, charge: int) -> ElementCounts:
+    if charge == 0:
+        return counts
+    element_counts: Dict[str, int] = dict(counts)
+    element_counts["H"] = element_counts.get("H", 0) - charge
+    return tuple(sorted((k, v) for k, v in element_counts.items() if v != 0))
+
+
+@functools.lru_cache(maxsize=FORMULA_CACHE_SIZE)
+def _neutral_counts(formula: str, charge: int) -> Optional[ElementCounts]:
+    """Helper to get the element counts with the protons of `charge` removed.
+
+    :noindex:
+    """
+    counts = parse_formula(formula)
+    if counts is None:
+        return None
+    return _remove_protons(counts, charge)
+
+
+def _charge(charge) -> Optional[int]:
+    if charge is None:
+        return None
+    charge = float(charge)
+    return int(charge) if charge.is_integer() else None
+
+
+def same_formula(
+    formula_a: Optional[str],
+    formula_b: Optional[str],
+    charge_a: Optional[float] = None,
+    charge_b: Optional[float] = None,
+) -> bool:
+    """Check whether two formulas have the same element counts.
+
+    If both charges are specified, the formulas are compared proton-adjusted: the
+    difference in charge is assumed to be caused by (de)protonation, so formulas
+    that differ by that number of hydrogens are the same (e.g. "C3H3O3" with charge
+    -1 and "C3H4O3" with charge 0). Non-integer charges do not match in that case.
+
+    Formulas that can not be parsed are compared as strings. Formulas that are None
+    or empty only match each other.
+
+    Parameters
+    ----------
+    formula_a, formula_b: str, optional
+        The formulas to compare.
+    charge_a, charge_b: float, optional
+        Charges belonging to the formulas, for proton-adjusted comparison.
+
+    Returns
+    -------
+    bool
+        Whether the formulas are the same.
+    """
+    if not formula_a or not formula_b:
+        return not formula_a and not formula_b
+    if charge_a is not None and charge_b is not None:
+        charge_a = _charge(charge_a)
+        charge_b = _charge(charge_b)
+        if charge_a is None or charge_b is None:
+            return False
+    if formula_a == formula_b and charge_a == charge_b:
+        return True
+    if charge_a is not None and charge_b is not None:
+        counts_a = _neutral_counts(formula_a, charge_a)
+        counts_b = _neutral_counts(formula_b, charge_b)
+    else:
+        counts_a = parse_formula(formula_a)
+        counts_b = parse_formula(formula_b)
+    if counts_a is None or counts_b is None:
+        return formula_a == formula_b
+    return counts_a == counts_b
+
+
+def inchi_formula(inchi: InChI) -> Tuple[Optional[ElementCounts], int]:
+    """Get the element counts and charge of the species described by an InChI.
+
+    The formula layer of an InChI describes the neutral species, the protons of the
+    /p layer (see :meth:`biggr.models.InChI.n_protons`) are added to the hydrogen
+    count.
+
+    Returns
+    -------
+    tuple
+        The element counts (None if the formula can not be parsed) and the charge
+        (see :meth:`biggr.models.InChI.charge`).
+    """
+    charge = inchi.charge()
+    counts = _neutral_counts(inchi.formula, -inchi.n_protons())
+    return counts, charge
+
+
+def same_inchi_formula(
+    formula: Optional[str], charge: Optional[float], inchi: InChI
+) -> bool:
+    """Check whether a formula and charge match the species of an InChI,
+    proton-adjusted.
+
+    The formula is compared to the formula and charge given by
+    :func:`inchi_formula`, like :func:`same_formula` with both charges specified.
+    Unknown or non-integer charges and formulas that can not be parsed do not
+    match.
+    """
+    charge = _charge(charge)
+    if not formula or charge is None:
+        return False
+    counts = _neutral_counts(formula, charge)
+    inchi_counts, inchi_charge = inchi_formula(inchi)
+    if counts is None or inchi_counts is None:
+        return False
+    return counts == _remove_protons(inchi_counts, inchi_charge)
@@ -0,0 +1,354 @@
+"""Batch computation of reaction hashes from columnar input.
+
+Requires the `numpy` package (the `hashing` extra). The functions in this module give
+the same hashes as :meth:`biggr.models.Reaction.generate_hash`,
+:meth:`biggr.models.UniversalReaction.generate_hash` and
+:meth:`biggr.models.ReferenceReaction.generate_hash`, for many reactions at once.
+The participants of all reactions are given as three aligned columns: the index
+(or ID) of the reaction, the BiGG ID of the participant and the coefficient:
+
+>>> hashing.reaction_hashes(
+...     [0, 0, 1, 1], ["a_c", "b_c", "a_c", "c_c"], [-1.0, 1.0, -2.0, 1.0]
+... )
+{0: '-1$a_c/1$b_c', 1: '-2$a_c/1$c_c'}
+
+The participants are grouped per reaction and sorted by ID for all reactions at
+once using numpy. Large inputs are split over a process pool.
+"""
+
+import hashlib
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from biggr.models import HASH_STR_MAX_LEN, Reaction
+
+#: Minimum number of participants for which the hashes are computed in a process
+#: pool (if more than one worker is allowed).
+PARALLEL_MIN_PARTICIPANTS = 500_000
+
+
+class _CoefficientStrings(dict):
+    """Cache of :meth:`biggr.models.Reaction.coefficient_to_string` results.
+
+    :noindex:
+    """
+
+    def __missing__(self, coefficient):
+        s = f"{Reaction.coefficient_to_string(coefficient)}"
+        self[coefficient] = s
+        return s
+
+
+def _limit_length(hash_str: str) -> str:
+    if len(hash_str) > HASH_STR_MAX_LEN:
+        return hashlib.sha256(hash_str.encode()).hexdigest()
+    return hash_str
+
+
+def _merged(
+    ids: List[str], coeffs: List[Any], lo: int, hi: int, duplicates: bool
+) -> Tuple[List[str], List[Any]]:
+    """Helper to sum the coefficients of duplicate participants of a reaction.
+
+    The coefficients are summed in order, like the dictionaries of the scalar
+    functions.
+
+    :noindex:
+    """
+    if not duplicates:
+        return ids[lo:hi], coeffs[lo:hi]
+    p_ids = []
+    vals = []
+    prev = None
+    for i in range(lo, hi):
+        p_id = ids[i]
+        if p_id == prev:
+            vals[-1] += coeffs[i]
+        else:
+            p_ids.append(p_id)
+            vals.append(0 + coeffs[i])
+            prev = p_id
+    return p_ids, vals
+
+
+def _reaction_chunk(
+    ids: List[str],
+    coeffs: List[Any],
+    bounds: List[int],
+    duplicates: List[bool],
+    pattern: bool,
+) -> List[str]:
+    """Helper to compute :meth:`biggr.models.Reaction.generate_hash` hashes.
+
+    `ids` and `coeffs` are sorted by reaction and ID, `bounds` contains the start of
+    every reaction and the end of the last one, and `duplicates` whether a reaction
+    has duplicate participants.
+
+    :noindex:
+    """
+    cts = _CoefficientStrings()
+    hashes = []
+    for lo, hi, dup in zip(bounds, bounds[1:], duplicates):
+        p_ids, vals = _merged(ids, coeffs, lo, hi, dup)
+        if vals[0] > 0:
+            vals = [-1 * v for v in vals]
+        hashes.append(
+            _limit_length(
+                "/".join([f"{cts[v]}${p_id}" for p_id, v in zip(p_ids, vals)])
+            )
+        )
+    return hashes
+
+
+def _universal_reaction_chunk(
+    ids: List[str],
+    coeffs: List[Any],
+    bounds: List[int],
+    duplicates: List[bool],
+    pattern: bool,
+) -> List[str]:
+    """Helper to compute :meth:`biggr.models.UniversalReaction.generate_hash` hashes.
+
+    :noindex:
+    """
+    cts = _CoefficientStrings()
+    hashes = []
+    for lo, hi, dup in zip(bounds, bounds[1:], duplicates):
+        p_ids = []
+        negs = []
+        poss = []
+        prev = None
+        for i in range(lo, hi):
+            p_id = ids[i]
+            if p_id != prev:
+                p_ids.append(p_id)
+                negs.append(0)
+                poss.append(0)
+                prev = p_id
+            coeff = coeffs[i]
+            if coeff > 0:
+                poss[-1] = poss[-1] + coeff
+            else:
+                negs[-1] = negs[-1] - coeff
+        if poss[0] > negs[0]:
+            negs, poss = poss, negs
+        hashes.append(
+            _limit_length(
+                "/".join(
+                    [
+                        f"-{cts[neg]}+{cts[pos]}${p_id}"
+                        for p_id, neg, pos in zip(p_ids, negs, poss)
+                    ]
+                )
+            )
+        )
+    return hashes
+
+
+def _reference_coefficient(coefficient: Any) -> float:
+    coefficient = str(coefficient).lower()
+    if "n" in coefficient:
+        return math.inf
+    try:
+        return abs(float(coefficient))
+    except ValueError:
+        return math.inf
+
+
+def _reference_reaction_chunk(
+    ids: List[str],
+    coeffs: List[Any],
+    bounds: List[int],
+    duplicates: List[bool],
+    pattern: bool,
+) -> List[str]:
+    """Helper to compute :meth:`biggr.models.ReferenceReaction.generate_hash` hashes.
+
+    :noindex:
+    """
+    cts = _CoefficientStrings()
+    values = {}
+    coeffs = [
+        values[x] if x in values else values.setdefault(x, _reference_coefficient(x))
+        for x in coeffs
+    ]
+    fmt = "(({})|N)\\${}" if pattern else "{}${}"
+    hashes = []
+    for lo, hi, dup in zip(bounds, bounds[1:], duplicates):
+        p_ids, vals = _merged(ids, coeffs, lo, hi, dup)
+        hash_str = "/".join([fmt.format(cts[v], p_id) for p_id, v in zip(p_ids, vals)])
+        hashes.append(f"^{hash_str}$" if pattern else hash_str)
+    return hashes
+
+
+def _sort_participants(
+    reaction_index: Sequence[Any],
+    participant_ids: Sequence[str],
+    coefficients: Sequence[Any],
+) -> Tuple[List[Any], List[str], List[Any], List[int], List[bool]]:
+    """Helper to sort the participants by reaction and ID.
+
+    The sort is stable, such that duplicate participants of a reaction keep their
+    order. Returns the distinct reactions (sorted), the sorted IDs and coefficients,
+    the start of every reaction plus the end of the last one, and whether every
+    reaction has duplicate participants.
+
+    :noindex:
+    """
+    if not len(reaction_index) == len(participant_ids) == len(coefficients):
+        raise ValueError("The input columns should have the same length.")
+    reactions, reaction_codes = np.unique(
+        np.asarray(reaction_index), return_inverse=True
+    )
+    reaction_codes = reaction_codes.ravel()
+    # Participant IDs are ranked using a dictionary, which is a lot faster than
+    # sorting all (repeated) strings.
+    unique_ids = sorted(set(participant_ids))
+    ranks = {p_id: i for i, p_id in enumerate(unique_ids)}
+    id_codes = np.fromiter(
+        map(ranks.__getitem__, participant_ids),
+        dtype=np.int64,
+        count=len(participant_ids),
+    )
+    key = reaction_codes.astype(np.int64) * max(len(unique_ids), 1) + id_codes
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    sorted_reactions = reaction_codes[order]
+    starts = np.flatnonzero(np.diff(sorted_reactions)) + 1
+    bounds = [0, *starts.tolist(), len(order)] if len(order) else [0]
+    duplicates = np.zeros(len(reactions), dtype=bool)
+    duplicates[sorted_reactions[1:][key[1:] == key[:-1]]] = True
+    ids = [unique_ids[i] for i in id_codes[order].tolist()]
+    if not isinstance(coefficients, list):
+        # Converts numpy scalars to python numbers, as expected by
+        # Reaction.coefficient_to_string.
+        coefficients = np.asarray(coefficients).tolist()
+    coeffs = list(map(coefficients.__getitem__, order.tolist()))
+    return reactions.tolist(), ids, coeffs, bounds, duplicates.tolist()
+
+
+def _batch_hashes(
+    chunk_f: Callable,
+    reaction_index: Sequence[Any],
+    participant_ids: Sequence[str],
+    coefficients: Sequence[Any],
+    pattern: bool = False,
+    max_workers: Optional[int] = None,
+) -> Dict[Any, str]:
+    """Helper to sort the input once and compute the hashes using `chunk_f`.
+
+    :noindex:
+    """
+    reactions, ids, coeffs, bounds, duplicates = _sort_participants(
+        reaction_index, participant_ids, coefficients
+    )
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if max_workers <= 1 or len(ids) < PARALLEL_MIN_PARTICIPANTS:
+        return dict(zip(reactions, chunk_f(ids, coeffs, bounds, duplicates, pattern)))
+    n_chunks = max_workers * 4
+    step = -(-len(reactions) // n_chunks)
+    chunks = []
+    for k in range(0, len(reactions), step):
+        chunk_bounds = bounds[k : k + step + 1]
+        lo, hi = chunk_bounds[0], chunk_bounds[-1]
+        chunks.append(
+            (
+                ids[lo:hi],
+                coeffs[lo:hi],
+                [x - lo for x in chunk_bounds],
+                duplicates[k : k + step],
+                pattern,
+            )
+        )
+    hashes = []
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(chunks))) as executor:
+        for chunk_hashes in executor.map(chunk_f, *zip(*chunks)):
+            hashes.extend(chunk_hashes)
+    return dict(zip(reactions, hashes))
+
+
+def reaction_hashes(
+    reaction_index: Sequence[Any],
+    participant_ids: Sequence[str],
+    coefficients: Sequence[Any],
+    max_workers: Optional[int] = None,
+) -> Dict[Any, str]:
+    """Compute :meth:`biggr.models.Reaction.generate_hash` for many reactions.
+
+    Parameters
+    ----------
+    reaction_index: array-like
+        Index or ID of the reaction of every participant.
+    participant_ids: array-like of str
+        BiGG IDs of the compartmentalized components.
+    coefficients: array-like of int or float
+        Stoichiometric coefficients.
+    max_workers: int, optional
+        Maximum number of worker processes, used for inputs with at least
+        :data:`PARALLEL_MIN_PARTICIPANTS` participants. Defaults to the number of
+        CPUs, use 1 to always compute the hashes in the current process.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping the reactions (sorted by index) to their hash.
+    """
+    return _batch_hashes(
+        _reaction_chunk,
+        reaction_index,
+        participant_ids,
+        coefficients,
+        max_workers=max_workers,
+    )
+
+
+def universal_reaction_hashes(
+    reaction_index: Sequence[Any],
+    participant_ids: Sequence[str],
+    coefficients: Sequence[Any],
+    max_workers: Optional[int] = None,
+) -> Dict[Any, str]:
+    """Compute :meth:`biggr.models.UniversalReaction.generate_hash` for many
+    reactions.
+
+    Takes the same arguments as :func:`reaction_hashes`, with the BiGG IDs of the
+    universal compartmentalized components as `participant_ids`.
+    """
+    return _batch_hashes(
+        _universal_reaction_chunk,
+        reaction_index,
+        participant_ids,
+        coefficients,
+        max_workers=max_workers,
+    )
+
+
+def reference_reaction_hashes(
+    reaction_index: Sequence[Any],
+    participant_ids: Sequence[str],
+    coefficients: Sequence[Any],
+    pattern: bool = False,
+    max_workers: Optional[int] = None,
+) -> Dict[Any, str]:
+    """Compute :meth:`biggr.models.ReferenceReaction.generate_hash` for many
+    reactions.
+
+    Takes the same arguments as :func:`reaction_hashes`, with the BiGG IDs of the
+    reference compounds as `participant_ids`. Coefficients are interpreted like the
+    coefficients of participant dictionaries (e.g. "n" or "2n" for polymers). If
+    `pattern` is True, the regular expression patterns are returned instead.
+    """
+    return _batch_hashes(
+        _reference_reaction_chunk,
+        reaction_index,
+        participant_ids,
+        coefficients,
+        pattern=pattern,
+        max_workers=max_workers,
+    )
+
@@ -0,0 +1,238 @@
+"""Identity maps to keep track of the objects loaded from the BiGGr API.
+
+The identity map ensures that every database entity is represented by at most one
+python object, and is used to avoid repeated API requests for the same entity. Keys
+are `(class, internal ID)` tuples.
+"""
+
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterator, Optional
+
+
+class IdentityMap:
+    """Unbounded identity map, keeps all objects alive (default policy).
+
+    Supports the basic `dict` operations, and keeps track of the number of hits,
+    misses and evictions of :meth:`get` lookups.
+    """
+
+    def __init__(self):
+        self._data: Dict[Hashable, Any] = {}
+        #: Number of lookups that found an object.
+        self.hits = 0
+        #: Number of lookups that did not find an object.
+        self.misses = 0
+        #: Number of objects removed by the policy of the identity map.
+        self.evictions = 0
+        # Guards the counters, which are updated from multiple threads.
+        self._lock = threading.RLock()
+
+    def _count_lookup(self, obj: Any) -> bool:
+        """Helper to count a lookup as a hit or a miss, returns whether it is a hit.
+
+        :noindex:
+        """
+        with self._lock:
+            if obj is None:
+                self.misses += 1
+                return False
+            self.hits += 1
+            return True
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        obj = self._data.get(key)
+        return obj if self._count_lookup(obj) else default
+
+    def __getitem__(self, key: Hashable) -> Any:
+        obj = self.get(key)
+        if obj is None:
+            raise KeyError(key)
+        return obj
+
+    def __setitem__(self, key: Hashable, obj: Any):
+        self._data[key] = obj
+
+    def __delitem__(self, key: Hashable):
+        del self._data[key]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._data.keys()))
+
+    def items(self):
+        return list(self._data.items())
+
+    def discard(self, key: Hashable):
+        """Remove `key` if present."""
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Get the number of hits, misses, evictions and the current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self),
+        }
+
+
+class WeakIdentityMap(IdentityMap):
+    """Identity map that only holds weak references to the objects.
+
+    Objects are dropped from the identity map as soon as they are not referenced
+    anymore; every dropped object is counted as an eviction.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self_ref = weakref.ref(self)
+
+        def _remove(ref, self_ref=self_ref):
+            identity_map = self_ref()
+            if identity_map is None:
+                return
+            key = ref.key
+            with identity_map._lock:
+                if identity_map._data.get(key) is ref:
+                    del identity_map._data[key]
+                    identity_map.evictions += 1
+
+        self._remove = _remove
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        ref = self._data.get(key)
+        obj = None if ref is None else ref()
+        return obj if self._count_lookup(obj) else default
+
+    def __setitem__(self, key: Hashable, obj: Any):
+        ref = weakref.KeyedRef(obj, self._remove, key)
+        self._data[key] = ref
+
+    def __contains__(self, key: Hashable) -> bool:
+        ref = self._data.get(key)
+        return ref is not None and ref() is not None
+
+    def items(self):
+        return [
+            (k, obj)
+            for k, ref in list(self._data.items())
+            if (obj := ref()) is not None
+        ]
+
+
+class LRUIdentityMap(IdentityMap):
+    """Bounded identity map that removes the least recently used objects.
+
+    All operations are guarded by a lock, since lookups also update the order.
+
+    Parameters
+    ----------
+    max_size: int, optional
+        Maximum total number of objects. Unbounded if None.
+    class_quotas: dict, optional
+        Maximum number of objects per class, as a dictionary mapping classes to
+        quota. Classes that are not in the dictionary are only limited by
+        `max_size`.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        class_quotas: Optional[Dict[type, int]] = None,
+    ):
+        super().__init__()
+        self.max_size = max_size
+        self.class_quotas = {} if class_quotas is None else dict(class_quotas)
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._class_keys: Dict[type, "OrderedDict[Hashable, None]"] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            obj = self._data.get(key)
+            if obj is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            if (class_keys := self._class_keys.get(self._key_class(key))) is not None:
+                class_keys.move_to_end(key)
+            return obj
+
+    @staticmethod
+    def _key_class(key: Hashable) -> Optional[type]:
+        return key[0] if isinstance(key, tuple) else None
+
+    def __setitem__(self, key: Hashable, obj: Any):
+        with self._lock:
+            self._data[key] = obj
+            self._data.move_to_end(key)
+            cls = self._key_class(key)
+            if (quota := self.class_quotas.get(cls)) is not None:
+                class_keys = self._class_keys.setdefault(cls, OrderedDict())
+                class_keys[key] = None
+                class_keys.move_to_end(key)
+                while len(class_keys) > quota:
+                    old_key, _ = class_keys.popitem(last=False)
+                    del self._data[old_key]
+                    self.evictions += 1
+            if self.max_size is not None:
+                while len(self._data) > self.max_size:
+                    old_key, _ = self._data.popitem(last=False)
+                    self._discard_class_key(old_key)
+                    self.evictions += 1
+
+    def _discard_class_key(self, key: Hashable):
+        if (class_keys := self._class_keys.get(self._key_class(key))) is not None:
+            class_keys.pop(key, None)
+
+    def __delitem__(self, key: Hashable):
+        with self._lock:
+            del self._data[key]
+            self._discard_class_key(key)
+
+    def discard(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+            self._discard_class_key(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._class_keys.clear()
+
+
+#: Available identity map policies by name.
+POLICIES = {
+    "unbounded": IdentityMap,
+    "weak": WeakIdentityMap,
+    "lru": LRUIdentityMap,
+}
+
+
+def create_identity_map(policy: str = "unbounded", **kwargs) -> IdentityMap:
+    """Create an identity map using the policy named `policy`.
+
+    Parameters
+    ----------
+    policy: str
+        One of "unbounded", "weak" or "lru".
+    kwargs
+        Passed to the identity map class, e.g. `max_size` and `class_quotas` for the
+        "lru" policy.
+    """
+    if policy not in POLICIES:
+        raise ValueError(
+            f"Unknown identity map policy '{policy}', use one of: "
+            + ", ".join(POLICIES)
+        )
+    return POLICIES[policy](**kwargs)
@@ -0,0 +1,121 @@
+"""Stoichiometric matrices of BiGGr models as SciPy sparse arrays.
+
+Requires the `numpy` and `scipy` packages (the `matrix` extra). The rows needed for a
+stoichiometric matrix are requested in bulk as raw API objects, without creating any
+:mod:`biggr.models` objects (or cobrapy objects):
+
+>>> stoich = matrix.build_stoichiometry("iML1515")
+>>> stoich.S.shape
+(1877, 2712)
+"""
+
+from typing import Dict, NamedTuple, Union
+
+import numpy as np
+import scipy.sparse
+
+from biggr import models, objects
+from biggr.objects import DEFAULT_BATCH_SIZE
+
+
+class Stoichiometry(NamedTuple):
+    """Stoichiometric matrix and flux bounds of a model.
+
+    Rows of `S` correspond to `metabolite_ids`, columns to `reaction_ids`, and the
+    bound and objective arrays are aligned with the columns.
+    """
+
+    #: Sparse stoichiometric matrix (metabolites x reactions).
+    S: Union[scipy.sparse.csr_array, scipy.sparse.csc_array]
+    #: BiGG IDs of the metabolites (model compartmentalized components).
+    metabolite_ids: np.ndarray
+    #: BiGG IDs of the model reactions.
+    reaction_ids: np.ndarray
+    lower_bound: np.ndarray
+    upper_bound: np.ndarray
+    objective_coefficient: np.ndarray
+
+
+def build_stoichiometry(
+    model_bigg_id: str,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    sparse_format: str = "csc",
+) -> Stoichiometry:
+    """Build the sparse stoichiometric matrix of a model.
+
+    Requests the model reactions, the reaction matrices and their coefficients
+    using a few bulk requests per level (see :func:`biggr.objects.get_model_rows`).
+    Coefficients of reversed model reactions are negated, and duplicate entries are
+    summed.
+
+    Parameters
+    ----------
+    model_bigg_id: str
+        BiGG ID of the model.
+    batch_size: int
+        Maximum number of IDs per request.
+    sparse_format: str
+        Format of the sparse array, "csc" (default) or "csr".
+
+    Returns
+    -------
+    Stoichiometry
+        The sparse matrix, the row and column IDs, and the bounds and objective
+        coefficients of the reactions.
+    """
+    if sparse_format not in ("csc", "csr"):
+        raise ValueError(f"Unknown sparse format '{sparse_format}', use csc or csr.")
+    _, model_reactions, mccs, participants = objects.get_model_rows(
+        model_bigg_id, batch_size
+    )
+
+    rows: Dict[int, int] = {}
+    metabolite_ids = []
+    for mcc in mccs:
+        cc_id = mcc["compartmentalized_component_id"]
+        if cc_id not in rows:
+            rows[cc_id] = len(metabolite_ids)
+            metabolite_ids.append(mcc["bigg_id"])
+    # Participants that are not part of the model are identified by the BiGG ID
+    # of their compartmentalized component.
+    extra_ids = {
+        cc_id for x in participants.values() for cc_id, _ in x if cc_id not in rows
+    }
+    if extra_ids:
+        ccs = objects._get_raw_by_id(
+            models.CompartmentalizedComponent, extra_ids, batch_size
+        )
+        for cc_id in sorted(extra_ids):
+            rows[cc_id] = len(metabolite_ids)
+            cc = ccs.get(cc_id)
+            metabolite_ids.append(str(cc_id) if cc is None else cc["bigg_id"])
+
+    row_idx = []
+    col_idx = []
+    data = []
+    for j, mr in enumerate(model_reactions):
+        sign = -1.0 if mr.get("reversed") else 1.0
+        for cc_id, coefficient in participants.get(mr["reaction_id"]) or ():
+            row_idx.append(rows[cc_id])
+            col_idx.append(j)
+            data.append(sign * coefficient)
+    S = scipy.sparse.coo_array(
+        (
+            np.array(data, dtype=float),
+            (np.array(row_idx, dtype=np.int64), np.array(col_idx, dtype=np.int64)),
+        ),
+        shape=(len(metabolite_ids), len(model_reactions)),
+    ).asformat(sparse_format)
+    S.sum_duplicates()
+
+    def _column(name: str) -> np.ndarray:
+        return np.array([x.get(name) for x in model_reactions], dtype=float)
+
+    return Stoichiometry(
+        S=S,
+        metabolite_ids=np.array(metabolite_ids, dtype=object),
+        reaction_ids=np.array([x["bigg_id"] for x in model_reactions], dtype=object),
+        lower_bound=_column("lower_bound"),
+        upper_bound=_column("upper_bound"),
+        objective_coefficient=_column("objective_coefficient"),
+    )
@@ -2,30 +2,43 @@
 
 import datetime
 import math
+import sys
+import threading
+from contextlib import contextmanager
 from operator import itemgetter
 from typing import (
     Annotated,
     Any,
     Dict,
     Generic,
+    Iterable,
     List,
     Optional,
+    Tuple,
     Type,
     TypeAlias,
     TypeVar,
     Union,
     no_type_check,
 )
-from biggr import objects
+from biggr.identity_map import IdentityMap, create_identity_map
+from biggr.session import DefaultSession, get_session, set_default_session, use_session
 
-OBJECT_CACHE = {}
+#: Identity map of all objects loaded by the default session, keyed by
+#: (class, internal ID).
+OBJECT_CACHE: IdentityMap = IdentityMap()
+#: Whether the default session loads relationships automatically when accessed.
 LAZY_LOADING = True
+set_default_session(DefaultSession(sys.modules[__name__]))
 
 T = TypeVar("T", bound=Any)
 
+_batch_state = threading.local()
+
 
 class Mapped(Generic[T]):
     """Makes it easier to reuse cobradb/sqlalchemy code."""
+
     pass
 
 
@@ -41,6 +54,12 @@ class ORMDummy:
             self.name = kwargs["name"]
 
 
+class RelationshipInfo(ORMDummy):
+    """Arguments of a relationship, collected in `__relationships__`."""
+
+    pass
+
+
 ForeignKey = ORMDummy
 UniqueConstraint = ORMDummy
 Enum = ORMDummy
@@ -60,7 +79,7 @@ def hybrid_property(f):
 
 
 mapped_column = dummy_col_f
-relationship = dummy_col_f
+relationship = RelationshipInfo
 String = dummy_f
 DateTime = dummy_f
 
@@ -109,6 +128,242 @@ COMPOUND_TYPE_TO_SBO = {
     "polymer": "SBO:0000248",
 }
 
+
+_UNRESOLVED = object()
+
+
+class LazyAttribute:
+    """Descriptor of a mapped attribute that is loaded when it is not set yet.
+
+    Generated by :class:`DeclarativeMeta` for every mapped attribute, and collected
+    in the `__lazy_attributes__` dictionary of the class. Values are stored in the
+    instance `__dict__`, which takes precedence over this (non-data) descriptor,
+    such that reading a set attribute is a plain attribute lookup. Only attributes
+    that are not set yet are loaded, see :meth:`DeclarativeBase._load_property`.
+    Returns :class:`PropertyNotLoaded` when accessed on the class.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.idname = f"{name}_id"
+        self.owner = None
+        self._foreign_key_class = _UNRESOLVED
+
+    def __set_name__(self, owner: type, name: str):
+        self.owner = owner
+
+    def foreign_key_class(self) -> Optional[type]:
+        """Get the class referred to if this is a foreign key relationship.
+
+        Returns None if the attribute is not a relationship with a `<name>_id`
+        attribute. The class is resolved once, on first use.
+        """
+        if self._foreign_key_class is _UNRESOLVED:
+            attr_cls = None
+            if hasattr(self.owner, self.idname):
+                attr_cls = self.owner.__attr_base_classes__.get(self.name)
+                if isinstance(attr_cls, str):
+                    attr_cls = globals().get(attr_cls)
+                if not isinstance(attr_cls, type):
+                    attr_cls = None
+            self._foreign_key_class = attr_cls
+        return self._foreign_key_class
+
+    def is_collection(self) -> bool:
+        """Whether the attribute is a list relationship, e.g. `Mapped[List[...]]`."""
+        base_type = self.owner.__attr_base_classes__.get(self.name)
+        return getattr(base_type, "__origin__", None) is list
+
+    def __get__(self, obj: Optional["DeclarativeBase"], cls: Optional[type] = None):
+        if obj is None:
+            return PropertyNotLoaded
+        return obj._load_property(self)
+
+
+def _foreign_key_class(cls: type, name: str) -> Optional[type]:
+    """Helper to get the class referred to by foreign key relationship `name`.
+
+    Returns None if `name` is not a relationship with a `<name>_id` attribute.
+    """
+    attr = getattr(cls, "__lazy_attributes__", {}).get(name)
+    if attr is None:
+        return None
+    return attr.foreign_key_class()
+
+
+def _loaded_value(obj: "DeclarativeBase", name: str) -> Any:
+    """Helper to get attribute `name` of `obj` without loading it.
+
+    Returns :class:`PropertyNotLoaded` if the attribute is not set.
+
+    :noindex:
+    """
+    return obj.__dict__.get(name, PropertyNotLoaded)
+
+
+def relationship_info(cls: type, name: str) -> Optional[RelationshipInfo]:
+    """Get the arguments of relationship `name` of `cls`, None if not a relationship."""
+    for klass in cls.__mro__:
+        info = klass.__dict__.get("__relationships__", {}).get(name)
+        if info is not None:
+            return info
+    return None
+
+
+def load_relationship(
+    objs: Iterable["DeclarativeBase"], name: str, batch_size: Optional[int] = None
+):
+    """Load relationship `name` for all `objs` using bulk requests.
+
+    Foreign key relationships (with a `<name>_id` attribute) are loaded by
+    requesting the distinct referred IDs in bulk, others by requesting
+    `<Class>.<name>` for all object IDs in bulk (see
+    :func:`biggr.objects.get_many`). Objects for which the relationship is already
+    loaded are skipped. List relationships are set to lists, see
+    :class:`biggr.pagination.LazyCollection` for the lazily loaded equivalent.
+
+    Parameters
+    ----------
+    objs: iterable of objects
+        The objects to load the relationship for.
+    name: str
+        Name of the relationship.
+    batch_size: int, optional
+        Maximum number of IDs per request.
+    """
+    kwargs = {} if batch_size is None else {"batch_size": batch_size}
+    requests = _relationship_requests(objs, name, get_session().identity_map)
+    for obj_type, obj_ids, pending in requests:
+        vals = dict(zip(obj_ids, objects.get_many(obj_type, obj_ids, **kwargs)))
+        for x, idval in pending:
+            setattr(x, name, vals[idval])
+
+
+def _relationship_requests(
+    objs: Iterable["DeclarativeBase"], name: str, identity_map: IdentityMap
+) -> List[Tuple[Union[type, str], List[Any], List[Tuple["DeclarativeBase", Any]]]]:
+    """Helper to determine the requests needed to load relationship `name`.
+
+    Shared by :func:`load_relationship` and :func:`biggr.aio.load_many`. Sets the
+    relationship of the objects for which no request is needed (no referred ID, or
+    the referred object is in `identity_map`). Returns, per request type, the
+    request type, the distinct IDs to request and the pending `(object, ID)` pairs.
+
+    :noindex:
+    """
+    by_cls: Dict[type, List[DeclarativeBase]] = {}
+    for x in objs:
+        by_cls.setdefault(type(x), []).append(x)
+    requests = []
+    for cls, instances in by_cls.items():
+        if not hasattr(cls, name):
+            raise ValueError(f"{cls.__name__} has no relationship '{name}'.")
+        attr_cls = _foreign_key_class(cls, name)
+        idname = f"{name}_id" if attr_cls is not None else "id"
+        pending = []
+        for x in instances:
+            if _loaded_value(x, name) is not PropertyNotLoaded:
+                continue
+            idval = _loaded_value(x, idname)
+            if idval is None or idval is PropertyNotLoaded:
+                if attr_cls is not None:
+                    setattr(x, name, None)
+                continue
+            if attr_cls is not None:
+                cached_object = identity_map.get((attr_cls, idval))
+                if cached_object is not None:
+                    setattr(x, name, cached_object)
+                    continue
+            pending.append((x, idval))
+        if not pending:
+            continue
+        obj_ids = list(dict.fromkeys(idval for _, idval in pending))
+        obj_type = attr_cls if attr_cls is not None else f"{cls.__name__}.{name}"
+        requests.append((obj_type, obj_ids, pending))
+    return requests
+
+
+def set_identity_map(
+    identity_map: Union[IdentityMap, str] = "unbounded", **kwargs
+) -> IdentityMap:
+    """Replace the identity map used by the default session.
+
+    Parameters
+    ----------
+    identity_map: IdentityMap or str
+        The new identity map, or the name of the policy to create one with (see
+        :func:`biggr.identity_map.create_identity_map`): "unbounded" (default),
+        "weak" or "lru".
+    kwargs
+        Passed to :func:`biggr.identity_map.create_identity_map` if `identity_map` is
+        a policy name, e.g. `max_size=100000` for the "lru" policy.
+
+    Returns
+    -------
+    IdentityMap
+        The new identity map. Previously loaded objects are not transferred.
+    """
+    global OBJECT_CACHE
+    if isinstance(identity_map, str):
+        identity_map = create_identity_map(identity_map, **kwargs)
+    OBJECT_CACHE = identity_map
+    return identity_map
+
+
+class BatchScope:
+    """Collects objects to batch their lazy loads, see :func:`batch`."""
+
+    def __init__(self, batch_size: Optional[int] = None):
+        self.batch_size = batch_size
+        self.instances: Dict[type, List["DeclarativeBase"]] = {}
+        self._registered = set()
+
+    def register(self, obj: "DeclarativeBase"):
+        if id(obj) in self._registered:
+            return
+        self._registered.add(id(obj))
+        self.instances.setdefault(type(obj), []).append(obj)
+
+    def load(self, obj: "DeclarativeBase", name: str):
+        """Load relationship `name` of all collected objects of the same class."""
+        self.register(obj)
+        load_relationship(self.instances[type(obj)], name, self.batch_size)
+        return _loaded_value(obj, name)
+
+
+def _current_batch() -> Optional[BatchScope]:
+    return getattr(_batch_state, "scope", None)
+
+
+@contextmanager
+def batch(batch_size: Optional[int] = None):
+    """Context manager to batch lazy loads of relationships.
+
+    Objects created or updated from API results within the context are collected
+    per class. When a relationship of one of these objects is lazy-loaded, the same
+    relationship is loaded for all collected objects of that class using a single
+    bulk request (see :func:`biggr.objects.get_many`), instead of one request per
+    object.
+
+    Parameters
+    ----------
+    batch_size: int, optional
+        Maximum number of IDs per request, defaults to
+        :data:`biggr.objects.DEFAULT_BATCH_SIZE`.
+
+    Examples
+    --------
+    >>> with biggr.batch():
+    ...     reactions = [mr.reaction for mr in model.model_reactions]
+    """
+    prev_scope = _current_batch()
+    _batch_state.scope = BatchScope(batch_size)
+    try:
+        yield _batch_state.scope
+    finally:
+        _batch_state.scope = prev_scope
+
+
 # --------
 # Tables
 # --------
@@ -117,6 +372,11 @@ COMPOUND_TYPE_TO_SBO = {
 class DeclarativeMeta(type):
     def __new__(cls, name, bases, attrs):
         attrs["__attr_base_classes__"] = {}
+        attrs["__relationships__"] = {}
+        for k, v in list(attrs.items()):
+            if isinstance(v, RelationshipInfo):
+                attrs["__relationships__"][k] = v
+                attrs[k] = PropertyNotLoaded
         if "__annotations__" in attrs:
             for k, v in attrs["__annotations__"].items():
                 if k.startswith("_"):
@@ -136,47 +396,82 @@ class DeclarativeMeta(type):
                     attrs[k] = dummy_col_f(obj_type=base_type)
         # print(attrs["__attr_base_classes__"])
 
+        lazy_attributes = {}
+        for base in reversed(bases):
+            lazy_attributes.update(getattr(base, "__lazy_attributes__", {}))
+        for k, v in attrs.items():
+            if v is PropertyNotLoaded:
+                attrs[k] = LazyAttribute(k)
+                lazy_attributes[k] = attrs[k]
+        attrs["__lazy_attributes__"] = lazy_attributes
+
         return super().__new__(cls, name, bases, attrs)
 
 
 class DeclarativeBase(metaclass=DeclarativeMeta):
+    _session = None
+
     def __init__(self, **kwargs):
+        session = get_session()
+        self._session = session
         for k, v in kwargs.items():
             # if k not in self.__attr_base_classes__.keys():
             #     print(k)
             #     raise ValueError()
             setattr(self, k, v)
             if k == "id":
-                OBJECT_CACHE[(self.__class__, self.id)] = self
-
-    def __getattribute__(self, name):
-        val = object.__getattribute__(self, name)
-        if val is PropertyNotLoaded:
-            idname = f"{name}_id"
-            if hasattr(self, idname):
-                idval = object.__getattribute__(self, idname)
-                if idval is not None:
-                    attr_cls = self.__attr_base_classes__.get(name)
-                    if isinstance(attr_cls, str):
-                        attr_cls = globals()[attr_cls]
-                    if attr_cls is not None:
-                        cache_key = (attr_cls, idval)
-                        if cache_key in OBJECT_CACHE:
-                            val = OBJECT_CACHE[cache_key]
-                            setattr(self, name, val)
-                            return val
-                        elif LAZY_LOADING:
-                            val = objects.get(attr_cls, idval)
-                            setattr(self, name, val)
-                            return val
-            if (obj_id := object.__getattribute__(self, "id")) is not None:
-                val = objects.get(f"{self.__class__.__name__}.{name}", obj_id)
+                session.identity_map[(self.__class__, self.id)] = self
+        if (scope := _current_batch()) is not None:
+            scope.register(self)
+
+    def _load_property(self, attr: LazyAttribute):
+        """Load the attribute described by `attr`, which is not set yet.
+
+        Foreign key relationships are taken from the identity map or requested by
+        the referred ID, other attributes are requested as `<Class>.<name>`. List
+        relationships are loaded as a :class:`biggr.pagination.LazyCollection`.
+        """
+        session = self._session or get_session()
+        name = attr.name
+        with use_session(session):
+            attr_cls = attr.foreign_key_class()
+            idval = None
+            if attr_cls is not None:
+                idval = _loaded_value(self, attr.idname)
+            if idval is not None and idval is not PropertyNotLoaded:
+                val = session.identity_map.get((attr_cls, idval))
+                if val is not None:
+                    setattr(self, name, val)
+                    return val
+                elif session.lazy_loading:
+                    if (scope := _current_batch()) is not None:
+                        return scope.load(self, name)
+                    val = objects.get(attr_cls, idval)
+                    setattr(self, name, val)
+                    return val
+            if not session.lazy_loading:
+                return PropertyNotLoaded
+            obj_id = _loaded_value(self, "id")
+            if obj_id is not None and obj_id is not PropertyNotLoaded:
+                if (scope := _current_batch()) is not None:
+                    return scope.load(self, name)
+                obj_type = f"{self.__class__.__name__}.{name}"
+                if attr.is_collection():
+                    val = LazyCollection.load(obj_type, obj_id)
+                else:
+                    val = objects.get(obj_type, obj_id)
                 setattr(self, name, val)
                 return val
-        return val
+        return PropertyNotLoaded
 
 
 class Base(DeclarativeBase):
+    async def aload(self, name: str) -> Any:
+        """Load relationship `name` asynchronously, see :func:`biggr.aio.load`."""
+        from biggr import aio
+
+        return await aio.load(self, name)
+
     def _to_shallow_dict(self) -> Dict[str, Any]:
         d = {"_type": type(self).__name__}
         for k, v in vars(self).items():
@@ -188,14 +483,18 @@ class Base(DeclarativeBase):
     @classmethod
     def from_dict(cls, d):
         kwargs = {k: v for k, v in d.items() if not k.startswith("_")}
-        if "id" in kwargs:
-            cache_key = (cls, kwargs["id"])
-            if cache_key in OBJECT_CACHE:
-                cached_object = OBJECT_CACHE[cache_key]
-                for k, v in kwargs.items():
-                    setattr(cached_object, k, v)
-                return cached_object
-        return cls(**kwargs)
+        if "id" not in kwargs:
+            return cls(**kwargs)
+        session = get_session()
+        with session.lock:
+            cached_object = session.identity_map.get((cls, kwargs["id"]))
+            if cached_object is None:
+                return cls(**kwargs)
+            for k, v in kwargs.items():
+                setattr(cached_object, k, v)
+        if (scope := _current_batch()) is not None:
+            scope.register(cached_object)
+        return cached_object
 
 
 class BiGGBase:
@@ -1786,3 +2085,9 @@ class ModelReactionEscherMapping(Base):
     )
 
     __table_args__ = (UniqueConstraint("model_reaction_id", "escher_module_id"),)
+
+
+# Imported last, since these modules use the classes defined above when they are
+# imported. Both are only used here when relationships are loaded.
+from biggr import objects  # noqa: E402
+from biggr.pagination import LazyCollection  # noqa: E402
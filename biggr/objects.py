@@ -1,14 +1,53 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, Iterable, Optional, Type, Union
-import requests
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 from biggr import models
+from biggr.client import Client, _result_items, get_client, use_client
+from biggr.pagination import LazyCollection
+from biggr.session import get_session
+
+logger = logging.getLogger(__name__)
 
 API_URL = "https://biggr.org/api/v3/"
 OBJECTS_API_URL = f"{API_URL}objects/"
 IDENTIFIERS_API_URL = f"{API_URL}identifiers/"
 
+
+def _all_subclasses(cls: type) -> List[type]:
+    subclasses = []
+    for x in cls.__subclasses__():
+        subclasses.append(x)
+        subclasses.extend(_all_subclasses(x))
+    return subclasses
+
+
 #: Dictionary mapping available cobradb-style model names to their classes.
-MODEL_NAMES = {x.__name__: x for x in models.Base.__subclasses__()}
+MODEL_NAMES = {x.__name__: x for x in _all_subclasses(models.Base)}
+_MODEL_LOOKUP = {
+    **{x.__tablename__: x for x in MODEL_NAMES.values()},
+    **{k.lower(): x for k, x in MODEL_NAMES.items()},
+    **MODEL_NAMES,
+}
+
+#: Default number of IDs packed into a single request by :func:`get_many`.
+DEFAULT_BATCH_SIZE = 500
+#: Default number of concurrent requests made by :func:`get_many`.
+DEFAULT_MAX_WORKERS = 8
+#: Default number of objects per page of lazily loaded list relationships, see
+#: :class:`biggr.pagination.LazyCollection`.
+DEFAULT_PAGE_SIZE = 1000
 
 
 def _request(api_url: str, data: Dict[str, Any]) -> Optional[Any]:
@@ -21,14 +60,12 @@ def _request(api_url: str, data: Dict[str, Any]) -> Optional[Any]:
     data: dict
         Request data.
 
+    The request is made using the client returned by :func:`biggr.client.get_client`,
+    see :meth:`biggr.client.Client.request`.
+
     :noindex:
     """
-    r = requests.post(api_url, json=data)
-    if r.status_code != 200:
-        print(f"Status code: {r.status_code}")
-        print(data)
-        return None
-    return r.json()
+    return get_client().request(api_url, data)
 
 
 def get_raw(
@@ -56,31 +93,484 @@ def get_raw(
     return _request(OBJECTS_API_URL, data)
 
 
+def _make_decoder(cls: Type[models.Base]) -> Callable[[Dict[str, Any]], Any]:
+    """Helper to create the function that converts raw API objects to `cls` objects.
+
+    The decoder works like :meth:`biggr.models.Base.from_dict`, but sets the values
+    directly on the (new or cached) object, without intermediate dictionaries.
+
+    :noindex:
+    """
+    new = object.__new__
+    current_batch = models._current_batch
+
+    def decode(o: Dict[str, Any]) -> models.Base:
+        session = get_session()
+        obj_id = o.get("id")
+        with session.lock:
+            obj = None
+            if obj_id is not None:
+                obj = session.identity_map.get((cls, obj_id))
+            if obj is None:
+                obj = new(cls)
+                obj._session = session
+                if obj_id is not None:
+                    session.identity_map[(cls, obj_id)] = obj
+            for k, v in o.items():
+                if k.startswith("_"):
+                    continue
+                if v.__class__ is dict or v.__class__ is list:
+                    v = _convert_result_to_models(v)
+                # Not using the instance __dict__, which would take more memory than
+                # the inline attribute values of CPython 3.11+.
+                setattr(obj, k, v)
+        if (scope := current_batch()) is not None:
+            scope.register(obj)
+        return obj
+
+    return decode
+
+
+#: Dictionary mapping the `_type` of raw API objects to their decoder.
+_DECODERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+    "datetime": lambda o: datetime.fromisoformat(o["iso"]),
+    **{name: _make_decoder(cls) for name, cls in MODEL_NAMES.items()},
+}
+
+
 def _convert_result_to_models(o):
     """Helper to convert API response to cobradb-style models.
+
+    Objects with a `_type` are converted using the decoder in :data:`_DECODERS`.
     
     :noindex:
     """
-    if isinstance(o, str):
-        return o
-    if isinstance(o, list):
-        return [_convert_result_to_models(x) for x in o]
-    if isinstance(o, dict):
-        cls_type = dict
-        if "_type" in o:
-            if o["_type"] == "datetime":
-                return datetime.fromisoformat(o["iso"])
-            cls_type = MODEL_NAMES.get(o["_type"])
-            if cls_type is None:
-                raise ValueError()
-        entries = {k: _convert_result_to_models(v) for k, v in o.items() if k != "_type"}
-        if cls_type is dict:
-            return entries
-        return cls_type.from_dict(entries)
+    if o.__class__ is list:
+        return [
+            _convert_result_to_models(x)
+            if x.__class__ is dict or x.__class__ is list
+            else x
+            for x in o
+        ]
+    if o.__class__ is dict:
+        obj_type = o.get("_type")
+        if obj_type is None:
+            return {k: _convert_result_to_models(v) for k, v in o.items()}
+        decoder = _DECODERS.get(obj_type)
+        if decoder is None:
+            raise ValueError()
+        return decoder(o)
     return o
 
 
-def get(obj_type: Union[str, Type[models.Base]], obj_id: Union[str, int]):
+def _get_model_class(obj_type: Union[str, Type[models.Base]]):
+    """Helper to find the model class for an object type, None for relationships.
+
+    :noindex:
+    """
+    if not isinstance(obj_type, str):
+        return obj_type
+    return _MODEL_LOOKUP.get(obj_type)
+
+
+def _map_concurrently(
+    client: Client, f: Callable, items: List[Any], max_workers: int
+) -> List[Any]:
+    """Helper to apply `f` to all `items` in a thread pool using `client`.
+
+    :noindex:
+    """
+
+    def _run(item):
+        with use_client(client):
+            return f(item)
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [_run(x) for x in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(_run, items))
+
+
+def _get_raw_batch(obj_type: str, obj_ids: List[Union[str, int]]) -> Optional[List]:
+    """Helper to request multiple objects at once.
+
+    Returns a list of raw objects in the same order as `obj_ids`, or None if the
+    API did not give a valid batch response.
+
+    :noindex:
+    """
+    result = _request(OBJECTS_API_URL, {"type": obj_type, "ids": obj_ids})
+    if result is None:
+        return None
+    objs = result.get("objects")
+    if not isinstance(objs, list) or len(objs) != len(obj_ids):
+        return None
+    return objs
+
+
+def _get_raw_single(obj_type: str, obj_id: Union[str, int]) -> Optional[Any]:
+    """Helper to request a single object, returning the raw object or list.
+
+    :noindex:
+    """
+    result = get_raw(obj_type, obj_id)
+    if result is None:
+        return None
+    if "object" in result:
+        return result["object"]
+    return result.get("objects")
+
+
+def get_many_raw(
+    obj_type: Union[str, Type[models.Base]],
+    obj_ids: Iterable[Union[str, int]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> List[Optional[Any]]:
+    """Get the raw API results for multiple IDs at once.
+
+    The IDs are packed into batched requests of at most `batch_size` IDs. If the API
+    does not support batched requests (see
+    :attr:`biggr.client.Client.supports_batch`), single requests are made
+    concurrently instead. Returns the raw objects in the same order as `obj_ids`, with None for
+    IDs that could not be found.
+
+    Parameters
+    ----------
+    obj_type: str or the class of the objects to be retrieved
+        See :func:`get_raw`.
+    obj_ids: iterable of str or int
+        See :func:`get_raw`.
+    batch_size: int
+        Maximum number of IDs per request.
+    max_workers: int
+        Maximum number of concurrent requests.
+    """
+    if not isinstance(obj_type, str):
+        obj_type = obj_type.__name__
+    obj_ids = list(obj_ids)
+    if not obj_ids:
+        return []
+    client = get_client()
+    batches = [obj_ids[i : i + batch_size] for i in range(0, len(obj_ids), batch_size)]
+    results = []
+    if client.supports_batch is None:
+        # Use the first batch to find out whether the API supports batches. The
+        # client sets supports_batch to False if the batch is rejected; if it fails
+        # for another reason, single requests are only used for this call.
+        first_result = _get_raw_batch(obj_type, batches[0])
+        if first_result is not None:
+            client.supports_batch = True
+            results.extend(first_result)
+            batches = batches[1:]
+    if client.supports_batch:
+        batch_results = _map_concurrently(
+            client, lambda x: _get_raw_batch(obj_type, x), batches, max_workers
+        )
+        for batch, batch_result in zip(batches, batch_results):
+            if batch_result is None:
+                batch_result = [None] * len(batch)
+            results.extend(batch_result)
+        return results
+    return _map_concurrently(
+        client, lambda x: _get_raw_single(obj_type, x), obj_ids, max_workers
+    )
+
+
+def get_many(
+    obj_type: Union[str, Type[models.Base]],
+    obj_ids: Iterable[Union[str, int]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    refresh: bool = False,
+) -> List[Optional[Any]]:
+    """Get multiple entities from the BiGGr database in bulk.
+
+    Works like :func:`get`, but requests the objects for all `obj_ids` using as few
+    API requests as possible (see :func:`get_many_raw`). Objects that are already
+    cached (by internal ID) are not requested again, unless `refresh` is True.
+
+    Parameters
+    ----------
+    obj_type: str or the class of the objects to be retrieved
+        See :func:`get`.
+    obj_ids: iterable of str or int
+        See :func:`get`.
+    batch_size: int
+        Maximum number of IDs per request.
+    max_workers: int
+        Maximum number of concurrent requests.
+    refresh: bool
+        Also request objects that are already cached.
+
+    Returns
+    -------
+    list
+        The objects in the same order as `obj_ids`, with None for IDs that could not
+        be found.
+    """
+    obj_ids = list(obj_ids)
+    cls = _get_model_class(obj_type)
+    results = [None] * len(obj_ids)
+    positions = {}
+    identity_map = get_session().identity_map
+    for i, obj_id in enumerate(obj_ids):
+        if not refresh and cls is not None:
+            cached_object = identity_map.get((cls, obj_id))
+            if cached_object is not None:
+                results[i] = cached_object
+                continue
+        positions.setdefault(obj_id, []).append(i)
+    fetch_ids = list(positions.keys())
+    raw_results = get_many_raw(
+        obj_type, fetch_ids, batch_size=batch_size, max_workers=max_workers
+    )
+    for obj_id, raw_result in zip(fetch_ids, raw_results):
+        if raw_result is None:
+            continue
+        obj = _convert_result_to_models(raw_result)
+        for i in positions[obj_id]:
+            results[i] = obj
+    return results
+
+
+def _get_raw_by_id(
+    obj_type: Union[str, Type[models.Base]],
+    obj_ids: Iterable[Any],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[Any, Any]:
+    """Helper to request the raw objects for the distinct `obj_ids` in bulk.
+
+    Returns a dictionary mapping the IDs to the raw objects (or None).
+
+    :noindex:
+    """
+    obj_ids = list(dict.fromkeys(x for x in obj_ids if x is not None))
+    return dict(zip(obj_ids, get_many_raw(obj_type, obj_ids, batch_size=batch_size)))
+
+
+def _get_related_raw(
+    raw_objs: Iterable[Dict[str, Any]],
+    name: str,
+    obj_type: Union[str, Type[models.Base]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[Any, Any]:
+    """Helper to get the raw objects referred to by foreign key `name` of `raw_objs`.
+
+    Objects that are embedded in the raw objects are used as is, the others are
+    requested in bulk. Returns a dictionary mapping the referred IDs to the raw
+    objects (or None).
+
+    :noindex:
+    """
+    found = {}
+    missing = []
+    for o in raw_objs:
+        obj_id = o.get(f"{name}_id")
+        if obj_id is None or obj_id in found:
+            continue
+        embedded = o.get(name)
+        if isinstance(embedded, dict):
+            found[obj_id] = embedded
+        else:
+            missing.append(obj_id)
+    found.update(_get_raw_by_id(obj_type, missing, batch_size))
+    return found
+
+
+def get_model_rows(model_bigg_id: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Tuple[
+    Dict[str, Any],
+    List[Dict[str, Any]],
+    List[Dict[str, Any]],
+    Dict[int, List[Tuple[int, float]]],
+]:
+    """Request the raw rows that make up the reaction network of a model, in bulk.
+
+    Requests the model, its model reactions and model compartmentalized
+    components, and the reaction matrices of all reactions with their coefficients,
+    using a few bulk requests per level. No model objects are created.
+
+    Parameters
+    ----------
+    model_bigg_id: str
+        BiGG ID of the model.
+    batch_size: int
+        Maximum number of IDs per request.
+
+    Returns
+    -------
+    tuple
+        The raw model, the raw model reactions, the raw model compartmentalized
+        components, and a dictionary mapping reaction IDs to the list of
+        `(compartmentalized component ID, coefficient)` participants of the
+        reaction.
+    """
+    result = get_raw(models.Model, model_bigg_id)
+    model = None if result is None else result.get("object")
+    if model is None:
+        raise ValueError(f"Model '{model_bigg_id}' not found.")
+    model_id = model["id"]
+    result = get_raw("Model.model_reactions", model_id)
+    model_reactions = [] if result is None else result.get("objects") or []
+    result = get_raw("Model.model_compartmentalized_components", model_id)
+    mccs = [] if result is None else result.get("objects") or []
+
+    matrices = _get_raw_by_id(
+        "Reaction.matrix", (x["reaction_id"] for x in model_reactions), batch_size
+    )
+    rows = [x for reaction_rows in matrices.values() for x in reaction_rows or []]
+    urms = _get_related_raw(
+        rows, "universal_reaction_matrix", models.UniversalReactionMatrix, batch_size
+    )
+    participants = {}
+    for reaction_id, reaction_rows in matrices.items():
+        participants[reaction_id] = [
+            (x["compartmentalized_component_id"], urm["coefficient"])
+            for x in reaction_rows or []
+            if (urm := urms.get(x["universal_reaction_matrix_id"])) is not None
+        ]
+    return model, model_reactions, mccs, participants
+
+
+def get_annotations(
+    obj_type: Union[str, Type[models.Base]],
+    obj_ids: Iterable[int],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[int, Dict[str, List[str]]]:
+    """Request the annotations of objects in bulk.
+
+    Requests the annotation mappings of the objects, the links of all mapped
+    annotations and their data sources, using a few bulk requests. No model objects
+    are created.
+
+    Parameters
+    ----------
+    obj_type: str or type
+        Class of the objects, one with annotation mappings (e.g. `Component` or
+        `Reaction`).
+    obj_ids: iterable of int
+        Internal IDs of the objects.
+    batch_size: int
+        Maximum number of IDs per request.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping the object IDs to annotation dictionaries (data source
+        BiGG ID to list of identifiers), as used by cobrapy.
+    """
+    if not isinstance(obj_type, str):
+        obj_type = obj_type.__name__
+    mappings = _get_raw_by_id(f"{obj_type}.annotation_mappings", obj_ids, batch_size)
+    annotation_ids = [
+        x["annotation_id"] for maps in mappings.values() for x in maps or []
+    ]
+    links = _get_raw_by_id("Annotation.links", annotation_ids, batch_size)
+    data_sources = _get_related_raw(
+        (x for annotation_links in links.values() for x in annotation_links or []),
+        "data_source",
+        models.DataSource,
+        batch_size,
+    )
+    result = {}
+    for obj_id, maps in mappings.items():
+        annotation = {}
+        for ann_map in maps or []:
+            for link in links.get(ann_map["annotation_id"]) or []:
+                ds = data_sources.get(link["data_source_id"])
+                if ds is None:
+                    continue
+                identifiers = annotation.setdefault(ds["bigg_id"], [])
+                if link["identifier"] not in identifiers:
+                    identifiers.append(link["identifier"])
+        result[obj_id] = annotation
+    return result
+
+
+def _parse_include(include: Iterable[str]) -> Dict[str, Dict]:
+    """Helper to convert dotted relationship paths to a nested dict.
+
+    :noindex:
+    """
+    tree = {}
+    for path in include:
+        node = tree
+        for name in path.split("."):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def prefetch(
+    objs: Union[models.Base, Iterable[models.Base]],
+    include: Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> List[Dict[str, Any]]:
+    """Load relationship paths for objects in bulk, one level at a time.
+
+    For every level of the relationship paths in `include`, the relationships are
+    loaded for all objects at that level using bulk requests (see
+    :func:`biggr.models.load_relationship`). Afterwards, accessing the included
+    relationships does not result in any further API requests.
+
+    Parameters
+    ----------
+    objs: object or iterable of objects
+        The objects to load the relationships for.
+    include: iterable of str
+        Relationship paths, using dots to separate the relationships, e.g.
+        `"model_reactions.reaction.universal_reaction"`.
+    batch_size: int
+        Maximum number of IDs per request.
+
+    Returns
+    -------
+    list of dict
+        For every level, the loaded relationship `names`, the number of `objects`
+        they were loaded for and the number of API `requests` that were made.
+    """
+    if isinstance(objs, models.Base):
+        objs = [objs]
+    frontier = [(list(objs), _parse_include(include))]
+    report = []
+    client = get_client()
+    while frontier:
+        level_info = {"level": len(report) + 1, "names": [], "objects": 0}
+        request_count = client.request_count
+        next_frontier = []
+        for level_objs, tree in frontier:
+            for name, subtree in tree.items():
+                models.load_relationship(level_objs, name, batch_size=batch_size)
+                level_info["names"].append(name)
+                level_info["objects"] += len(level_objs)
+                if not subtree:
+                    continue
+                children = []
+                for x in level_objs:
+                    val = getattr(x, name)
+                    if isinstance(val, (list, LazyCollection)):
+                        children.extend(y for y in val if y is not None)
+                    elif val is not None:
+                        children.append(val)
+                if children:
+                    next_frontier.append((children, subtree))
+        level_info["requests"] = client.request_count - request_count
+        logger.info(
+            "Prefetch level %d (%s): %d requests for %d objects.",
+            level_info["level"],
+            ", ".join(level_info["names"]),
+            level_info["requests"],
+            level_info["objects"],
+        )
+        report.append(level_info)
+        frontier = next_frontier
+    return report
+
+
+def get(
+    obj_type: Union[str, Type[models.Base]],
+    obj_id: Union[str, int],
+    include: Optional[Iterable[str]] = None,
+):
     """Get an entity from the BiGGr database and return it as a python object.
     
     Makes the BiGGr API request to obtain object(s) of type `obj_type`. Returns the JSON
@@ -88,6 +578,11 @@ def get(obj_type: Union[str, Type[models.Base]], obj_id: Union[str, int]):
     `biggr.models` module. Some relations are loaded by default, whilst others are
     loaded automatically when accessed.
 
+    Objects requested by internal ID are taken from the identity map if loaded
+    before. Concurrent calls for the same object (e.g. from multiple threads) are
+    coalesced into a single API request, see
+    :meth:`biggr.session.Session.get_or_fetch`.
+
     Parameters
     ----------
     obj_type: str or the class of the object to be retrieved
@@ -98,15 +593,68 @@ def get(obj_type: Union[str, Type[models.Base]], obj_id: Union[str, int]):
         with all database entities). In the case that `obj_id` is of type int, the ID is
         interpreted as an internal ID, as used for defining relationships between
         database entities.
+    include: iterable of str, optional
+        Relationship paths to load up front, e.g. `["taxon.rank",
+        "model_reactions.reaction.universal_reaction"]`. The relationships are loaded
+        level by level using bulk requests, see :func:`prefetch`. The number of
+        requests per level is logged at the INFO level.
     """
-    # print(f"GET: {obj_type}: {obj_id}")
-    result = get_raw(obj_type, obj_id)
-    if result is None:
-        return None
-    if "object" in result:
-        return _convert_result_to_models(result["object"])
+    def _fetch():
+        result = get_raw(obj_type, obj_id)
+        if result is None:
+            return None
+        if "object" in result:
+            return _convert_result_to_models(result["object"])
+        else:
+            return _convert_result_to_models(result["objects"])
+
+    cls = _get_model_class(obj_type)
+    session = get_session()
+    if cls is not None and isinstance(obj_id, int):
+        # Objects are stored in the identity map by internal ID.
+        obj = session.get_or_fetch(cls, obj_id, _fetch)
+    else:
+        obj = session.coalesce((obj_type if cls is None else cls, obj_id), _fetch)
+    if include and obj is not None:
+        prefetch(obj, include)
+    return obj
+
+
+def iter_objects(
+    obj_type: Union[str, Type[models.Base]], obj_id: Union[str, int]
+) -> Iterator[Any]:
+    """Iterate over the entities returned by the BiGGr database, one at a time.
+
+    Makes the same API request as :func:`get`, but parses the response incrementally
+    and yields every object as soon as it is converted, instead of building the
+    whole list first. This is useful for large list results, e.g.
+    `objects.iter_objects("Model.model_reactions", model.id)`. Requires the optional
+    `ijson` package for incremental parsing; otherwise the whole response is parsed
+    up front and only the conversion happens one object at a time.
+
+    Every object is registered in the identity map as it is yielded. Use a weak or
+    LRU identity map (see :func:`biggr.models.set_identity_map`) to keep the memory
+    use bounded when iterating over very large results.
+
+    Parameters
+    ----------
+    obj_type: str or the class of the objects to be retrieved
+        For all possible values, please refer to the BiGGr API documentation at
+        `biggr.org/data_access <https://biggr.org/data_access#data_objects_objects>`__
+    obj_id: str or int
+        BiGG ID (str) or internal ID (int), see :func:`get`.
+    """
+    if not isinstance(obj_type, str):
+        obj_type = obj_type.__name__
+    client = get_client()
+    data = {"type": obj_type, "id": obj_id}
+    request_iter = getattr(client, "request_iter", None)
+    if request_iter is None:
+        raw_objs = _result_items(client.request(OBJECTS_API_URL, data))
     else:
-        return _convert_result_to_models(result["objects"])
+        raw_objs = request_iter(OBJECTS_API_URL, data)
+    for o in raw_objs:
+        yield _convert_result_to_models(o)
 
 
 def get_metabolites_by_identifiers(
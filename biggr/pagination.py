@@ -0,0 +1,229 @@
+"""Lazily loaded list relationships, fetched in pages on demand."""
+
+import bisect
+import threading
+from collections.abc import Sequence
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from biggr.session import Session, get_session, use_session
+
+
+class LazyCollection(Sequence):
+    """Read-only sequence of the objects of a list relationship.
+
+    The objects are requested in pages of `page_size` objects, as
+    `{"type": "<Class>.<name>", "id": ..., "offset": ..., "limit": ...}`, when they
+    are accessed. The response contains the objects of the page and the `total`
+    number of objects in the relationship. Loaded pages are kept, such that every
+    page is requested at most once. If the API does not support pagination (the
+    response has no `total`), the first response contains all objects. If the
+    server returns less objects than requested (e.g. because it limits the page
+    size), the following pages are requested at the size of the returned page.
+
+    Supports `len()`, indexing, slicing (returns a list) and iteration. Iterating
+    requests the remaining pages one by one, so code that only needs the first few
+    objects does not download the complete relationship.
+
+    List relationships are :class:`collections.abc.Sequence` objects: a
+    LazyCollection when they are loaded lazily, a list when they are loaded in bulk
+    (by :func:`biggr.models.load_relationship`, :func:`biggr.models.batch` or
+    :func:`biggr.objects.prefetch`). Code using them should only rely on the
+    Sequence interface.
+
+    Parameters
+    ----------
+    obj_type: str
+        Relationship request type, `<Class>.<name>`.
+    obj_id: int
+        Internal ID of the object the relationship belongs to.
+    page_size: int, optional
+        Number of objects per page, defaults to
+        :data:`biggr.objects.DEFAULT_PAGE_SIZE`.
+    session: Session, optional
+        Session to load the objects with, defaults to the active session.
+
+    Examples
+    --------
+    >>> model = objects.get("model", "iML1515")
+    >>> len(model.model_reactions)  # Requests the first page only
+    2712
+    >>> first = model.model_reactions[:10]
+    """
+
+    def __init__(
+        self,
+        obj_type: str,
+        obj_id: int,
+        page_size: Optional[int] = None,
+        session: Optional[Session] = None,
+    ):
+        self.obj_type = obj_type
+        self.obj_id = obj_id
+        self.page_size = objects.DEFAULT_PAGE_SIZE if page_size is None else page_size
+        self.session = get_session() if session is None else session
+        #: Loaded pages by offset.
+        self._pages: Dict[int, List[Any]] = {}
+        self._offsets: List[int] = []
+        self._total: Optional[int] = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(
+        cls, obj_type: str, obj_id: int, page_size: Optional[int] = None
+    ) -> Optional["LazyCollection"]:
+        """Create a collection and request its first page.
+
+        Returns None if the first request was not successful, like
+        :func:`biggr.objects.get`. Concurrent loads of the same relationship are
+        coalesced, see :meth:`biggr.session.Session.coalesce`.
+        """
+        session = get_session()
+
+        def _fetch():
+            collection = cls(obj_type, obj_id, page_size=page_size, session=session)
+            if collection._request_page(0) is None:
+                return None
+            return collection
+
+        # Namespaced, such that it does not collide with the keys of objects.get.
+        return session.coalesce(("page", obj_type, obj_id, page_size), _fetch)
+
+    def _request_page(self, offset: int) -> Optional[List[Any]]:
+        """Helper to request and convert the page at `offset`, None if not successful.
+
+        :noindex:
+        """
+        data = {
+            "type": self.obj_type,
+            "id": self.obj_id,
+            "offset": offset,
+            "limit": self.page_size,
+        }
+        with use_session(self.session):
+            result = objects._request(objects.OBJECTS_API_URL, data)
+            if result is None:
+                return None
+            objs = objects._convert_result_to_models(result.get("objects") or [])
+        with self._lock:
+            if "total" in result:
+                self._total = result["total"]
+                if 0 < len(objs) < self.page_size and offset + len(objs) < self._total:
+                    # The server returns less objects per page (e.g. it limits the
+                    # page size), following pages are requested at its page size.
+                    self.page_size = len(objs)
+            else:
+                # Pagination is not supported, the response has all objects.
+                self.page_size = max(len(objs), 1)
+                self._total = len(objs)
+                offset = 0
+            if offset not in self._pages:
+                bisect.insort(self._offsets, offset)
+            self._pages[offset] = objs
+        return objs
+
+    def _find(self, index: int) -> Optional[Tuple[List[Any], int]]:
+        """Helper to find the loaded page containing `index`.
+
+        Returns the page and the position of `index` in it, None if not loaded.
+
+        :noindex:
+        """
+        i = bisect.bisect_right(self._offsets, index) - 1
+        if i >= 0:
+            offset = self._offsets[i]
+            objs = self._pages[offset]
+            if index < offset + len(objs):
+                return objs, index - offset
+        return None
+
+    def _page(self, index: int) -> Tuple[List[Any], int]:
+        """Helper to get the page containing `index`, requesting it if not loaded
+        yet.
+
+        Pages are indexed by their offset, since the server may return less objects
+        than requested. Returns the page and the position of `index` in it.
+
+        :noindex:
+        """
+        with self._lock:
+            found = self._find(index)
+            if found is None:
+                offset = index - index % self.page_size
+                i = bisect.bisect_right(self._offsets, index) - 1
+                if i >= 0:
+                    # Start after the preceding page, which may be a short page.
+                    prev = self._offsets[i]
+                    offset = max(offset, prev + len(self._pages[prev]))
+                if self._request_page(offset) is not None:
+                    found = self._find(index)
+                if found is None:
+                    raise RuntimeError(
+                        f"Could not load the objects at offset {offset} of "
+                        f"{self.obj_type} {self.obj_id}."
+                    )
+            return found
+
+    def __len__(self) -> int:
+        if self._total is None:
+            self._page(0)
+        return self._total
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("LazyCollection index out of range")
+        objs, position = self._page(index)
+        return objs[position]
+
+    def __iter__(self) -> Iterator[Any]:
+        index = 0
+        while index < len(self):
+            objs, position = self._page(index)
+            yield from objs[position:]
+            index += len(objs) - position
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, LazyCollection):
+            return self is other or list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    @property
+    def loaded(self) -> bool:
+        """Whether all pages are loaded."""
+        if self._total is None:
+            return False
+        end = 0
+        with self._lock:
+            for offset in self._offsets:
+                if offset > end:
+                    return False
+                end = max(end, offset + len(self._pages[offset]))
+        return end >= self._total
+
+    def loaded_objects(self) -> List[Any]:
+        """Get the objects of the pages that are loaded, without requesting any."""
+        result = []
+        with self._lock:
+            for offset in self._offsets:
+                # Skips objects of overlapping pages.
+                result.extend(self._pages[offset][max(len(result) - offset, 0) :])
+        return result
+
+    def __repr__(self) -> str:
+        total = "?" if self._total is None else self._total
+        return (
+            f"<LazyCollection {self.obj_type}({self.obj_id}): {total} objects, "
+            f"{len(self._pages)} page(s) loaded>"
+        )
+
+
+# Imported last, since the objects module uses LazyCollection when it is imported.
+from biggr import objects  # noqa: E402
@@ -0,0 +1,329 @@
+"""Persistent local index of reactions by their stoichiometry hash.
+
+The `hash` of :class:`biggr.models.Reaction`, :class:`biggr.models.UniversalReaction`
+and :class:`biggr.models.ReferenceReaction` is a canonical string of the
+stoichiometry (see e.g. :meth:`biggr.models.Reaction.generate_hash`). A
+:class:`ReactionIndex` stores the hashes of bulk-requested reactions in a SQLite
+file, such that reactions with a given stoichiometry are found locally:
+
+>>> index = ReactionIndex("~/.cache/biggr/reactions.sqlite")
+>>> index.add_model("iML1515")
+>>> index.lookup(models.Reaction.generate_hash(participants))
+['PGI']
+
+See :func:`biggr.cobra.find_reactions` to look up the reactions of a cobrapy model.
+Reference reactions matching a pattern (see
+:meth:`biggr.models.ReferenceReaction.generate_hash`) are found using
+:meth:`ReactionIndex.match_reference`.
+"""
+
+import functools
+import os
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from biggr import models, objects
+from biggr.objects import DEFAULT_BATCH_SIZE
+
+#: Classes of which the reactions can be indexed.
+HASHED_CLASSES = (models.Reaction, models.UniversalReaction, models.ReferenceReaction)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reaction (
+    type TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    bigg_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    PRIMARY KEY (type, id)
+);
+CREATE INDEX IF NOT EXISTS reaction_hash ON reaction (type, hash);
+"""
+
+#: Maximum number of compiled reference reaction patterns that are cached.
+PATTERN_CACHE_SIZE = 1024
+
+# Separator between the coefficient and the ID of a pattern participant.
+_PATTERN_SEPARATOR = ")|N)\\$"
+
+
+@functools.lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _compile(pattern: str) -> re.Pattern:
+    return re.compile(pattern)
+
+
+def _hash_ids(hash_str: str) -> Tuple[str, ...]:
+    """Helper to get the participant IDs of a reference reaction hash.
+
+    :noindex:
+    """
+    return tuple(x.split("$", 1)[-1] for x in hash_str.split("/"))
+
+
+def _pattern_ids(pattern: str) -> Optional[Tuple[str, ...]]:
+    """Helper to get the participant IDs of a reference reaction pattern.
+
+    Returns None if `pattern` was not generated by
+    :meth:`biggr.models.ReferenceReaction.generate_hash`.
+
+    :noindex:
+    """
+    if not (pattern.startswith("^") and pattern.endswith("$")):
+        return None
+    ids = []
+    for part in pattern[1:-1].split("/"):
+        if not part.startswith("(("):
+            return None
+        _, sep, p_id = part.partition(_PATTERN_SEPARATOR)
+        if not sep:
+            return None
+        ids.append(p_id)
+    return tuple(ids)
+
+
+class ReferenceReactionMatcher:
+    """Matcher of reference reaction patterns against reference reaction hashes.
+
+    The hashes are grouped by their participant IDs. A pattern (see
+    :meth:`biggr.models.ReferenceReaction.generate_hash`) is only evaluated against
+    the hashes with the same participants, using a compiled pattern from a
+    least-recently-used cache (see :data:`PATTERN_CACHE_SIZE`). Patterns that were
+    not generated by `generate_hash` are evaluated against all hashes.
+
+    Parameters
+    ----------
+    hashes: iterable of tuple
+        The `(hash, bigg_ids)` pairs of the reference reactions.
+    """
+
+    def __init__(self, hashes: Iterable[Tuple[str, List[str]]]):
+        self.hashes = list(hashes)
+        self._by_ids: Dict[Tuple[str, ...], List[Tuple[str, List[str]]]] = {}
+        for hash_str, bigg_ids in self.hashes:
+            self._by_ids.setdefault(_hash_ids(hash_str), []).append(
+                (hash_str, bigg_ids)
+            )
+
+    def match(self, pattern: str) -> List[str]:
+        """Get the BiGG IDs of the reference reactions matching `pattern` (sorted)."""
+        compiled = _compile(pattern)
+        ids = _pattern_ids(pattern)
+        candidates = self.hashes if ids is None else self._by_ids.get(ids, ())
+        return sorted(
+            bigg_id
+            for hash_str, bigg_ids in candidates
+            if compiled.match(hash_str)
+            for bigg_id in bigg_ids
+        )
+
+
+def _type_name(cls: Union[str, Type[models.Base]]) -> str:
+    """Helper to get the class name of an indexed reaction type.
+
+    :noindex:
+    """
+    klass = objects._get_model_class(cls)
+    if klass not in HASHED_CLASSES:
+        name = getattr(cls, "__name__", cls)
+        raise ValueError(f"Reactions of type {name} do not have a hash.")
+    return klass.__name__
+
+
+class ReactionIndex:
+    """SQLite-backed index of reactions by hash.
+
+    Reactions are added from raw API objects, which are requested in bulk by
+    :meth:`add_ids` and :meth:`add_model`. The first lookup loads the index into
+    memory, after which every lookup is a dictionary lookup.
+
+    Reactions of different collections (e.g. of different models) can have the same
+    hash, these are listed by :meth:`duplicates`.
+
+    Parameters
+    ----------
+    path: str
+        Path of the SQLite database file. Parent directories are created if needed.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        if (dirname := os.path.dirname(self.path)) and not os.path.isdir(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        self._by_hash: Optional[Dict[Tuple[str, str], List[str]]] = None
+        self._matcher: Optional[ReferenceReactionMatcher] = None
+
+    def add(
+        self,
+        raw_objs: Iterable[Optional[Dict[str, Any]]],
+        cls: Union[str, Type[models.Base]] = models.Reaction,
+    ) -> int:
+        """Add raw reaction objects of type `cls` to the index.
+
+        Objects that are None or have no hash are skipped. Returns the number of
+        added reactions.
+        """
+        obj_type = _type_name(cls)
+        rows = [
+            (obj_type, o["id"], o["bigg_id"], o["hash"])
+            for o in raw_objs
+            if o is not None and o.get("hash")
+        ]
+        if not rows:
+            return 0
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO reaction (type, id, bigg_id, hash) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._by_hash = None
+            self._matcher = None
+        return len(rows)
+
+    def add_ids(
+        self,
+        obj_ids: Iterable[Union[str, int]],
+        cls: Union[str, Type[models.Base]] = models.Reaction,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> int:
+        """Request the reactions of type `cls` with `obj_ids` in bulk and add them.
+
+        Returns the number of added reactions.
+        """
+        _type_name(cls)
+        return self.add(
+            objects.get_many_raw(cls, list(obj_ids), batch_size=batch_size), cls
+        )
+
+    def add_model(
+        self, model_bigg_id: str, batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> int:
+        """Add the reactions of a model, and their universal and reference reactions.
+
+        The reactions are requested using a few bulk requests. Returns the number of
+        added reactions.
+        """
+        result = objects.get_raw(models.Model, model_bigg_id)
+        model = None if result is None else result.get("object")
+        if model is None:
+            raise ValueError(f"Model '{model_bigg_id}' not found.")
+        result = objects.get_raw("Model.model_reactions", model["id"])
+        model_reactions = [] if result is None else result.get("objects") or []
+        reactions = objects._get_related_raw(
+            model_reactions, "reaction", models.Reaction, batch_size
+        )
+        universal_reactions = objects._get_related_raw(
+            (x for x in reactions.values() if x is not None),
+            "universal_reaction",
+            models.UniversalReaction,
+            batch_size,
+        )
+        references = objects._get_related_raw(
+            (x for x in universal_reactions.values() if x is not None),
+            "reference",
+            models.ReferenceReaction,
+            batch_size,
+        )
+        return (
+            self.add(reactions.values(), models.Reaction)
+            + self.add(universal_reactions.values(), models.UniversalReaction)
+            + self.add(references.values(), models.ReferenceReaction)
+        )
+
+    def _load(self) -> Dict[Tuple[str, str], List[str]]:
+        """Helper to load the index into memory (if not loaded yet).
+
+        :noindex:
+        """
+        with self._lock:
+            if self._by_hash is None:
+                by_hash = {}
+                for obj_type, hash_str, bigg_id in self._conn.execute(
+                    "SELECT type, hash, bigg_id FROM reaction ORDER BY bigg_id"
+                ):
+                    by_hash.setdefault((obj_type, hash_str), []).append(bigg_id)
+                self._by_hash = by_hash
+            return self._by_hash
+
+    def lookup(
+        self, hash_str: str, cls: Union[str, Type[models.Base]] = models.Reaction
+    ) -> List[str]:
+        """Get the BiGG IDs of the indexed reactions of type `cls` with a hash.
+
+        Parameters
+        ----------
+        hash_str: str
+            Hash as generated by the `generate_hash` method of `cls`.
+        cls: str or type
+            Reaction class, :class:`biggr.models.Reaction` by default.
+
+        Returns
+        -------
+        list of str
+            The BiGG IDs of the matching reactions (sorted), empty if none match.
+        """
+        return list(self._load().get((_type_name(cls), hash_str), ()))
+
+    def match_reference(self, pattern: Union[str, List[Any]]) -> List[str]:
+        """Get the BiGG IDs of the indexed reference reactions matching a pattern.
+
+        Parameters
+        ----------
+        pattern: str or list
+            Pattern generated by :meth:`biggr.models.ReferenceReaction.generate_hash`
+            with `pattern=True`, or the participants to generate it from.
+
+        Returns
+        -------
+        list of str
+            The BiGG IDs of the matching reference reactions (sorted).
+        """
+        if not isinstance(pattern, str):
+            pattern = models.ReferenceReaction.generate_hash(pattern, pattern=True)
+        by_hash = self._load()
+        with self._lock:
+            if self._matcher is None:
+                obj_type = models.ReferenceReaction.__name__
+                self._matcher = ReferenceReactionMatcher(
+                    (hash_str, bigg_ids)
+                    for (x, hash_str), bigg_ids in by_hash.items()
+                    if x == obj_type
+                )
+            matcher = self._matcher
+        return matcher.match(pattern)
+
+    def duplicates(
+        self, cls: Union[str, Type[models.Base]] = models.Reaction
+    ) -> Dict[str, List[str]]:
+        """Get the hashes shared by multiple indexed reactions of type `cls`.
+
+        Returns a dictionary mapping the hashes to the BiGG IDs of the reactions.
+        """
+        obj_type = _type_name(cls)
+        return {
+            hash_str: list(bigg_ids)
+            for (x, hash_str), bigg_ids in self._load().items()
+            if x == obj_type and len(bigg_ids) > 1
+        }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM reaction").fetchone()[0]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,905 @@
+"""Local SQLite replica of the BiGGr database.
+
+A :class:`Replica` stores objects in local tables that follow the table definitions
+in :mod:`biggr.models`, and answers the requests made by :mod:`biggr.objects` from
+these tables. When used as client (see :func:`biggr.client.set_client` or
+:class:`biggr.session.Session`), objects and lazy-loaded relationships are resolved
+locally instead of using the network:
+
+>>> replica = Replica("~/.cache/biggr/replica.sqlite")
+>>> replica.load_file("biggr_dump.jsonl")
+>>> set_client(replica)
+>>> model = objects.get("model", "iML1515")
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, Union
+
+from biggr import models, objects
+from biggr.cache import ResponseCache
+from biggr.client import Client
+from biggr.session import get_session
+
+_SQL_TYPES = {
+    int: "INTEGER",
+    bool: "INTEGER",
+    float: "REAL",
+    str: "TEXT",
+    datetime.datetime: "TEXT",
+}
+
+#: Number of rows inserted per transaction by :meth:`Replica.load`.
+LOAD_CHUNK_SIZE = 10000
+#: Relationships of :class:`biggr.models.Model` that are refreshed by
+#: :meth:`Replica.sync`.
+SYNC_RELATIONSHIPS = (
+    "model_reactions",
+    "model_genes",
+    "model_compartmentalized_components",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS _loaded_relationship (
+    "table" TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY ("table", id, name)
+);
+CREATE TABLE IF NOT EXISTS _partial_object (
+    "table" TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY ("table", id)
+);
+CREATE TABLE IF NOT EXISTS _column (
+    "table" TEXT NOT NULL,
+    name TEXT NOT NULL,
+    bit INTEGER NOT NULL,
+    PRIMARY KEY ("table", name)
+)
+"""
+
+# Column of every local table with the bits (see the _column table) of the columns
+# that were loaded, such that a NULL value of a column that was never loaded (e.g.
+# of an object that was embedded in another object) is not mistaken for a NULL
+# value in the database.
+_LOADED = "_loaded"
+
+# Returned by lookups that can not be answered from the local tables.
+_MISSING = object()
+
+
+def _quote(name: str) -> str:
+    return f'"{name}"'
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime.datetime]:
+    return None if value is None else datetime.datetime.fromisoformat(value)
+
+
+def _request_types(cls: type) -> List[str]:
+    """Helper to get the request types referring to objects of class `cls`.
+
+    :noindex:
+    """
+    obj_types = [cls.__name__, cls.__name__.lower(), cls.__tablename__]
+    for klass in cls.__mro__:
+        for name in klass.__dict__.get("__relationships__", {}):
+            obj_types.append(f"{cls.__name__}.{name}")
+    return list(dict.fromkeys(obj_types))
+
+
+def _resolve_class(attr_type: Any) -> Tuple[Optional[type], bool]:
+    """Helper to get the class and whether it is a list from an attribute type.
+
+    :noindex:
+    """
+    is_list = getattr(attr_type, "__origin__", None) in (list, List)
+    if is_list:
+        attr_type = attr_type.__args__[0]
+    if attr_type.__class__.__name__ == "ForwardRef":
+        attr_type = attr_type.__forward_arg__
+    if isinstance(attr_type, str):
+        attr_type = objects.MODEL_NAMES.get(attr_type)
+    if not isinstance(attr_type, type):
+        return None, is_list
+    return attr_type, is_list
+
+
+class _Table:
+    """Column layout of the local table of a model class.
+
+    The columns are the attributes of the class (including inherited ones) that are
+    not relationships. Typed columns are stored using the matching SQLite type,
+    untyped columns (e.g. enums) are stored as is. Every row also stores which
+    columns were loaded, as a bit mask in the `_loaded` column, see :meth:`mask`.
+
+    :noindex:
+    """
+
+    def __init__(self, cls: Type[models.Base]):
+        self.cls = cls
+        self.name = cls.__tablename__
+        attr_types = {}
+        relationships = set()
+        for klass in reversed(cls.__mro__):
+            attr_types.update(klass.__dict__.get("__attr_base_classes__", {}))
+            relationships.update(klass.__dict__.get("__relationships__", {}))
+        self.attr_types = attr_types
+        #: Dictionary mapping column names to their python type (None if unknown).
+        self.columns: Dict[str, Optional[type]] = {}
+        for name in dir(cls):
+            if name.startswith("_") or name in relationships:
+                continue
+            if name not in cls.__lazy_attributes__:
+                continue
+            attr_type = attr_types.get(name)
+            self.columns[name] = attr_type if attr_type in _SQL_TYPES else None
+        self.primary_key = self._primary_key(cls)
+        #: Dictionary mapping column names to their bit in the `_loaded` mask, set by
+        #: the replica from its `_column` table.
+        self.bits: Dict[str, int] = {}
+        self.full_mask = 0
+        self._select = f"SELECT * FROM {_quote(self.name)}"
+
+    def _primary_key(self, cls: type) -> List[str]:
+        if "id" in self.columns:
+            return ["id"]
+        for x in getattr(cls, "__table_args__", ()):
+            if isinstance(x, models.UniqueConstraint):
+                return list(x.args)
+        return [x for x in self.columns if x.endswith("_id")]
+
+    def column_definition(self, name: str) -> str:
+        """SQL definition of column `name`."""
+        if name == _LOADED:
+            return f"{_quote(_LOADED)} INTEGER"
+        sql_type = _SQL_TYPES.get(self.columns[name], "")
+        return f"{_quote(name)} {sql_type}".rstrip()
+
+    def schema(self) -> str:
+        """SQL statement to create the table."""
+        columns = [self.column_definition(x) for x in [*self.columns, _LOADED]]
+        pk = ", ".join(_quote(x) for x in self.primary_key)
+        return (
+            f"CREATE TABLE IF NOT EXISTS {_quote(self.name)} "
+            f"({', '.join(columns)}, PRIMARY KEY ({pk}))"
+        )
+
+    def indexes(self) -> str:
+        """SQL statements to create the indexes of the table."""
+        statements = []
+        for name in self.columns:
+            if name in self.primary_key[:1]:
+                continue
+            if name == "bigg_id" or name.endswith("_id"):
+                statements.append(
+                    f"CREATE INDEX IF NOT EXISTS {_quote(f'{self.name}__{name}')} "
+                    f"ON {_quote(self.name)} ({_quote(name)})"
+                )
+        return ";\n".join(statements)
+
+    def encode(self, name: str, value: Any) -> Any:
+        """Convert a raw API value to the value stored in column `name`."""
+        if value is None:
+            return None
+        attr_type = self.columns[name]
+        if attr_type is datetime.datetime:
+            if isinstance(value, dict):
+                return value.get("iso")
+            if isinstance(value, datetime.datetime):
+                return value.isoformat()
+        if attr_type is bool:
+            return int(value)
+        if isinstance(value, (str, int, float)):
+            return value
+        return _MISSING
+
+    def set_bits(self, bits: Dict[str, int]):
+        """Set the bits of the columns in the `_loaded` mask."""
+        self.bits = {name: 1 << bits[name] for name in self.columns}
+        self.full_mask = sum(self.bits.values())
+
+    def mask(self, names: Iterable[str]) -> int:
+        """Get the `_loaded` mask of the columns `names`."""
+        return sum(self.bits[x] for x in names if x in self.bits)
+
+    def is_loaded(self, row: sqlite3.Row, name: str) -> bool:
+        """Whether column `name` of `row` was loaded (a non-NULL value always is)."""
+        return row[name] is not None or bool((row[_LOADED] or 0) & self.bits[name])
+
+    def is_complete(self, row: sqlite3.Row) -> bool:
+        """Whether all columns of `row` were loaded."""
+        if (row[_LOADED] or 0) == self.full_mask:
+            return True
+        return all(self.is_loaded(row, x) for x in self.columns)
+
+    def decode(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a row to a raw API object.
+
+        Columns that were not loaded are left out, such that they are lazy-loaded
+        when accessed, like the attributes missing from an API result.
+        """
+        d = {"_type": self.cls.__name__}
+        mask = row[_LOADED] or 0
+        for name, bit in self.bits.items():
+            value = row[name]
+            if value is None:
+                if not mask & bit:
+                    continue
+            else:
+                attr_type = self.columns[name]
+                if attr_type is bool:
+                    value = bool(value)
+                elif attr_type is datetime.datetime:
+                    value = {"_type": "datetime", "iso": value}
+            d[name] = value
+        return d
+
+    def upsert(self, names: Tuple[str, ...]) -> str:
+        """SQL statement to insert or update the values of columns `names`.
+
+        The `_loaded` mask of an existing row is combined with the new one.
+        """
+        columns = ", ".join(_quote(x) for x in names)
+        values = ", ".join("?" for _ in names)
+        updates = [
+            f"{_quote(x)} = excluded.{_quote(x)}"
+            for x in names
+            if x not in self.primary_key and x != _LOADED
+        ]
+        if _LOADED in names:
+            updates.append(
+                f"{_quote(_LOADED)} = "
+                f"coalesce({_quote(_LOADED)}, 0) | excluded.{_quote(_LOADED)}"
+            )
+        conflict = ", ".join(_quote(x) for x in self.primary_key)
+        sql = f"INSERT INTO {_quote(self.name)} ({columns}) VALUES ({values})"
+        if updates:
+            return f"{sql} ON CONFLICT ({conflict}) DO UPDATE SET {', '.join(updates)}"
+        return f"{sql} ON CONFLICT ({conflict}) DO NOTHING"
+
+
+class Replica:
+    """Client that answers BiGGr API requests from a local SQLite database.
+
+    The database contains one table per model class in :mod:`biggr.models`, with
+    indexes on all ID columns. It can be filled from a full or partial dump of raw
+    API objects using :meth:`load` or :meth:`load_file`. Objects are requested by
+    internal ID or BiGG ID, and relationships are resolved using the foreign key
+    columns of the local tables (`<name>_id` or the `<back_populates>_id` column of
+    the related table).
+
+    Rows store which of their columns were loaded. Objects of which not all columns
+    were loaded (e.g. objects that were only embedded in other API results) are
+    requested using the fallback client, and are otherwise answered without the
+    missing columns, such that these are lazy-loaded when accessed.
+
+    Requests that can not be answered locally are passed on to the `fallback`
+    client, and the results of these are stored in the replica. Unless the replica
+    is `complete`, relationships that refer to multiple objects (or from the other
+    side, e.g. `Model.model_count`) are only answered locally once they were
+    obtained from the fallback client, since the local tables may not contain all
+    related rows. The same holds for objects obtained from the fallback client in a
+    complete replica. Models that changed remotely are refreshed using
+    :meth:`sync`.
+
+    Parameters
+    ----------
+    path: str
+        Path of the SQLite database file. Parent directories are created if needed.
+    fallback: Client, optional
+        Client to pass requests on to that can not be answered locally. If None,
+        such requests return None.
+    store_fallback: bool
+        Store the objects obtained from the `fallback` client in the replica.
+    complete: bool
+        Whether the local tables contain all related rows of the stored objects,
+        e.g. after loading a full dump. Always the case without `fallback` client.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fallback: Optional[Client] = None,
+        store_fallback: bool = True,
+        complete: bool = False,
+    ):
+        self.path = os.path.expanduser(path)
+        self.fallback = fallback
+        self.store_fallback = store_fallback
+        self.complete = complete or fallback is None
+        if (dirname := os.path.dirname(self.path)) and not os.path.isdir(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._tables: Dict[type, _Table] = {
+            cls: _Table(cls) for cls in objects.MODEL_NAMES.values()
+        }
+        self._conn.executescript(
+            ";\n".join([_SCHEMA] + [x.schema() for x in self._tables.values()])
+        )
+        self._migrate()
+        self._conn.commit()
+        #: The response cache of the replica itself, always None.
+        self.cache = None
+        #: The replica always answers requests for multiple IDs at once.
+        self.supports_batch = True
+        #: Number of requests answered from the local tables.
+        self.hits = 0
+        #: Number of requests passed on to the fallback client.
+        self.request_count = 0
+
+    def _migrate(self):
+        """Helper to add the columns missing from existing tables, assign the bits
+        of the `_loaded` masks and create the indexes.
+
+        :noindex:
+        """
+        for table in self._tables.values():
+            existing = {
+                x["name"]
+                for x in self._conn.execute(f"PRAGMA table_info({_quote(table.name)})")
+            }
+            for name in [*table.columns, _LOADED]:
+                if name not in existing:
+                    self._conn.execute(
+                        f"ALTER TABLE {_quote(table.name)} "
+                        f"ADD COLUMN {table.column_definition(name)}"
+                    )
+            bits = dict(
+                self._conn.execute(
+                    'SELECT name, bit FROM _column WHERE "table" = ?', (table.name,)
+                ).fetchall()
+            )
+            for name in table.columns:
+                if name not in bits:
+                    bits[name] = max(bits.values(), default=-1) + 1
+                    self._conn.execute(
+                        "INSERT INTO _column VALUES (?, ?, ?)",
+                        (table.name, name, bits[name]),
+                    )
+            table.set_bits(bits)
+            self._conn.executescript(table.indexes())
+
+    def table(self, cls: Union[str, Type[models.Base]]) -> str:
+        """Get the name of the local table of model class `cls`."""
+        return self._tables[objects._get_model_class(cls)].name
+
+    # Loading
+
+    def _collect(
+        self,
+        o: Any,
+        rows: Dict[_Table, List[Tuple[Dict[str, Any], bool]]],
+        seen: set,
+        full: bool = True,
+    ):
+        """Helper to collect the (nested) objects in `o` per table.
+
+        Raw objects at the top level of `o` (e.g. the objects of an API result) are
+        collected as full objects, of which all columns are loaded. Of the other
+        objects, only the columns that are present are loaded.
+
+        :noindex:
+        """
+        if isinstance(o, (list, tuple)):
+            for x in o:
+                self._collect(x, rows, seen, full)
+        elif isinstance(o, models.Base):
+            if id(o) in seen:
+                return
+            seen.add(id(o))
+            d = o._to_shallow_dict()
+            for k, v in d.items():
+                if isinstance(v, (list, models.Base)):
+                    self._collect(v, rows, seen, False)
+            if (table := self._tables.get(type(o))) is not None:
+                rows.setdefault(table, []).append((d, False))
+        elif isinstance(o, dict):
+            cls = objects.MODEL_NAMES.get(o.get("_type"))
+            for v in o.values():
+                if isinstance(v, (list, dict)):
+                    # Values of a result dictionary are still at the top level.
+                    self._collect(v, rows, seen, full and cls is None)
+            if cls is not None:
+                rows.setdefault(self._tables[cls], []).append((o, full))
+
+    def load(self, objs: Any, partial: bool = False) -> int:
+        """Store objects in the replica, updating existing rows.
+
+        Parameters
+        ----------
+        objs: raw API objects, model objects or lists of these
+            The objects to store, including nested objects (e.g. the objects in an
+            API result). Only the attributes present in an object are updated, such
+            that partial objects can be loaded.
+        partial: bool
+            Whether the related rows of the objects may be missing, such that their
+            relationships are not answered locally by a complete replica.
+
+        Returns
+        -------
+        int
+            The number of stored rows.
+        """
+        rows: Dict[_Table, List[Tuple[Dict[str, Any], bool]]] = {}
+        self._collect(objs, rows, set())
+        count = 0
+        with self._lock:
+            for table, table_rows in rows.items():
+                statements: Dict[Tuple[str, ...], List[tuple]] = {}
+                for row, full in table_rows:
+                    values = {}
+                    for k, v in row.items():
+                        if k not in table.columns:
+                            continue
+                        if (v := table.encode(k, v)) is not _MISSING:
+                            values[k] = v
+                    if any(values.get(x) is None for x in table.primary_key):
+                        continue
+                    values[_LOADED] = table.full_mask if full else table.mask(values)
+                    names = tuple(values.keys())
+                    statements.setdefault(names, []).append(tuple(values.values()))
+                for names, params in statements.items():
+                    self._conn.executemany(table.upsert(names), params)
+                    count += len(params)
+                if partial and "id" in table.columns:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO _partial_object VALUES (?, ?)",
+                        [(table.name, x["id"]) for x, _ in table_rows if "id" in x],
+                    )
+            self._conn.commit()
+        return count
+
+    def load_file(self, path: str) -> int:
+        """Store the objects of a JSON or JSON lines dump file in the replica.
+
+        Parameters
+        ----------
+        path: str
+            Path of a file with one raw API object (or result) per line, or a JSON
+            file containing a list of raw API objects.
+
+        Returns
+        -------
+        int
+            The number of stored rows.
+        """
+        with open(os.path.expanduser(path)) as f:
+            first_char = f.read(1)
+            f.seek(0)
+            if first_char == "[":
+                return self.load(json.load(f))
+            count = 0
+            chunk = []
+            for line in f:
+                if not line.strip():
+                    continue
+                chunk.append(json.loads(line))
+                if len(chunk) >= LOAD_CHUNK_SIZE:
+                    count += self.load(chunk)
+                    chunk = []
+            return count + self.load(chunk)
+
+    # Lookups
+
+    def _select(self, table: _Table, column: str, value: Any) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(
+                f"{table._select} WHERE {_quote(column)} = ?", (value,)
+            ).fetchall()
+
+    def _get_object(self, cls: type, obj_id: Union[str, int]) -> Any:
+        table = self._tables.get(cls)
+        if table is None:
+            return _MISSING
+        column = "bigg_id" if isinstance(obj_id, str) else "id"
+        if column not in table.columns:
+            return _MISSING
+        rows = self._select(table, column, obj_id)
+        if not rows:
+            return _MISSING
+        if self.fallback is not None and not table.is_complete(rows[0]):
+            return _MISSING
+        return table.decode(rows[0])
+
+    def _get_related(self, cls: type, name: str, obj_id: int) -> Any:
+        table = self._tables.get(cls)
+        if table is None or not isinstance(obj_id, int):
+            return _MISSING
+        info = models.relationship_info(cls, name)
+        if info is None:
+            return _MISSING
+        related_cls, is_list = _resolve_class(table.attr_types.get(name))
+        related_table = self._tables.get(related_cls)
+        if related_table is None:
+            return _MISSING
+        if (fk := f"{name}_id") in table.columns:
+            rows = self._select(table, "id", obj_id)
+            if not rows or not table.is_loaded(rows[0], fk):
+                return _MISSING
+            if rows[0][fk] is None:
+                return None
+            return self._get_object(related_cls, rows[0][fk])
+        back_populates = info.kwargs.get("back_populates")
+        if back_populates is None:
+            return _MISSING
+        if (fk := f"{back_populates}_id") not in related_table.columns:
+            return _MISSING
+        if self.complete:
+            answer = not self._is_partial(table, obj_id)
+        else:
+            answer = False
+        if not answer and not self._is_loaded(table, name, obj_id):
+            return _MISSING
+        rows = self._select(related_table, fk, obj_id)
+        if self.fallback is not None and not all(
+            related_table.is_complete(x) for x in rows
+        ):
+            return _MISSING
+        related = [related_table.decode(x) for x in rows]
+        if is_list:
+            return related
+        return related[0] if related else None
+
+    def _is_loaded(self, table: _Table, name: str, obj_id: int) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM _loaded_relationship WHERE "table" = ? AND id = ? '
+                "AND name = ?",
+                (table.name, obj_id, name),
+            ).fetchone()
+        return row is not None
+
+    def _is_partial(self, table: _Table, obj_id: int) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM _partial_object WHERE "table" = ? AND id = ?',
+                (table.name, obj_id),
+            ).fetchone()
+        return row is not None
+
+    def _set_loaded(self, obj_type: str, obj_ids: List[Any], results: List[Any]):
+        """Helper to mark the relationships obtained from the fallback as loaded.
+
+        :noindex:
+        """
+        cls_name, _, name = obj_type.partition(".")
+        cls = objects._get_model_class(cls_name)
+        if cls not in self._tables or not name:
+            return
+        params = [
+            (self._tables[cls].name, x, name)
+            for x, result in zip(obj_ids, results)
+            if result is not None and isinstance(x, int)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO _loaded_relationship VALUES (?, ?, ?)", params
+            )
+            self._conn.commit()
+
+    def _lookup(self, obj_type: str, obj_id: Union[str, int]) -> Any:
+        """Helper to get a raw object (or list) from the local tables.
+
+        :noindex:
+        """
+        cls = objects._get_model_class(obj_type)
+        if cls is not None:
+            return self._get_object(cls, obj_id)
+        cls_name, _, name = obj_type.partition(".")
+        cls = objects._get_model_class(cls_name)
+        if cls is None or not name:
+            return _MISSING
+        return self._get_related(cls, name, obj_id)
+
+    # Client interface
+
+    def _fallback_request(
+        self,
+        api_url: str,
+        data: Dict[str, Any],
+        use_cache: bool = True,
+        store: bool = True,
+    ) -> Optional[Any]:
+        """Helper to make a request using the fallback client.
+
+        The result is stored in the replica if both `store` and
+        :attr:`store_fallback` are True.
+
+        :noindex:
+        """
+        if self.fallback is None:
+            return None
+        self.request_count += 1
+        result = self.fallback.request(api_url, data, use_cache=use_cache)
+        if store and self.store_fallback and result is not None:
+            self.load(result, partial=True)
+        return result
+
+    def _fallback_many(
+        self,
+        obj_type: str,
+        obj_ids: List[Any],
+        use_cache: bool = True,
+        store: bool = True,
+    ) -> List[Any]:
+        """Helper to get multiple raw objects using the fallback client.
+
+        :noindex:
+        """
+        api_url = objects.OBJECTS_API_URL
+        if self.fallback.supports_batch is not False:
+            result = self._fallback_request(
+                api_url,
+                {"type": obj_type, "ids": obj_ids},
+                use_cache=use_cache,
+                store=store,
+            )
+            objs = None if result is None else result.get("objects")
+            if isinstance(objs, list) and len(objs) == len(obj_ids):
+                self.fallback.supports_batch = True
+                return objs
+        objs = []
+        for obj_id in obj_ids:
+            result = self._fallback_request(
+                api_url,
+                {"type": obj_type, "id": obj_id},
+                use_cache=use_cache,
+                store=store,
+            )
+            if result is None:
+                objs.append(None)
+            elif "object" in result:
+                objs.append(result["object"])
+            else:
+                objs.append(result.get("objects"))
+        return objs
+
+    def request(
+        self, api_url: str, data: Dict[str, Any], use_cache: bool = True
+    ) -> Optional[Any]:
+        """Answer an API request from the local tables, see
+        :meth:`biggr.client.Client.request`.
+
+        Object requests (by single ID or multiple IDs) for model classes and
+        relationships (`<Class>.<name>`) are answered locally. Other requests and
+        objects that are not present locally are requested using the fallback
+        client. Paginated relationship requests (with an `offset` and `limit`) are
+        answered from the complete relationship.
+
+        If `use_cache` is False, the local tables and the response cache of the
+        fallback client are not used: the request is passed on to the fallback
+        client, and the result is stored. Without fallback client, the request is
+        still answered locally.
+        """
+        obj_type = data.get("type")
+        if api_url != objects.OBJECTS_API_URL or not isinstance(obj_type, str):
+            return self._fallback_request(api_url, data, use_cache=use_cache)
+        if "offset" in data or "limit" in data:
+            page = {k: data[k] for k in ("offset", "limit") if k in data}
+            data = {k: v for k, v in data.items() if k not in page}
+            result = self.request(api_url, data, use_cache=use_cache)
+            if result is None or not isinstance(result.get("objects"), list):
+                return result
+            objs = result["objects"]
+            start = page.get("offset") or 0
+            stop = None if page.get("limit") is None else start + page["limit"]
+            return {"objects": objs[start:stop], "total": len(objs)}
+        local = use_cache or self.fallback is None
+        if "ids" in data:
+            results = [
+                self._lookup(obj_type, x) if local else _MISSING for x in data["ids"]
+            ]
+            missing = [x for x, y in zip(data["ids"], results) if y is _MISSING]
+            if not missing:
+                self.hits += 1
+                return {"objects": results}
+            if self.fallback is None:
+                return {"objects": [None if x is _MISSING else x for x in results]}
+            fetched = self._fallback_many(obj_type, missing, use_cache=use_cache)
+            if self.store_fallback:
+                self._set_loaded(obj_type, missing, fetched)
+            fetched = iter(fetched)
+            return {"objects": [next(fetched) if x is _MISSING else x for x in results]}
+        result = self._lookup(obj_type, data.get("id")) if local else _MISSING
+        if result is _MISSING:
+            result = self._fallback_request(api_url, data, use_cache=use_cache)
+            if self.store_fallback and result is not None:
+                self._set_loaded(obj_type, [data.get("id")], [result])
+            return result
+        self.hits += 1
+        if isinstance(result, list):
+            return {"objects": result}
+        return {"object": result}
+
+    # Sync
+
+    def _remove_model(self, row: sqlite3.Row, keep_model: bool):
+        """Helper to remove the rows of a model that are refreshed by :meth:`sync`.
+
+        The removed objects are also removed from the identity map of the current
+        session and from the response cache of the fallback client.
+
+        :noindex:
+        """
+        model_table = self._tables[models.Model]
+        stale = {models.Model: [row["id"], row["bigg_id"]]}
+        with self._lock:
+            for name in SYNC_RELATIONSHIPS:
+                related_cls, _ = _resolve_class(model_table.attr_types[name])
+                related_table = self._tables[related_cls]
+                back_populates = models.relationship_info(models.Model, name).kwargs[
+                    "back_populates"
+                ]
+                fk = _quote(f"{back_populates}_id")
+                related_ids = [
+                    x[0]
+                    for x in self._conn.execute(
+                        f"SELECT id FROM {_quote(related_table.name)} WHERE {fk} = ?",
+                        (row["id"],),
+                    )
+                ]
+                self._conn.execute(
+                    f"DELETE FROM {_quote(related_table.name)} WHERE {fk} = ?",
+                    (row["id"],),
+                )
+                for marker_table in ("_loaded_relationship", "_partial_object"):
+                    self._conn.executemany(
+                        f'DELETE FROM {marker_table} WHERE "table" = ? AND id = ?',
+                        [(related_table.name, x) for x in related_ids],
+                    )
+                stale[related_cls] = related_ids
+            self._conn.execute(
+                'DELETE FROM _loaded_relationship WHERE "table" = ? AND id = ?',
+                (model_table.name, row["id"]),
+            )
+            if not keep_model:
+                self._conn.execute(
+                    f"DELETE FROM {_quote(model_table.name)} WHERE id = ?",
+                    (row["id"],),
+                )
+            self._conn.commit()
+        identity_map = get_session().identity_map
+        cache = getattr(self.fallback, "cache", None)
+        for cls, obj_ids in stale.items():
+            for obj_id in obj_ids:
+                identity_map.discard((cls, obj_id))
+            if cache is not None:
+                cache.invalidate_objects(_request_types(cls), obj_ids)
+
+    def sync(
+        self, model_ids: Optional[Iterable[Union[str, int]]] = None
+    ) -> Dict[str, str]:
+        """Refresh the models that changed remotely.
+
+        Compares the local and remote `date_modified` of every model in the replica
+        (or only the models in `model_ids`), using a single request. Only for models
+        that changed, the model and its relationships in :data:`SYNC_RELATIONSHIPS`
+        are requested again using the fallback client, replacing the local rows.
+        Stale objects are removed from the identity map of the current session and
+        from the response cache of the fallback client. Models that no longer exist
+        remotely are removed.
+
+        Parameters
+        ----------
+        model_ids: iterable of str or int, optional
+            Internal IDs or BiGG IDs of the models to sync. All local models are
+            synced if None.
+
+        Returns
+        -------
+        dict
+            Dictionary mapping the BiGG IDs of the synced models to "unchanged",
+            "updated" or "removed".
+        """
+        if self.fallback is None:
+            raise ValueError("A fallback client is required to sync a replica.")
+        model_table = self._tables[models.Model]
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, bigg_id, date_modified FROM {_quote(model_table.name)}"
+            ).fetchall()
+        if model_ids is not None:
+            model_ids = set(model_ids)
+            rows = [
+                x for x in rows if x["id"] in model_ids or x["bigg_id"] in model_ids
+            ]
+        if not rows:
+            return {}
+        # The results are stored below, after removing the stale rows.
+        remote_models = self._fallback_many(
+            "Model", [x["id"] for x in rows], use_cache=False, store=False
+        )
+        report = {}
+        for row, remote_model in zip(rows, remote_models):
+            if remote_model is not None and row["date_modified"] is not None:
+                remote_date = model_table.encode(
+                    "date_modified", remote_model.get("date_modified")
+                )
+                if _parse_datetime(remote_date) == _parse_datetime(
+                    row["date_modified"]
+                ):
+                    report[row["bigg_id"]] = "unchanged"
+                    continue
+            self._remove_model(row, keep_model=remote_model is not None)
+            if remote_model is None:
+                report[row["bigg_id"]] = "removed"
+                continue
+            self.load(remote_model)
+            for name in SYNC_RELATIONSHIPS:
+                obj_type = f"Model.{name}"
+                result = self._fallback_request(
+                    objects.OBJECTS_API_URL,
+                    {"type": obj_type, "id": row["id"]},
+                    use_cache=False,
+                    store=False,
+                )
+                if result is not None:
+                    self.load(result, partial=True)
+                    self._set_loaded(obj_type, [row["id"]], [result])
+            report[row["bigg_id"]] = "updated"
+        return report
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line interface to load dumps into a replica and to sync it.
+
+    :noindex:
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m biggr.replica",
+        description="Manage a local replica of the BiGGr database.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    load_parser = subparsers.add_parser("load", help="Load dump files.")
+    load_parser.add_argument("path", help="Path of the replica database.")
+    load_parser.add_argument("files", nargs="+", help="JSON (lines) dump files.")
+    sync_parser = subparsers.add_parser(
+        "sync", help="Refresh the models that changed remotely."
+    )
+    sync_parser.add_argument("path", help="Path of the replica database.")
+    sync_parser.add_argument(
+        "--model",
+        action="append",
+        dest="models",
+        help="BiGG ID of a model to sync (can be repeated), all models by default.",
+    )
+    sync_parser.add_argument(
+        "--cache", help="Path of the response cache to remove stale responses from."
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "load":
+        with Replica(args.path) as replica:
+            for path in args.files:
+                print(f"{path}: {replica.load_file(path)} rows")
+    elif args.command == "sync":
+        cache = None if args.cache is None else ResponseCache(args.cache)
+        with Replica(args.path, fallback=Client(cache=cache)) as replica:
+            report = replica.sync(args.models)
+            for bigg_id, status in report.items():
+                print(f"{bigg_id}: {status}")
+            print(f"{replica.request_count} requests")
+
+
+if __name__ == "__main__":
+    main()
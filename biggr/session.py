@@ -0,0 +1,186 @@
+"""Sessions bundling the state used to load objects from the BiGGr API."""
+
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, Optional, Union
+
+from biggr.client import Client, get_client, use_client
+from biggr.identity_map import IdentityMap
+
+_local = threading.local()
+_default_session: Optional["Session"] = None
+
+
+class Session:
+    """Holds an identity map, an HTTP client and a lazy loading policy.
+
+    Objects loaded while a session is active (see :meth:`activate`) are stored in the
+    identity map of that session, and their relationships are lazy-loaded using the
+    same session, also when accessed from a different thread. All methods are
+    thread-safe, and concurrent fetches of the same object are coalesced, such that
+    only one API request is made per key.
+
+    Parameters
+    ----------
+    client: Client or False, optional
+        HTTP client used for the requests of this session. A new client is created
+        if None. If False, the session has no client of its own and uses the client
+        of the current thread (see :func:`biggr.client.get_client`).
+    identity_map: IdentityMap, optional
+        Identity map to store loaded objects in. A new unbounded identity map is
+        created if None.
+    lazy_loading: bool
+        Load relationships automatically when they are accessed.
+
+    Examples
+    --------
+    >>> session = Session()
+    >>> with session.activate():
+    ...     model = objects.get("model", "iML1515")
+    """
+
+    def __init__(
+        self,
+        client: Union[Client, None, bool] = None,
+        identity_map: Optional[IdentityMap] = None,
+        lazy_loading: bool = True,
+    ):
+        self._client = Client() if client is None else client
+        self.identity_map = IdentityMap() if identity_map is None else identity_map
+        self.lazy_loading = lazy_loading
+        #: Reentrant lock guarding the identity map of this session.
+        self.lock = threading.RLock()
+        self._in_flight: Dict[Hashable, Future] = {}
+
+    def coalesce(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """Call `fetch`, unless a fetch for `key` is already running.
+
+        If another thread is already fetching `key`, waits for that fetch to finish
+        and returns its result instead of calling `fetch` again.
+        """
+        with self.lock:
+            future = self._in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._in_flight[key] = future
+        if not is_owner:
+            return future.result()
+        try:
+            result = fetch()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self._in_flight[key]
+
+    def get_or_fetch(self, cls: type, obj_id: Any, fetch: Callable[[], Any]) -> Any:
+        """Get the object of class `cls` from the identity map, or fetch it.
+
+        The fetch is coalesced with concurrent fetches of the same object, see
+        :meth:`coalesce`.
+        """
+        obj = self.identity_map.get((cls, obj_id))
+        if obj is not None:
+            return obj
+
+        def _fetch():
+            obj = self.identity_map.get((cls, obj_id))
+            if obj is not None:
+                return obj
+            return fetch()
+
+        return self.coalesce((cls, obj_id), _fetch)
+
+    @property
+    def client(self) -> Client:
+        """HTTP client used for the requests of this session."""
+        return get_client() if self._client is False else self._client
+
+    @contextmanager
+    def activate(self):
+        """Context manager to use this session in the current thread."""
+        prev_session = getattr(_local, "session", None)
+        _local.session = self
+        try:
+            if self._client is False:
+                yield self
+            else:
+                with use_client(self._client):
+                    yield self
+        finally:
+            _local.session = prev_session
+
+
+def get_session() -> Session:
+    """Get the session that is active in the current thread.
+
+    Returns the default session if no session was activated using
+    :meth:`Session.activate`.
+    """
+    session = getattr(_local, "session", None)
+    if session is not None:
+        return session
+    return _default_session
+
+
+def set_default_session(session: Session):
+    """Set the session that is used when no session is active.
+
+    :noindex:
+    """
+    global _default_session
+    _default_session = session
+
+
+@contextmanager
+def use_session(session: Session):
+    """Context manager to use `session` in the current thread, if not active yet.
+
+    :noindex:
+    """
+    if getattr(_local, "session", None) is session:
+        yield session
+    else:
+        with session.activate():
+            yield session
+
+
+class DefaultSession(Session):
+    """Session that is used when no other session is active.
+
+    Uses the process-wide (or thread-specific) client from :mod:`biggr.client`, and
+    the module-level :data:`biggr.models.OBJECT_CACHE` and
+    :data:`biggr.models.LAZY_LOADING` settings, such that these can still be changed
+    directly.
+
+    :noindex:
+    """
+
+    def __init__(self, models_module):
+        self._models = models_module
+        self._client = False
+        self.lock = threading.RLock()
+        self._in_flight = {}
+
+    @property
+    def identity_map(self) -> IdentityMap:
+        return self._models.OBJECT_CACHE
+
+    @property
+    def lazy_loading(self) -> bool:
+        return self._models.LAZY_LOADING
+
+    @contextmanager
+    def activate(self):
+        prev_session = getattr(_local, "session", None)
+        _local.session = None
+        try:
+            yield self
+        finally:
+            _local.session = prev_session
@@ -0,0 +1,307 @@
+"""Array-backed taxonomy tree with fast ancestor queries.
+
+Walking up :attr:`biggr.models.Taxon.parent` until a rank is found requests every
+parent and rank one by one. A :class:`TaxonomyTree` requests the lineages of many
+taxa in bulk, one request per level, and answers ancestor queries without any
+further requests:
+
+>>> tree = TaxonomyTree.load([m.taxon_id for m in models])
+>>> family = tree.ancestor_at_rank(model.taxon_id, "family")
+>>> tree.name(family)
+'Enterobacteriaceae'
+
+The tree can be saved to a file with :meth:`TaxonomyTree.save` and read again with
+:meth:`TaxonomyTree.from_file`.
+"""
+
+import json
+import os
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from biggr import models, objects
+from biggr.objects import DEFAULT_BATCH_SIZE
+
+
+class TaxonomyTree:
+    """Taxonomy tree (or forest) stored in arrays.
+
+    Taxa are stored by index, with the index of their parent (-1 for roots) and the
+    code of their rank. An Euler tour of the tree gives:
+
+    - :meth:`is_descendant` in constant time, by comparing the entry and exit
+      positions of the taxa in the tour;
+    - :meth:`lca` in constant time, using a sparse table of minimum depths over the
+      tour;
+    - :meth:`ancestor_at_rank` in constant time, after a single pass over the tree
+      per rank.
+
+    Taxa are identified by their ID (the NCBI taxonomy ID). A taxon that is its own
+    parent (like the NCBI root) is a root.
+
+    Parameters
+    ----------
+    taxa: iterable of tuple
+        The `(taxon ID, parent ID, name, rank name)` of every taxon. Parents that are
+        not in `taxa` are ignored.
+    """
+
+    def __init__(
+        self,
+        taxa: Iterable[Tuple[int, Optional[int], Optional[str], Optional[str]]],
+    ):
+        taxa = list(taxa)
+        self._index: Dict[int, int] = {x[0]: i for i, x in enumerate(taxa)}
+        #: Taxon ID of every index.
+        self.taxon_ids = array("q", (x[0] for x in taxa))
+        #: Index of the parent of every index, -1 for roots.
+        self.parents = array("l", [-1] * len(taxa))
+        for i, (taxon_id, parent_id, _, _) in enumerate(taxa):
+            if parent_id is not None and parent_id != taxon_id:
+                self.parents[i] = self._index.get(parent_id, -1)
+        self.names: List[Optional[str]] = [x[2] for x in taxa]
+        #: Rank names, indexed by the rank codes.
+        self.rank_names: List[Optional[str]] = list(dict.fromkeys(x[3] for x in taxa))
+        rank_codes = {name: i for i, name in enumerate(self.rank_names)}
+        #: Rank code of every index.
+        self.rank_codes = array("h", (rank_codes[x[3]] for x in taxa))
+        self._rank_ancestors: Dict[str, array] = {}
+        self._build_tour()
+
+    def _build_tour(self):
+        """Helper to compute the Euler tour and the sparse table over it.
+
+        :noindex:
+        """
+        n = len(self.taxon_ids)
+        children: List[List[int]] = [[] for _ in range(n)]
+        roots = []
+        for i, parent in enumerate(self.parents):
+            if parent == -1:
+                roots.append(i)
+            else:
+                children[parent].append(i)
+        self.depths = array("l", [0] * n)
+        self.roots = array("l", [0] * n)
+        self._first = array("l", [0] * n)
+        self._last = array("l", [0] * n)
+        self._order = array("l")
+        tour = array("l")
+        for root in roots:
+            stack = [(root, 0)]
+            while stack:
+                i, child_pos = stack.pop()
+                if child_pos == 0:
+                    self._first[i] = len(tour)
+                    self._order.append(i)
+                    self.roots[i] = root
+                    parent = self.parents[i]
+                    self.depths[i] = 0 if parent == -1 else self.depths[parent] + 1
+                tour.append(i)
+                if child_pos < len(children[i]):
+                    stack.append((i, child_pos + 1))
+                    stack.append((children[i][child_pos], 0))
+                else:
+                    self._last[i] = len(tour) - 1
+        if len(self._order) != n:
+            raise ValueError("The parents of the taxa contain a cycle.")
+        # self._sparse[k][j] is the taxon with the minimum depth in
+        # tour[j : j + 2 ** k].
+        depths = self.depths
+        sparse = [tour]
+        k = 1
+        while 2**k <= len(tour):
+            prev = sparse[-1]
+            half = 2 ** (k - 1)
+            sparse.append(
+                array(
+                    "l",
+                    (
+                        a if depths[a] <= depths[b] else b
+                        for a, b in zip(prev, prev[half:])
+                    ),
+                )
+            )
+            k += 1
+        self._sparse = sparse
+
+    @classmethod
+    def load(
+        cls, taxon_ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> "TaxonomyTree":
+        """Request the lineages of taxa in bulk and create a tree of them.
+
+        The taxa are requested one level at a time, with one bulk request per level,
+        followed by a bulk request for their ranks.
+
+        Parameters
+        ----------
+        taxon_ids: iterable of int
+            IDs of the taxa, e.g. the `taxon_id` of models.
+        batch_size: int
+            Maximum number of IDs per request.
+
+        Returns
+        -------
+        TaxonomyTree
+            The tree of the taxa and all their ancestors.
+        """
+        raw_taxa: Dict[int, Dict[str, Any]] = {}
+        pending = {x for x in taxon_ids if x is not None}
+        while pending:
+            found = objects._get_raw_by_id(models.Taxon, pending, batch_size)
+            pending = set()
+            for taxon_id, taxon in found.items():
+                if taxon is None:
+                    continue
+                raw_taxa[taxon_id] = taxon
+                parent_id = taxon.get("parent_id")
+                if parent_id is not None and parent_id not in raw_taxa:
+                    pending.add(parent_id)
+            pending -= raw_taxa.keys()
+            pending -= found.keys()
+        ranks = objects._get_raw_by_id(
+            models.TaxonomicRank,
+            (x.get("rank_id") for x in raw_taxa.values()),
+            batch_size,
+        )
+        return cls(
+            (
+                taxon_id,
+                x.get("parent_id"),
+                x.get("name"),
+                (ranks.get(x.get("rank_id")) or {}).get("name"),
+            )
+            for taxon_id, x in raw_taxa.items()
+        )
+
+    def save(self, path: str):
+        """Save the tree as a JSON file, which can be read using :meth:`from_file`."""
+        path = os.path.expanduser(path)
+        if (dirname := os.path.dirname(path)) and not os.path.isdir(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        taxa = [
+            [
+                taxon_id,
+                None if parent == -1 else self.taxon_ids[parent],
+                name,
+                self.rank_names[rank_code],
+            ]
+            for taxon_id, parent, name, rank_code in zip(
+                self.taxon_ids, self.parents, self.names, self.rank_codes
+            )
+        ]
+        with open(path, "w") as f:
+            json.dump({"taxa": taxa}, f, separators=(",", ":"))
+
+    @classmethod
+    def from_file(cls, path: str) -> "TaxonomyTree":
+        """Read a tree saved using :meth:`save`."""
+        with open(os.path.expanduser(path)) as f:
+            data = json.load(f)
+        return cls(tuple(x) for x in data["taxa"])
+
+    def _i(self, taxon_id: int) -> int:
+        try:
+            return self._index[taxon_id]
+        except KeyError:
+            raise KeyError(f"Taxon {taxon_id} is not in the tree.") from None
+
+    def __len__(self) -> int:
+        return len(self.taxon_ids)
+
+    def __contains__(self, taxon_id: int) -> bool:
+        return taxon_id in self._index
+
+    def parent(self, taxon_id: int) -> Optional[int]:
+        """Get the ID of the parent of a taxon, None for a root."""
+        parent = self.parents[self._i(taxon_id)]
+        return None if parent == -1 else self.taxon_ids[parent]
+
+    def name(self, taxon_id: int) -> Optional[str]:
+        """Get the name of a taxon."""
+        return self.names[self._i(taxon_id)]
+
+    def rank(self, taxon_id: int) -> Optional[str]:
+        """Get the rank name of a taxon."""
+        return self.rank_names[self.rank_codes[self._i(taxon_id)]]
+
+    def depth(self, taxon_id: int) -> int:
+        """Get the number of ancestors of a taxon."""
+        return self.depths[self._i(taxon_id)]
+
+    def lineage(self, taxon_id: int) -> List[int]:
+        """Get the IDs of a taxon and its ancestors, from the taxon to the root."""
+        result = []
+        i = self._i(taxon_id)
+        while i != -1:
+            result.append(self.taxon_ids[i])
+            i = self.parents[i]
+        return result
+
+    def is_descendant(self, taxon_id: int, ancestor_id: int) -> bool:
+        """Check whether a taxon is (a descendant of) another taxon."""
+        i = self._i(taxon_id)
+        j = self._i(ancestor_id)
+        return self._first[j] <= self._first[i] <= self._last[j]
+
+    def lca(self, taxon_a: int, taxon_b: int) -> Optional[int]:
+        """Get the ID of the lowest common ancestor of two taxa.
+
+        Returns None if the taxa are in different trees (e.g. if the lineage of one
+        of them could not be loaded completely).
+        """
+        i = self._i(taxon_a)
+        j = self._i(taxon_b)
+        if self.roots[i] != self.roots[j]:
+            return None
+        lo, hi = sorted((self._first[i], self._first[j]))
+        k = (hi - lo + 1).bit_length() - 1
+        row = self._sparse[k]
+        a = row[lo]
+        b = row[hi - 2**k + 1]
+        return self.taxon_ids[a if self.depths[a] <= self.depths[b] else b]
+
+    def _ancestors_at_rank(self, rank: str) -> array:
+        """Helper to get the index of the ancestor at `rank` of every index.
+
+        Computed once per rank, in a single pass over the taxa in tour order (which
+        visits parents before their children).
+
+        :noindex:
+        """
+        key = rank.lower()
+        ancestors = self._rank_ancestors.get(key)
+        if ancestors is None:
+            codes = {
+                i
+                for i, name in enumerate(self.rank_names)
+                if name is not None and name.lower() == key
+            }
+            ancestors = array("l", [-1] * len(self.taxon_ids))
+            for i in self._order:
+                if self.rank_codes[i] in codes:
+                    ancestors[i] = i
+                elif (parent := self.parents[i]) != -1:
+                    ancestors[i] = ancestors[parent]
+            self._rank_ancestors[key] = ancestors
+        return ancestors
+
+    def ancestor_at_rank(self, taxon_id: int, rank: str) -> Optional[int]:
+        """Get the ID of the ancestor of a taxon at a rank.
+
+        Parameters
+        ----------
+        taxon_id: int
+            ID of the taxon.
+        rank: str
+            Name of the rank (case-insensitive), e.g. "family". A taxon of this rank
+            is its own ancestor at the rank.
+
+        Returns
+        -------
+        int or None
+            The ID of the ancestor, None if the taxon has no ancestor at `rank`.
+        """
+        ancestor = self._ancestors_at_rank(rank)[self._i(taxon_id)]
+        return None if ancestor == -1 else self.taxon_ids[ancestor]
@@ -30,4 +30,10 @@ setup(
     keywords="systems biology, genome-scale model",
     packages=find_packages(),
     install_requires=install_requires,
+    extras_require={
+        # Dependencies of optional modules.
+        "aio": ["httpx>=0.23"],
+        "matrix": ["numpy>=1.22", "scipy>=1.8"],
+        "hashing": ["numpy>=1.22"],
+    },
 )
@@ -0,0 +1,237 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from biggr import client, models
+
+
+class FakeResponse:
+    """Response of a :class:`FakeAPI` request, like a `requests.Response`."""
+
+    def __init__(self, status_code: int, body: Any):
+        self.status_code = status_code
+        self.content = json.dumps(body).encode()
+
+    def iter_content(self, chunk_size: int):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i : i + chunk_size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeAPI(client.Client):
+    """Client answering object requests from in-memory raw objects.
+
+    Objects are added using :meth:`add`, list relationships using :meth:`relate`.
+    Requests for multiple IDs are answered if `batch` is True, and with status 400
+    otherwise. List relationship requests with a `limit` are paginated, returning at
+    most `max_limit` objects per page. Statuses in `errors` are returned for the next
+    requests instead of an answer.
+    """
+
+    def __init__(self, batch: bool = True, max_limit: Optional[int] = None):
+        super().__init__()
+        self.batch = batch
+        self.max_limit = max_limit
+        self.errors: List[int] = []
+        #: The data of all requests, in order.
+        self.requests: List[Dict[str, Any]] = []
+        self._objects: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        self._relationships: Dict[Tuple[str, int], List[Tuple[str, int]]] = {}
+
+    def add(self, obj_type: str, **attrs) -> Dict[str, Any]:
+        raw = {"_type": obj_type, **attrs}
+        self._objects[(obj_type, attrs["id"])] = raw
+        if "bigg_id" in attrs:
+            self._objects[(obj_type, attrs["bigg_id"])] = raw
+        return raw
+
+    def relate(self, obj_type: str, obj_id: int, related: List[Dict[str, Any]]):
+        self._relationships[(obj_type, obj_id)] = [
+            (x["_type"], x["id"]) for x in related
+        ]
+
+    def _answer(self, obj_type: str, obj_id: Any) -> Any:
+        if "." in obj_type:
+            related = self._relationships.get((obj_type, obj_id))
+            if related is None:
+                return None
+            return [self._objects[x] for x in related]
+        return self._objects.get((obj_type, obj_id))
+
+    def post(self, api_url: str, data: Dict[str, Any], stream: bool = False):
+        with self._lock:
+            self.request_count += 1
+        self.requests.append(data)
+        if self.errors:
+            return FakeResponse(self.errors.pop(0), {})
+        obj_type = data["type"]
+        if "ids" in data:
+            if not self.batch:
+                return FakeResponse(400, {"detail": "Unknown parameter 'ids'."})
+            return FakeResponse(
+                200, {"objects": [self._answer(obj_type, x) for x in data["ids"]]}
+            )
+        result = self._answer(obj_type, data["id"])
+        if "." not in obj_type:
+            return FakeResponse(200, {"object": result})
+        if result is None:
+            return FakeResponse(404, {})
+        if "limit" not in data:
+            return FakeResponse(200, {"objects": result})
+        limit = data["limit"]
+        if self.max_limit is not None:
+            limit = min(limit, self.max_limit)
+        offset = data.get("offset", 0)
+        return FakeResponse(
+            200, {"objects": result[offset : offset + limit], "total": len(result)}
+        )
+
+
+@pytest.fixture
+def api():
+    """A :class:`FakeAPI` used as the process-wide client, with a new identity
+    map."""
+    fake_api = FakeAPI()
+    client.set_client(fake_api)
+    models.set_identity_map()
+    yield fake_api
+    client.set_client(None)
+    models.set_identity_map()
+
+
+@pytest.fixture
+def network(api):
+    """A model "iTEST" with two reactions, in `api`.
+
+    HEX1: glc_c + atp_c -> g6p_c + adp_c (the objective), and GLCt: glc_e -> glc_c,
+    stored reversed. glc_e is not a metabolite of the model.
+    """
+    api.add("Compartment", id=1, bigg_id="c", name="cytosol")
+    api.add("Compartment", id=2, bigg_id="e", name="extracellular")
+    for i, (bigg_id, formula, charge) in enumerate(
+        [
+            ("glc__D", "C6H12O6", 0),
+            ("g6p", "C6H11O9P", -2),
+            ("atp", "C10H12N5O13P3", -4),
+            ("adp", "C10H12N5O10P2", -3),
+        ],
+        start=1,
+    ):
+        api.add(
+            "Component",
+            id=i,
+            bigg_id=bigg_id,
+            name=bigg_id,
+            formula=formula,
+            charge=charge,
+        )
+        api.add(
+            "CompartmentalizedComponent",
+            id=i,
+            bigg_id=f"{bigg_id}_c",
+            component_id=i,
+            compartment_id=1,
+        )
+    api.add(
+        "CompartmentalizedComponent",
+        id=5,
+        bigg_id="glc__D_e",
+        component_id=1,
+        compartment_id=2,
+    )
+    api.add("Model", id=1, bigg_id="iTEST")
+    api.relate(
+        "Model.model_compartmentalized_components",
+        1,
+        [
+            api.add(
+                "ModelCompartmentalizedComponent",
+                id=i,
+                bigg_id=f"{bigg_id}_c",
+                model_id=1,
+                compartmentalized_component_id=i,
+            )
+            for i, bigg_id in enumerate(["glc__D", "g6p", "atp", "adp"], start=1)
+        ],
+    )
+    reactions = {
+        "HEX1": {1: -1, 3: -1, 2: 1, 4: 1},
+        "GLCt": {5: -1, 1: 1},
+    }
+    cc_bigg_ids = {
+        1: "glc__D_c",
+        2: "g6p_c",
+        3: "atp_c",
+        4: "adp_c",
+        5: "glc__D_e",
+    }
+    matrix_id = 1
+    for i, (bigg_id, participants) in enumerate(reactions.items(), start=1):
+        rows = []
+        for cc_id, coefficient in participants.items():
+            api.add("UniversalReactionMatrix", id=matrix_id, coefficient=coefficient)
+            rows.append(
+                api.add(
+                    "ReactionMatrix",
+                    id=matrix_id,
+                    reaction_id=i,
+                    compartmentalized_component_id=cc_id,
+                    universal_reaction_matrix_id=matrix_id,
+                )
+            )
+            matrix_id += 1
+        api.relate("Reaction.matrix", i, rows)
+        api.add("UniversalReaction", id=i, bigg_id=bigg_id, name=f"{bigg_id} name")
+        reaction_hash = models.Reaction.generate_hash(
+            {
+                "compartmentalized_component_bigg_id": cc_bigg_ids[cc_id],
+                "coefficient": coefficient,
+            }
+            for cc_id, coefficient in participants.items()
+        )
+        api.add(
+            "Reaction",
+            id=i,
+            bigg_id=bigg_id,
+            hash=reaction_hash,
+            universal_reaction_id=i,
+        )
+    api.relate(
+        "Model.model_reactions",
+        1,
+        [
+            api.add(
+                "ModelReaction",
+                id=1,
+                bigg_id="HEX1",
+                model_id=1,
+                reaction_id=1,
+                lower_bound=0.0,
+                upper_bound=1000.0,
+                objective_coefficient=1.0,
+                gene_reaction_rule="b1",
+            ),
+            api.add(
+                "ModelReaction",
+                id=2,
+                bigg_id="GLCt",
+                model_id=1,
+                reaction_id=2,
+                reversed=True,
+                lower_bound=-1000.0,
+                upper_bound=10.0,
+                objective_coefficient=0.0,
+            ),
+        ],
+    )
+    api.add("Gene", id=1, bigg_id="b1", name="glk")
+    api.relate(
+        "Model.model_genes", 1, [api.add("ModelGene", id=1, model_id=1, gene_id=1)]
+    )
+    return api
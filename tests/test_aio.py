@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+from biggr import aio, models
+from biggr.cache import ResponseCache
+from biggr.client import get_client
+
+
+def _client(api, **kwargs):
+    """An AsyncClient answering requests using `api`."""
+
+    def handler(request):
+        r = api.post(str(request.url), json.loads(request.content))
+        return httpx.Response(r.status_code, content=r.content)
+
+    client = aio.AsyncClient(**kwargs)
+    client.http = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+@pytest.fixture
+def model(api):
+    api.add("Taxon", id=5, name="Escherichia coli")
+    api.add("Model", id=1, bigg_id="iTEST", taxon_id=5)
+    reactions = [
+        api.add("ModelReaction", id=i, bigg_id=f"R{i}", model_id=1, reaction_id=i)
+        for i in range(1, 4)
+    ]
+    for i in range(1, 4):
+        api.add("Reaction", id=i, bigg_id=f"R{i}")
+    api.relate("Model.model_reactions", 1, reactions)
+    return api
+
+
+def test_load_many(model):
+    async def main():
+        async with _client(model) as client, aio.use_client(client):
+            m = await aio.get("Model", "iTEST")
+            assert models._loaded_value(m, "taxon") is models.PropertyNotLoaded
+            taxon = await m.aload("taxon")
+            model_reactions = await m.aload("model_reactions")
+            await aio.load_many(model_reactions, "reaction")
+            n_requests = client.request_count
+            await aio.load_many(model_reactions, "reaction")
+            assert client.request_count == n_requests
+            return taxon, model_reactions
+
+    taxon, model_reactions = asyncio.run(main())
+    assert taxon.name == "Escherichia coli"
+    assert [x.reaction.bigg_id for x in model_reactions] == ["R1", "R2", "R3"]
+
+
+def test_cache(model, tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+
+    async def main():
+        for _ in range(2):
+            async with _client(model, cache=cache) as client, aio.use_client(client):
+                assert (await aio.get("Model", 1)).bigg_id == "iTEST"
+
+    asyncio.run(main())
+    assert len(model.requests) == 1
+    assert cache.hits == 1
+
+
+def test_default_client_is_closed():
+    async def main():
+        return aio.get_client()
+
+    client = asyncio.run(main())
+    assert client.http.is_closed
+
+    async def main_closed():
+        client = aio.get_client()
+        await aio.close_default_client()
+        assert client.http.is_closed
+        assert aio.get_client() is not client
+
+    asyncio.run(main_closed())
+
+
+def test_session_has_no_client(api):
+    client = aio.AsyncClient()
+    assert client.session.client is api
+    with client.session.activate():
+        assert get_client() is api
+    asyncio.run(client.http.aclose())
+
+
+def test_failed_requests_are_logged(api, caplog):
+    api.errors = [500]
+
+    async def main():
+        async with _client(api) as client, aio.use_client(client):
+            return await aio.get("Model", 1)
+
+    assert asyncio.run(main()) is None
+    assert "Status code 500" in caplog.records[0].getMessage()
+    assert caplog.records[0].name == "biggr.aio"
@@ -0,0 +1,92 @@
+import itertools
+
+import pytest
+
+from biggr import models
+from biggr.annotation_index import AnnotatedObject, AnnotationIndex
+
+
+@pytest.fixture
+def annotated_network(network):
+    ids = itertools.count(1)
+    network.add("DataSource", id=1, bigg_id="CHEBI")
+    network.add("DataSource", id=2, bigg_id="kegg.compound")
+    network.add("DataSource", id=3, bigg_id="rhea")
+
+    def annotate(owner_type, owner_id, links):
+        annotation_id = next(ids)
+        network.add("Annotation", id=annotation_id, bigg_id=f"a{annotation_id}")
+        mapping = network.add(
+            f"{owner_type}AnnotationMapping",
+            id=annotation_id,
+            annotation_id=annotation_id,
+        )
+        network.relate(f"{owner_type}.annotation_mappings", owner_id, [mapping])
+        network.relate(
+            "Annotation.links",
+            annotation_id,
+            [
+                network.add(
+                    "AnnotationLink",
+                    id=next(ids),
+                    data_source_id=data_source_id,
+                    identifier=identifier,
+                )
+                for data_source_id, identifier in links
+            ],
+        )
+
+    annotate("Component", 1, [(1, "CHEBI:4167"), (2, "C00031")])
+    annotate("Component", 3, [(1, "CHEBI:30616"), (2, "C00002")])
+    network.add("ReferenceCompound", id=1, bigg_id="CHEBI:30616")
+    network.relate(
+        "Component.reference_mappings",
+        3,
+        [
+            network.add(
+                "ComponentReferenceMapping",
+                id=1,
+                component_id=3,
+                reference_compound_id=1,
+            )
+        ],
+    )
+    annotate("ReferenceCompound", 1, [(1, "CHEBI:30616")])
+    annotate("Reaction", 1, [(3, "RHEA:17825")])
+    return network
+
+
+def test_build_persist_reopen(annotated_network, tmp_path):
+    path = str(tmp_path / "index" / "annotations.sqlite")
+    with AnnotationIndex(path) as index:
+        assert index.add_model("iTEST") == 6
+    n_requests = annotated_network.request_count
+
+    with AnnotationIndex(path) as index:
+        assert len(index) == 6
+        atp = AnnotatedObject("Component", 3, "atp")
+        assert index.lookup("CHEBI", "CHEBI:30616") == [
+            atp,
+            AnnotatedObject("ReferenceCompound", 1, "CHEBI:30616"),
+        ]
+        assert index.lookup("chebi", "CHEBI:30616", models.Component) == [atp]
+        assert index.lookup("KEGG.compound", "C00031") == [
+            AnnotatedObject("Component", 1, "glc__D")
+        ]
+        assert index.lookup("rhea", "RHEA:17825") == [
+            AnnotatedObject("Reaction", 1, "HEX1")
+        ]
+        assert index.lookup("CHEBI", "CHEBI:15422") == []
+        assert index.resolve(["kegg.compound:C00002", "CHEBI:4167"]) == {
+            "kegg.compound:C00002": [atp],
+            "CHEBI:4167": [AnnotatedObject("Component", 1, "glc__D")],
+        }
+        with pytest.raises(ValueError):
+            index.resolve(["C00002"])
+    assert annotated_network.request_count == n_requests
+
+
+def test_unannotated_type(tmp_path):
+    with AnnotationIndex(str(tmp_path / "annotations.sqlite")) as index:
+        with pytest.raises(ValueError):
+            index.lookup("CHEBI", "CHEBI:15422", models.Model)
@@ -0,0 +1,61 @@
+from biggr import cache
+from biggr.cache import ResponseCache
+
+URL = "https://biggr.org/api/v3/objects/"
+
+
+def _data(i):
+    return {"type": "Model", "id": i}
+
+
+def test_size_of_replaced_responses(tmp_path):
+    response_cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    response_cache.set(URL, _data(1), {"object": "x" * 100})
+    response_cache.set(URL, _data(1), {"object": "x" * 10})
+    response_cache.set(URL, _data(2), {"object": "y" * 50})
+    assert response_cache._size == response_cache.size()
+    assert len(response_cache) == 2
+
+
+def test_replaced_responses_are_not_evicted(tmp_path):
+    response_cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_size=200)
+    for _ in range(10):
+        response_cache.set(URL, _data(1), {"object": "x" * 100})
+    assert response_cache.get(URL, _data(1)) == {"object": "x" * 100}
+
+
+def test_access_times_are_written_in_bulk(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "ACCESS_FLUSH_SIZE", 3)
+    response_cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    for i in range(3):
+        response_cache.set(URL, _data(i), {"object": i})
+
+    def accessed():
+        return dict(
+            response_cache._conn.execute(
+                "SELECT json_extract(request, '$.id'), accessed FROM response"
+            ).fetchall()
+        )
+
+    before = accessed()
+    assert response_cache.get(URL, _data(0)) == {"object": 0}
+    assert response_cache.get(URL, _data(1)) == {"object": 1}
+    assert accessed() == before
+    assert response_cache.get(URL, _data(0)) == {"object": 0}
+    assert accessed() == before
+    assert response_cache.get(URL, _data(2)) == {"object": 2}
+    after = accessed()
+    assert all(after[i] > before[i] for i in range(3))
+    assert response_cache.hits == 4
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    response_cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_size=60)
+    response_cache.set(URL, _data(1), {"object": "a" * 10})
+    response_cache.set(URL, _data(2), {"object": "b" * 10})
+    assert response_cache.get(URL, _data(1)) is not None
+    # The pending access time of response 1 is written before evicting.
+    response_cache.set(URL, _data(3), {"object": "c" * 10})
+    assert response_cache.get(URL, _data(1)) is not None
+    assert response_cache.get(URL, _data(2)) is None
+    assert response_cache._size == response_cache.size()
@@ -0,0 +1,48 @@
+from biggr import objects
+
+
+def _add_models(api, n=3):
+    for i in range(1, n + 1):
+        api.add("Model", id=i, bigg_id=f"m{i}")
+
+
+def test_batch_requests_are_detected(api):
+    _add_models(api)
+    raw = objects.get_many_raw("Model", [1, 2, 3])
+    assert [x["bigg_id"] for x in raw] == ["m1", "m2", "m3"]
+    assert api.supports_batch is True
+    assert api.request_count == 1
+
+
+def test_rejected_batch_requests_are_latched(api):
+    _add_models(api)
+    api.batch = False
+    raw = objects.get_many_raw("Model", [1, 2, 3])
+    assert [x["bigg_id"] for x in raw] == ["m1", "m2", "m3"]
+    assert api.supports_batch is False
+    n_requests = api.request_count
+    objects.get_many_raw("Model", [1, 2])
+    assert api.request_count == n_requests + 2
+    assert all("ids" not in x for x in api.requests[n_requests:])
+
+
+def test_failed_batch_requests_are_not_latched(api):
+    _add_models(api)
+    api.errors = [500]
+    raw = objects.get_many_raw("Model", [1, 2, 3])
+    assert [x["bigg_id"] for x in raw] == ["m1", "m2", "m3"]
+    assert api.supports_batch is None
+    assert api.request_count == 4
+
+    raw = objects.get_many_raw("Model", [3, 1])
+    assert [x["bigg_id"] for x in raw] == ["m3", "m1"]
+    assert api.supports_batch is True
+    assert api.request_count == 5
+
+
+def test_failed_requests_are_logged(api, caplog, capsys):
+    api.errors = [500]
+    assert objects.get_raw("Model", 1) is None
+    assert "Status code 500" in caplog.records[0].getMessage()
+    assert caplog.records[0].levelname == "WARNING"
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,182 @@
+import cobra as cobrapy
+import pytest
+from cobra.util.solver import linear_reaction_coefficients
+
+from biggr import cobra, models, objects
+from biggr.models import CompartmentalizedComponent
+
+
+@pytest.fixture
+def pyruvate(api):
+    api.add("Component", id=1, bigg_id="pyr", formula="C3H3O3", charge=-1)
+    return CompartmentalizedComponent(id=10, bigg_id="pyr_c", component_id=1)
+
+
+def _model():
+    metabolite = cobrapy.Metabolite("x_c", formula="C3H3O3", charge=-1)
+    metabolite.annotation["CHEBI"] = ["CHEBI:15361"]
+    model = cobrapy.Model("iTEST")
+    model.add_metabolites([metabolite])
+    return model, metabolite
+
+
+def test_identifier_key():
+    assert cobra._identifier_key("CHEBI:15361") == ("CHEBI", "15361")
+    assert cobra._identifier_key("chebi:CHEBI:15361") == ("CHEBI", "15361")
+    assert cobra._identifier_key("seed.compound:cpd00020") == (
+        "SEED.COMPOUND",
+        "cpd00020",
+    )
+
+
+def test_find_metabolites_normalizes_identifiers(pyruvate, monkeypatch):
+    requested = []
+
+    def get_metabolites_by_identifiers(identifiers, model_bigg_id=None):
+        requested.extend(identifiers)
+        if any(x.startswith("CHEBI:") for x in identifiers):
+            # Keys are not echoed exactly as requested.
+            return {"chebi:CHEBI:15361": pyruvate}
+        return {x: None for x in identifiers}
+
+    monkeypatch.setattr(
+        objects, "get_metabolites_by_identifiers", get_metabolites_by_identifiers
+    )
+    model, metabolite = _model()
+    matches, failures = cobra.find_metabolites(model)
+    assert "CHEBI:15361" in requested
+    assert matches == {metabolite: pyruvate}
+    assert failures == {}
+
+
+def test_find_metabolites_failed_request(api, monkeypatch):
+    monkeypatch.setattr(
+        objects, "get_metabolites_by_identifiers", lambda *args, **kwargs: None
+    )
+    model, metabolite = _model()
+    matches, failures = cobra.find_metabolites(model)
+    assert matches == {}
+    assert failures == {metabolite: "no candidates found for any annotation"}
+    assert cobra.find_metabolite(metabolite) is None
+
+
+def _components(api, n):
+    """Add `n` compartmentalized components with references and annotations."""
+    api.add("DataSource", id=1, bigg_id="CHEBI")
+    api.add("DataSource", id=2, bigg_id="seed.compound")
+    ccs = []
+    for i in range(1, n + 1):
+        api.add("UniversalCompartmentalizedComponent", id=i, bigg_id=f"m{i}_c")
+        api.add("Component", id=i, bigg_id=f"m{i}", name=f"met {i}")
+        api.add(
+            "InChI",
+            id=i,
+            formula="C6H12O6",
+            key_major="WQZGKKKJIJFFOK",
+            key_minor=f"{i:010d}",
+            key_proton="N",
+        )
+        api.add("ReferenceCompound", id=i, bigg_id=f"CHEBI:{i}", inchi_id=i)
+        reference_mapping = api.add(
+            "ComponentReferenceMapping", id=i, component_id=i, reference_compound_id=i
+        )
+        api.relate("Component.reference_mappings", i, [reference_mapping])
+        for j, mapping_type, owner_type in [
+            (2 * i, "ReferenceCompoundAnnotationMapping", "ReferenceCompound"),
+            (2 * i + 1, "ComponentAnnotationMapping", "Component"),
+        ]:
+            api.add("Annotation", id=j, bigg_id=f"a{j}")
+            mapping = api.add(mapping_type, id=j, annotation_id=j)
+            api.relate(f"{owner_type}.annotation_mappings", i, [mapping])
+            links = [
+                api.add(
+                    "AnnotationLink",
+                    id=2 * j,
+                    identifier=f"CHEBI:{i}",
+                    data_source_id=1,
+                ),
+                api.add(
+                    "AnnotationLink",
+                    id=2 * j + 1,
+                    identifier=f"cpd{j:05d}",
+                    data_source_id=2,
+                ),
+            ]
+            api.relate("Annotation.links", j, links)
+        ccs.append(
+            api.add(
+                "CompartmentalizedComponent",
+                id=i,
+                bigg_id=f"m{i}_c",
+                component_id=i,
+                universal_compartmentalized_component_id=i,
+            )
+        )
+    return ccs
+
+
+def _matches(n):
+    model = cobrapy.Model("iTEST")
+    model.add_metabolites([cobrapy.Metabolite(f"x{i}_c") for i in range(1, n + 1)])
+    ccs = objects.get_many(CompartmentalizedComponent, list(range(1, n + 1)))
+    return model, dict(zip(model.metabolites, ccs))
+
+
+@pytest.mark.parametrize("n, n_single_requests", [(1, 13), (3, 35)])
+def test_update_metabolites(api, n, n_single_requests):
+    _components(api, n)
+    model, matches = _matches(n)
+    n_requests = api.request_count
+    assert cobra.update_metabolites(model, matches) == model.metabolites
+    # A fixed number of requests per relationship level, independent of n.
+    assert api.request_count - n_requests == 12
+    metabolite = model.metabolites[-1]
+    assert metabolite.id == f"m{n}_c"
+    assert metabolite.name == f"met {n}"
+    assert dict(metabolite.annotation) == {
+        "BiGGr": [f"m{n}_c"],
+        "InChIKey": [f"WQZGKKKJIJFFOK-{n:010d}-N"],
+        "CHEBI": [f"CHEBI:{n}"],
+        "seed.compound": [f"cpd{2 * n:05d}", f"cpd{2 * n + 1:05d}"],
+    }
+
+    annotations = [dict(x.annotation) for x in model.metabolites]
+    models.set_identity_map()
+    model, matches = _matches(n)
+    n_requests = api.request_count
+    for metabolite, cc in matches.items():
+        cobra.update_metabolite(metabolite, cc)
+    assert [dict(x.annotation) for x in model.metabolites] == annotations
+    assert api.request_count - n_requests == n_single_requests
+
+
+def test_to_cobra_model(network):
+    model = cobra.to_cobra_model("iTEST")
+    assert len(model.metabolites) == 5
+    assert len(model.reactions) == 2
+    assert len(model.genes) == 1
+    assert model.compartments == {"c": "cytosol", "e": "extracellular"}
+
+    hex1 = model.reactions.get_by_id("HEX1")
+    assert hex1.bounds == (0.0, 1000.0)
+    assert hex1.name == "HEX1 name"
+    assert hex1.gene_reaction_rule == "b1"
+    assert model.genes.b1.name == "glk"
+    assert {m.id: c for m, c in hex1.metabolites.items()} == {
+        "glc__D_c": -1,
+        "atp_c": -1,
+        "g6p_c": 1,
+        "adp_c": 1,
+    }
+    glct = model.reactions.get_by_id("GLCt")
+    assert glct.bounds == (-1000.0, 10.0)
+    assert {m.id: c for m, c in glct.metabolites.items()} == {
+        "glc__D_e": 1,
+        "glc__D_c": -1,
+    }
+    assert linear_reaction_coefficients(model) == {hex1: 1.0}
+
+    glc = model.metabolites.get_by_id("glc__D_c")
+    assert (glc.formula, glc.charge, glc.compartment) == ("C6H12O6", 0, "c")
+    assert glc.annotation == {"BiGGr": ["glc__D_c"]}
+    assert network.request_count == 15
@@ -0,0 +1,79 @@
+import cobra as cobrapy
+import pytest
+
+from biggr import cobra, formula
+from biggr.models import (
+    Component,
+    ComponentReferenceMapping,
+    InChI,
+    ReferenceCompound,
+)
+
+
+def test_parse_formula():
+    assert formula.parse_formula("H2O") == (("H", 2), ("O", 1))
+    assert formula.parse_formula("Ca(OH)2") == (("Ca", 1), ("H", 2), ("O", 2))
+    assert formula.parse_formula("(C5H8O4)n") is None
+
+
+@pytest.mark.parametrize(
+    "formula_a, formula_b, charge_a, charge_b, expected",
+    [
+        ("C6H12O6", "H12O6C6", None, None, True),
+        ("C3H3O3", "C3H4O3", None, None, False),
+        ("C3H3O3", "C3H4O3", -1, 0, True),
+        ("C3H3O3", "C3H4O3", -1.0, 0.0, True),
+        ("C3H3O3", "C3H4O3", -0.5, 0, False),
+        ("C3H3O3", "C3H3O3", 0.5, 0, False),
+        ("C3H4O3", "C3H4O3", 0.5, 0.5, False),
+        (None, "", None, None, True),
+    ],
+)
+def test_same_formula(formula_a, formula_b, charge_a, charge_b, expected):
+    assert formula.same_formula(formula_a, formula_b, charge_a, charge_b) == expected
+
+
+def _pyruvate_inchi():
+    # InChI=1S/C3H4O3/c1-2(4)3(5)6/h1H3,(H,5,6)/p-1
+    return InChI(formula="C3H4O3", p="-1", q=None)
+
+
+def test_inchi_formula():
+    counts, charge = formula.inchi_formula(_pyruvate_inchi())
+    assert counts == (("C", 3), ("H", 3), ("O", 3))
+    assert charge == -1
+    assert formula.same_inchi_formula("C3H3O3", -1, _pyruvate_inchi())
+    assert formula.same_inchi_formula("C3H4O3", 0, _pyruvate_inchi())
+    assert not formula.same_inchi_formula("C3H4O3", -1, _pyruvate_inchi())
+    assert not formula.same_inchi_formula("C3H4O3", None, _pyruvate_inchi())
+    assert not formula.same_inchi_formula("C3H4O3", 0.5, _pyruvate_inchi())
+
+
+def _metabolite(formula, charge):
+    metabolite = cobrapy.Metabolite("pyr_c", formula=formula)
+    metabolite.charge = charge
+    return metabolite
+
+
+def test_proton_adjusted_species(api):
+    component = Component(id=1, formula="C3H3O3", charge=-1)
+    assert cobra._same_species(component, _metabolite("C3H4O3", 0), True)
+    assert not cobra._same_species(component, _metabolite("C3H4O3", 0), False)
+    assert not cobra._same_species(component, _metabolite("C3H4O3", None), True)
+    assert not cobra._same_species(component, _metabolite("C3H4O3", 0.5), True)
+
+
+def test_proton_adjusted_species_by_inchi(api):
+    compound = ReferenceCompound(id=2, inchi=_pyruvate_inchi())
+    component = Component(
+        id=1,
+        formula=None,
+        charge=None,
+        reference_mappings=[
+            ComponentReferenceMapping(id=3, reference_compound=compound)
+        ],
+    )
+    assert cobra._same_species(component, _metabolite("C3H4O3", 0), True)
+    assert cobra._same_species(component, _metabolite("C3H2O3", -2), True)
+    assert not cobra._same_species(component, _metabolite("C3H4O3", -1), True)
+    assert not cobra._same_species(component, _metabolite("C3H4O3", None), True)
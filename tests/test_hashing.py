@@ -0,0 +1,125 @@
+import random
+
+import numpy as np
+import pytest
+
+from biggr import hashing
+from biggr.models import Reaction, ReferenceReaction, UniversalReaction
+
+IDS = [f"m{i}_c" for i in range(30)] + ["Z", "a", "é"]
+VALUES = [1, 2, -1, 0.5, -0.5, 1.5, -2.0, 3, 1 / 3, float("inf"), -7, 2.5e-7]
+REFERENCE_VALUES = VALUES + ["n", "2n", "x", "1.5", "-3"]
+
+
+def _random_columns(n_reactions=500, seed=1):
+    rnd = random.Random(seed)
+    reaction_index, participant_ids, coefficients, reference_coefficients = (
+        [],
+        [],
+        [],
+        [],
+    )
+    for r in range(n_reactions):
+        for _ in range(rnd.randint(1, 9)):
+            reaction_index.append(r)
+            participant_ids.append(rnd.choice(IDS))
+            coefficients.append(rnd.choice(VALUES))
+            reference_coefficients.append(rnd.choice(REFERENCE_VALUES))
+    # A reaction with a hash longer than HASH_STR_MAX_LEN.
+    for i in range(800):
+        reaction_index.append(n_reactions)
+        participant_ids.append(f"long_met_{i}_c")
+        coefficients.append(1.5)
+        reference_coefficients.append(1.5)
+    return reaction_index, participant_ids, coefficients, reference_coefficients
+
+
+def _group(reaction_index, participant_ids, coefficients, id_key):
+    participants = {}
+    for r, p_id, coefficient in zip(reaction_index, participant_ids, coefficients):
+        participants.setdefault(r, []).append(
+            {id_key: p_id, "coefficient": coefficient}
+        )
+    return participants
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_batch_hashes_match_scalar_hashes(monkeypatch, max_workers):
+    monkeypatch.setattr(hashing, "PARALLEL_MIN_PARTICIPANTS", 0)
+    reaction_index, participant_ids, coefficients, reference_coefficients = (
+        _random_columns()
+    )
+
+    participants = _group(
+        reaction_index,
+        participant_ids,
+        coefficients,
+        "compartmentalized_component_bigg_id",
+    )
+    expected = {r: Reaction.generate_hash(x) for r, x in participants.items()}
+    assert (
+        hashing.reaction_hashes(
+            reaction_index, participant_ids, coefficients, max_workers=max_workers
+        )
+        == expected
+    )
+
+    participants = _group(
+        reaction_index,
+        participant_ids,
+        coefficients,
+        "universal_compartmentalized_component_bigg_id",
+    )
+    expected = {r: UniversalReaction.generate_hash(x) for r, x in participants.items()}
+    assert (
+        hashing.universal_reaction_hashes(
+            reaction_index, participant_ids, coefficients, max_workers=max_workers
+        )
+        == expected
+    )
+
+    participants = _group(
+        reaction_index,
+        participant_ids,
+        reference_coefficients,
+        "reference_compound_bigg_id",
+    )
+    for pattern in (False, True):
+        expected = {
+            r: ReferenceReaction.generate_hash(x, pattern=pattern)
+            for r, x in participants.items()
+        }
+        assert (
+            hashing.reference_reaction_hashes(
+                reaction_index,
+                participant_ids,
+                reference_coefficients,
+                pattern=pattern,
+                max_workers=max_workers,
+            )
+            == expected
+        )
+
+
+@pytest.mark.parametrize("dtype", [np.int64, np.float64])
+def test_numpy_input_matches_scalar_hashes(dtype):
+    reaction_index = np.array([0, 0, 1, 1, 1])
+    participant_ids = np.array(["a_c", "b_c", "a_c", "c_c", "a_c"])
+    coefficients = np.array([-1, 1, -2, 1, 3], dtype=dtype)
+
+    hashes = hashing.reaction_hashes(reaction_index, participant_ids, coefficients)
+
+    participants = _group(
+        reaction_index.tolist(),
+        participant_ids.tolist(),
+        coefficients.tolist(),
+        "compartmentalized_component_bigg_id",
+    )
+    assert hashes == {r: Reaction.generate_hash(x) for r, x in participants.items()}
+    assert hashes == {0: "-1$a_c/1$b_c", 1: "-1$a_c/-1$c_c"}
+    assert all(type(r) is int for r in hashes)
+
+
+def test_columns_of_different_length():
+    with pytest.raises(ValueError):
+        hashing.reaction_hashes([0, 0], ["a_c"], [1.0, -1.0])
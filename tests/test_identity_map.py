@@ -0,0 +1,97 @@
+import gc
+
+import pytest
+
+from biggr import models, objects
+from biggr.identity_map import (
+    IdentityMap,
+    LRUIdentityMap,
+    WeakIdentityMap,
+    create_identity_map,
+)
+from biggr.models import Model, Reaction
+
+
+class Obj:
+    pass
+
+
+def test_lru_eviction_order():
+    identity_map = LRUIdentityMap(max_size=3)
+    for i in range(1, 4):
+        identity_map[(Model, i)] = Obj()
+    assert identity_map.get((Model, 1)) is not None
+    identity_map[(Model, 4)] = Obj()
+    assert list(identity_map) == [(Model, 3), (Model, 1), (Model, 4)]
+    identity_map.get((Model, 3))
+    identity_map[(Model, 5)] = Obj()
+    assert list(identity_map) == [(Model, 4), (Model, 3), (Model, 5)]
+    assert identity_map.evictions == 2
+
+
+def test_lru_class_quotas():
+    identity_map = LRUIdentityMap(max_size=10, class_quotas={Reaction: 2})
+    for i in range(1, 4):
+        identity_map[(Model, i)] = Obj()
+        identity_map[(Reaction, i)] = Obj()
+    assert (Reaction, 1) not in identity_map
+    assert [(Model, 1), (Model, 2), (Model, 3)] == [
+        k for k in identity_map if k[0] is Model
+    ]
+    identity_map.get((Reaction, 2))
+    identity_map[(Reaction, 4)] = Obj()
+    assert [k for k in identity_map if k[0] is Reaction] == [
+        (Reaction, 2),
+        (Reaction, 4),
+    ]
+    assert identity_map.evictions == 2
+
+    del identity_map[(Reaction, 2)]
+    identity_map[(Reaction, 5)] = Obj()
+    assert (Reaction, 4) in identity_map
+    assert identity_map.evictions == 2
+
+
+def test_weak_entries_are_dropped():
+    identity_map = WeakIdentityMap()
+    obj = Obj()
+    kept = Obj()
+    identity_map[(Model, 1)] = obj
+    identity_map[(Model, 2)] = kept
+    assert identity_map.get((Model, 1)) is obj
+    del obj
+    gc.collect()
+    assert (Model, 1) not in identity_map
+    assert identity_map.get((Model, 1)) is None
+    assert identity_map.items() == [((Model, 2), kept)]
+    assert identity_map.evictions == 1
+
+
+def test_stats():
+    identity_map = IdentityMap()
+    identity_map[(Model, 1)] = Obj()
+    identity_map.get((Model, 1))
+    identity_map.get((Model, 1))
+    identity_map.get((Model, 2))
+    with pytest.raises(KeyError):
+        identity_map[(Model, 3)]
+    assert identity_map.stats() == {"hits": 2, "misses": 2, "evictions": 0, "size": 1}
+
+
+def test_weak_identity_map_in_session(api):
+    api.add("Model", id=1, bigg_id="iTEST")
+    identity_map = models.set_identity_map("weak")
+    model = objects.get("Model", 1)
+    assert objects.get("Model", 1) is model
+    assert api.request_count == 1
+    del model
+    gc.collect()
+    model = objects.get("Model", 1)
+    assert model.bigg_id == "iTEST"
+    assert api.request_count == 2
+    assert identity_map.stats()["evictions"] == 1
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        create_identity_map("fifo")
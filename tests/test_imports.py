@@ -0,0 +1,38 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Modules with their optional dependencies.
+MODULES = {
+    "biggr.models": [],
+    "biggr.objects": [],
+    "biggr.pagination": [],
+    "biggr.session": [],
+    "biggr.replica": [],
+    "biggr.formula": [],
+    "biggr.reaction_index": [],
+    "biggr.annotation_index": [],
+    "biggr.taxonomy": [],
+    "biggr.aio": ["httpx"],
+    "biggr.hashing": ["numpy"],
+    "biggr.matrix": ["numpy", "scipy"],
+    "biggr.cobra": ["cobra"],
+}
+
+
+@pytest.mark.parametrize("module", sorted(MODULES))
+def test_import_first(module):
+    # Every module can be imported first, in a fresh interpreter.
+    for dependency in MODULES[module]:
+        if importlib.util.find_spec(dependency) is None:
+            pytest.skip(f"{dependency} is not installed")
+    result = subprocess.run(
+        [sys.executable, "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
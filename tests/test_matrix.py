@@ -0,0 +1,35 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from biggr import matrix
+
+
+@pytest.mark.parametrize("sparse_format", ["csc", "csr"])
+def test_build_stoichiometry(network, sparse_format):
+    stoich = matrix.build_stoichiometry("iTEST", sparse_format=sparse_format)
+    assert stoich.S.format == sparse_format
+    assert stoich.S.shape == (5, 2)
+    assert list(stoich.metabolite_ids) == [
+        "glc__D_c",
+        "g6p_c",
+        "atp_c",
+        "adp_c",
+        "glc__D_e",
+    ]
+    assert list(stoich.reaction_ids) == ["HEX1", "GLCt"]
+    # Substrates are negative; GLCt is reversed, so glc__D_e is its product.
+    np.testing.assert_array_equal(
+        stoich.S.toarray(),
+        [[-1, -1], [1, 0], [-1, 0], [1, 0], [0, 1]],
+    )
+    np.testing.assert_array_equal(stoich.lower_bound, [0, -1000])
+    np.testing.assert_array_equal(stoich.upper_bound, [1000, 10])
+    np.testing.assert_array_equal(stoich.objective_coefficient, [1, 0])
+    assert network.request_count == 6
+
+
+def test_unknown_sparse_format(network):
+    with pytest.raises(ValueError):
+        matrix.build_stoichiometry("iTEST", sparse_format="coo")
@@ -0,0 +1,81 @@
+import weakref
+
+import biggr
+from biggr import models, objects
+from biggr.models import Model, PropertyNotLoaded
+
+
+def test_class_attributes_are_not_loaded():
+    assert Model.taxon is PropertyNotLoaded
+    assert Model.bigg_id is PropertyNotLoaded
+    assert "taxon" in Model.__lazy_attributes__
+
+
+def test_attributes_are_stored_in_instance_dict(api):
+    api.add("Taxon", id=5, name="Escherichia coli")
+    api.add("Model", id=1, bigg_id="iTEST", taxon_id=5, new_field=3)
+    model = objects.get("Model", 1)
+    assert model.__dict__["bigg_id"] == "iTEST"
+    assert model.new_field == 3
+    assert models._loaded_value(model, "taxon") is PropertyNotLoaded
+    assert model.taxon.name == "Escherichia coli"
+    assert model.__dict__["taxon"] is model.taxon
+    assert model._to_shallow_dict() == {
+        "_type": "Model",
+        "id": 1,
+        "bigg_id": "iTEST",
+        "taxon_id": 5,
+        "new_field": 3,
+        "taxon": model.taxon,
+    }
+    assert weakref.ref(model)() is model
+
+
+def test_lazy_loading_disabled(api, monkeypatch):
+    monkeypatch.setattr(models, "LAZY_LOADING", False)
+    api.add("Model", id=1, bigg_id="iTEST", taxon_id=5)
+    model = objects.get("Model", 1)
+    assert model.taxon is PropertyNotLoaded
+    assert api.request_count == 1
+
+
+def _model_reactions(api, n):
+    api.add("Model", id=1, bigg_id="iTEST")
+    model_reactions = [
+        api.add("ModelReaction", id=i, bigg_id=f"R{i}", model_id=1, reaction_id=i)
+        for i in range(1, n + 1)
+    ]
+    for i in range(1, n + 1):
+        api.add("Reaction", id=i, bigg_id=f"R{i}")
+    api.relate("Model.model_reactions", 1, model_reactions)
+
+
+def test_lazy_loads_without_batch(api):
+    _model_reactions(api, 5)
+    model_reactions = objects.get("Model.model_reactions", 1)
+    assert [x.reaction.bigg_id for x in model_reactions] == [
+        f"R{i}" for i in range(1, 6)
+    ]
+    assert api.request_count == 6
+
+
+def test_batch_loads_relationships_in_bulk(api):
+    _model_reactions(api, 5)
+    with biggr.batch():
+        model_reactions = objects.get("Model.model_reactions", 1)
+        reactions = [x.reaction for x in model_reactions]
+    assert [x.bigg_id for x in reactions] == [f"R{i}" for i in range(1, 6)]
+    assert api.request_count == 2
+    assert api.requests[1] == {"type": "Reaction", "ids": [1, 2, 3, 4, 5]}
+
+
+def test_batch_size(api):
+    _model_reactions(api, 5)
+    with biggr.batch(batch_size=2):
+        model_reactions = objects.get("Model.model_reactions", 1)
+        assert model_reactions[4].reaction.bigg_id == "R5"
+    assert [len(x["ids"]) for x in api.requests[1:]] == [2, 2, 1]
+    assert all(
+        models._loaded_value(x, "reaction") is not PropertyNotLoaded
+        for x in model_reactions
+    )
@@ -0,0 +1,87 @@
+import pytest
+
+from biggr import client, models, objects
+
+
+@pytest.fixture
+def model_reactions(api):
+    api.add("Model", id=1, bigg_id="iTEST")
+    reactions = [
+        api.add("ModelReaction", id=i, bigg_id=f"R{i}", model_id=1, reaction_id=i)
+        for i in range(1, 51)
+    ]
+    api.relate("Model.model_reactions", 1, reactions)
+    return api
+
+
+@pytest.mark.parametrize("chunk_size", [16, client.STREAM_CHUNK_SIZE])
+def test_iter_objects(model_reactions, monkeypatch, chunk_size):
+    monkeypatch.setattr(client, "STREAM_CHUNK_SIZE", chunk_size)
+    streamed = list(objects.iter_objects("Model.model_reactions", 1))
+    assert [x.bigg_id for x in streamed] == [f"R{i}" for i in range(1, 51)]
+    assert all(isinstance(x, models.ModelReaction) for x in streamed)
+
+    models.set_identity_map()
+    loaded = objects.get("Model.model_reactions", 1)
+    columns = ["id", "bigg_id", "model_id", "reaction_id"]
+    assert [[getattr(x, c) for c in columns] for x in streamed] == [
+        [getattr(x, c) for c in columns] for x in loaded
+    ]
+
+
+def test_iter_objects_single_object(model_reactions):
+    (model,) = objects.iter_objects(models.Model, "iTEST")
+    assert model is objects.get("Model", 1)
+
+
+@pytest.fixture
+def model_graph(api):
+    api.add("TaxonomicRank", id=2, name="species")
+    api.add("Taxon", id=5, name="Escherichia coli", rank_id=2)
+    api.add("Model", id=1, bigg_id="iTEST", taxon_id=5)
+    model_reactions = [
+        api.add(
+            "ModelReaction", id=i, bigg_id=f"R{i}", model_id=1, reaction_id=1 + i % 3
+        )
+        for i in range(1, 7)
+    ]
+    for i in range(1, 4):
+        api.add("Reaction", id=i, bigg_id=f"R{i}", universal_reaction_id=10 + i % 2)
+    for i in range(10, 12):
+        api.add("UniversalReaction", id=i, bigg_id=f"U{i}")
+    api.relate("Model.model_reactions", 1, model_reactions)
+    return api
+
+
+INCLUDE = ["taxon.rank", "model_reactions.reaction.universal_reaction"]
+
+
+def test_prefetch_requests_per_level(model_graph):
+    model = objects.get("Model", 1)
+    report = objects.prefetch(model, INCLUDE)
+    assert [(x["names"], x["objects"], x["requests"]) for x in report] == [
+        (["taxon", "model_reactions"], 2, 2),
+        (["rank", "reaction"], 7, 2),
+        (["universal_reaction"], 6, 1),
+    ]
+    assert model_graph.request_count == 6
+
+    assert model.taxon.rank.name == "species"
+    assert sorted(
+        {x.reaction.universal_reaction.bigg_id for x in model.model_reactions}
+    ) == ["U10", "U11"]
+    assert model_graph.request_count == 6
+
+
+def test_get_include(model_graph, caplog):
+    caplog.set_level("INFO", logger="biggr.objects")
+    model = objects.get("Model", "iTEST", include=INCLUDE)
+    assert model_graph.request_count == 6
+    assert [r.getMessage() for r in caplog.records] == [
+        "Prefetch level 1 (taxon, model_reactions): 2 requests for 2 objects.",
+        "Prefetch level 2 (rank, reaction): 2 requests for 7 objects.",
+        "Prefetch level 3 (universal_reaction): 1 requests for 6 objects.",
+    ]
+    reactions = [x.reaction.bigg_id for x in model.model_reactions]
+    assert reactions == ["R2", "R3", "R1"] * 2
+    assert model_graph.request_count == 6
@@ -0,0 +1,61 @@
+import pytest
+
+from biggr import objects
+from biggr.pagination import LazyCollection
+from biggr.session import get_session
+
+
+@pytest.fixture
+def model_reactions(api):
+    api.add("Model", id=1, bigg_id="iTEST")
+    reactions = [
+        api.add("ModelReaction", id=i, bigg_id=f"R{i}", model_id=1)
+        for i in range(1, 251)
+    ]
+    api.relate("Model.model_reactions", 1, reactions)
+    return api
+
+
+@pytest.mark.parametrize("max_limit", [None, 100, 30])
+def test_pages(model_reactions, max_limit):
+    model_reactions.max_limit = max_limit
+    collection = LazyCollection.load("Model.model_reactions", 1, page_size=70)
+    assert len(collection) == 250
+    assert collection[150].id == 151
+    assert collection[-1].id == 250
+    assert [x.id for x in collection[95:105]] == list(range(96, 106))
+    assert [x.id for x in collection] == list(range(1, 251))
+    assert collection.loaded
+    assert [x.id for x in collection.loaded_objects()] == list(range(1, 251))
+    with pytest.raises(IndexError):
+        collection[250]
+
+
+def test_short_page_size_is_kept(model_reactions):
+    model_reactions.max_limit = 100
+    collection = LazyCollection.load("Model.model_reactions", 1, page_size=1000)
+    assert collection.page_size == 100
+    assert [x.id for x in collection] == list(range(1, 251))
+    assert len(model_reactions.requests) == 3
+    assert [x["offset"] for x in model_reactions.requests] == [0, 100, 200]
+
+
+def test_load_coalesce_key(model_reactions, monkeypatch):
+    session = get_session()
+    keys = []
+
+    def coalesce(key, fetch):
+        keys.append(key)
+        return fetch()
+
+    monkeypatch.setattr(session, "coalesce", coalesce)
+    LazyCollection.load("Model.model_reactions", 1, page_size=70)
+    objects.get("Model.model_reactions", 1)
+    assert keys[0] == ("page", "Model.model_reactions", 1, 70)
+    assert keys[1] != keys[0]
+
+
+def test_lazily_loaded_relationship(model_reactions):
+    model = objects.get("Model", 1)
+    assert isinstance(model.model_reactions, LazyCollection)
+    assert len(model.model_reactions) == 250
@@ -0,0 +1,103 @@
+import random
+import re
+
+import pytest
+
+from biggr import models
+from biggr.reaction_index import ReactionIndex, ReferenceReactionMatcher
+
+
+def _hash(participants):
+    return models.Reaction.generate_hash(
+        {"compartmentalized_component_bigg_id": k, "coefficient": v}
+        for k, v in participants.items()
+    )
+
+
+HEX1 = {"glc__D_c": -1, "atp_c": -1, "g6p_c": 1, "adp_c": 1}
+
+
+def test_lookup(network, tmp_path):
+    path = str(tmp_path / "index" / "reactions.sqlite")
+    with ReactionIndex(path) as index:
+        assert index.add_model("iTEST") == 2
+        assert len(index) == 2
+        assert index.lookup(_hash(HEX1)) == ["HEX1"]
+        # The hash does not depend on the direction of the reaction.
+        assert index.lookup(_hash({k: -v for k, v in HEX1.items()})) == ["HEX1"]
+        assert index.lookup(_hash({"glc__D_c": 1, "glc__D_e": -1})) == ["GLCt"]
+        assert index.lookup(_hash({"glc__D_c": 1, "g6p_c": -1})) == []
+        assert index.lookup(_hash(HEX1), models.UniversalReaction) == []
+
+    with ReactionIndex(path) as index:
+        assert index.lookup(_hash(HEX1)) == ["HEX1"]
+        assert index.duplicates() == {}
+        network.add("Reaction", id=3, bigg_id="HEX1_copy", hash=_hash(HEX1))
+        assert index.add_ids([3]) == 1
+        assert index.lookup(_hash(HEX1)) == ["HEX1", "HEX1_copy"]
+        assert index.duplicates() == {_hash(HEX1): ["HEX1", "HEX1_copy"]}
+
+
+def test_unhashed_type(tmp_path):
+    with ReactionIndex(str(tmp_path / "reactions.sqlite")) as index:
+        with pytest.raises(ValueError):
+            index.lookup("", models.Model)
+
+
+def _reference_participants(rnd):
+    compounds = [f"CHEBI:{i}" for i in range(6)]
+    coefficients = [1, 2, 0.5, "n", "2n", "x"]
+    return [
+        {"reference_compound_bigg_id": x, "coefficient": rnd.choice(coefficients)}
+        for x in rnd.sample(compounds, rnd.randint(1, 4))
+    ]
+
+
+def test_reference_reaction_matcher():
+    rnd = random.Random(1)
+    reactions = [_reference_participants(rnd) for _ in range(300)]
+    hashes = {}
+    for i, participants in enumerate(reactions):
+        hash_str = models.ReferenceReaction.generate_hash(participants)
+        hashes.setdefault(hash_str, []).append(f"RR{i}")
+    matcher = ReferenceReactionMatcher(hashes.items())
+
+    patterns = [
+        models.ReferenceReaction.generate_hash(x, pattern=True)
+        for x in reactions[:50] + [_reference_participants(rnd) for _ in range(50)]
+    ]
+    # Not generated by generate_hash, so evaluated against all hashes.
+    patterns.append(r"^.*\$CHEBI:1(/.*)?$")
+    for pattern in patterns:
+        expected = sorted(
+            bigg_id
+            for hash_str, bigg_ids in hashes.items()
+            if re.match(pattern, hash_str)
+            for bigg_id in bigg_ids
+        )
+        assert matcher.match(pattern) == expected
+    assert "RR0" in matcher.match(patterns[0])
+    assert len(matcher.match(patterns[-1])) > 1
+
+
+def test_match_reference(tmp_path):
+    participants = [
+        {"reference_compound_bigg_id": "CHEBI:1", "coefficient": 1},
+        {"reference_compound_bigg_id": "CHEBI:2", "coefficient": "n"},
+    ]
+    with ReactionIndex(str(tmp_path / "reactions.sqlite")) as index:
+        index.add(
+            [
+                {
+                    "id": 1,
+                    "bigg_id": "RR1",
+                    "hash": models.ReferenceReaction.generate_hash(participants),
+                },
+                {"id": 2, "bigg_id": "RR2", "hash": "1$CHEBI:1/2$CHEBI:2"},
+                {"id": 3, "bigg_id": "RR3", "hash": "1$CHEBI:1/1$CHEBI:3"},
+            ],
+            models.ReferenceReaction,
+        )
+        assert index.match_reference(participants) == ["RR1"]
+        participants[1]["coefficient"] = 2
+        assert index.match_reference(participants) == ["RR1", "RR2"]
@@ -0,0 +1,125 @@
+import pytest
+
+from biggr import client, models, objects
+from biggr.replica import Replica
+
+
+def _datetime(iso):
+    return {"_type": "datetime", "iso": iso}
+
+
+@pytest.fixture
+def reactions(api):
+    api.add("UniversalReaction", id=300, bigg_id="PGI", name="Glucose isomerase")
+    api.add(
+        "Reaction",
+        id=200,
+        bigg_id="PGI",
+        hash="-1$g6p_c/1$f6p_c",
+        copy_number=1,
+        universal_reaction_id=300,
+    )
+    return api
+
+
+def test_embedded_object_is_requested_again(reactions, tmp_path):
+    replica = Replica(str(tmp_path / "replica.sqlite"), fallback=reactions)
+    # The reaction is only embedded, without its universal_reaction_id.
+    replica.load(
+        {
+            "_type": "ModelReaction",
+            "id": 10,
+            "bigg_id": "PGI",
+            "reaction_id": 200,
+            "reaction": {"_type": "Reaction", "id": 200, "bigg_id": "PGI"},
+        }
+    )
+    client.set_client(replica)
+
+    reaction = objects.get("Reaction", 200)
+    assert reaction.universal_reaction_id == 300
+    assert reaction.universal_reaction.bigg_id == "PGI"
+    assert {"type": "Reaction", "id": 200} in reactions.requests
+
+    # The complete object is stored now.
+    models.set_identity_map()
+    n_requests = len(reactions.requests)
+    assert objects.get("Reaction", 200).universal_reaction_id == 300
+    assert len(reactions.requests) == n_requests
+
+
+def test_null_columns_of_full_objects_are_answered_locally(reactions, tmp_path):
+    replica = Replica(str(tmp_path / "replica.sqlite"), fallback=reactions)
+    replica.load({"_type": "Reaction", "id": 201, "bigg_id": "EX", "hash": ""})
+    client.set_client(replica)
+
+    reaction = objects.get("Reaction", 201)
+    assert reaction.universal_reaction_id is None
+    assert reaction.universal_reaction is None
+    assert reactions.requests == []
+
+
+def test_unloaded_columns_are_not_set_without_fallback(api, tmp_path):
+    replica = Replica(str(tmp_path / "replica.sqlite"))
+    replica.load(
+        {
+            "_type": "Model",
+            "id": 1,
+            "bigg_id": "iTEST",
+            "model_reactions": [
+                {"_type": "ModelReaction", "id": 10, "bigg_id": "PGI", "model_id": 1}
+            ],
+        }
+    )
+    client.set_client(replica)
+
+    model_reaction = objects.get("ModelReaction", 10)
+    assert model_reaction.model_id == 1
+    assert models._loaded_value(model_reaction, "copy_number") is (
+        models.PropertyNotLoaded
+    )
+    model = objects.get("Model", 1)
+    assert models._loaded_value(model, "published_filename") is None
+
+
+def test_request_without_cache_uses_fallback(reactions, tmp_path):
+    replica = Replica(str(tmp_path / "replica.sqlite"), fallback=reactions)
+    data = {"type": "Reaction", "id": 200}
+    replica.request(objects.OBJECTS_API_URL, data)
+    assert reactions.requests == [data]
+
+    result = replica.request(objects.OBJECTS_API_URL, data)
+    assert result["object"]["universal_reaction_id"] == 300
+    assert len(reactions.requests) == 1
+
+    replica.request(objects.OBJECTS_API_URL, data, use_cache=False)
+    assert len(reactions.requests) == 2
+
+
+def test_sync_keeps_store_fallback(api, tmp_path, monkeypatch):
+    replica = Replica(str(tmp_path / "replica.sqlite"), fallback=api)
+    replica.load(
+        {
+            "_type": "Model",
+            "id": 1,
+            "bigg_id": "iTEST",
+            "date_modified": _datetime("2026-01-01T00:00:00+00:00"),
+        }
+    )
+    api.add(
+        "Model",
+        id=1,
+        bigg_id="iTEST",
+        date_modified=_datetime("2026-02-01T00:00:00+00:00"),
+    )
+    seen = []
+    post = api.post
+
+    def recording_post(api_url, data, stream=False):
+        seen.append(replica.store_fallback)
+        return post(api_url, data, stream)
+
+    monkeypatch.setattr(api, "post", recording_post)
+    assert replica.sync() == {"iTEST": "updated"}
+    assert seen and all(seen)
+    assert replica.store_fallback
@@ -0,0 +1,35 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from biggr import objects
+from biggr.identity_map import create_identity_map
+from biggr.models import Model
+
+
+def test_sequential_gets_make_one_request(api):
+    api.add("Model", id=1, bigg_id="iTEST")
+    model = objects.get("Model", 1)
+    assert objects.get(Model, 1) is model
+    assert api.request_count == 1
+
+
+def test_concurrent_gets_make_one_request(api):
+    api.add("Model", id=1, bigg_id="iTEST")
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: objects.get("Model", 1), range(32)))
+    assert all(x is results[0] for x in results)
+    assert api.request_count == 1
+
+
+def test_identity_map_counters_are_thread_safe(api):
+    for policy in ("unbounded", "weak", "lru"):
+        identity_map = create_identity_map(policy)
+        obj = Model(id=1)
+        identity_map[(Model, 1)] = obj
+
+        def _lookups(_):
+            for i in range(2000):
+                identity_map.get((Model, i % 2))
+
+        with ThreadPoolExecutor(4) as executor:
+            list(executor.map(_lookups, range(4)))
+        assert identity_map.hits == identity_map.misses == 4000
@@ -0,0 +1,98 @@
+import itertools
+
+import pytest
+
+from biggr.taxonomy import TaxonomyTree
+
+RANKS = ["no rank", "superkingdom", "phylum", "family", "genus", "species"]
+
+# (ID, parent ID, name, rank); 1 is its own parent, like the NCBI root, and 99 is
+# not connected to it.
+TAXA = [
+    (1, 1, "root", "no rank"),
+    (2, 1, "Bacteria", "superkingdom"),
+    (1224, 2, "Pseudomonadota", "phylum"),
+    (543, 1224, "Enterobacteriaceae", "family"),
+    (561, 543, "Escherichia", "genus"),
+    (562, 561, "Escherichia coli", "species"),
+    (590, 543, "Salmonella", "genus"),
+    (28901, 590, "Salmonella enterica", "species"),
+    (1239, 2, "Bacillota", "phylum"),
+    (1386, 1239, "Bacillus", "genus"),
+    (2157, 1, "Archaea", "superkingdom"),
+    (99, None, "unclassified", "no rank"),
+]
+LEAVES = [562, 28901, 1386, 99]
+
+
+@pytest.fixture
+def taxa(api):
+    for i, name in enumerate(RANKS, start=1):
+        api.add("TaxonomicRank", id=i, name=name)
+    for taxon_id, parent_id, name, rank in TAXA:
+        api.add(
+            "Taxon",
+            id=taxon_id,
+            parent_id=parent_id,
+            name=name,
+            rank_id=RANKS.index(rank) + 1,
+        )
+    return api
+
+
+def _lca(tree, a, b):
+    lineage_b = tree.lineage(b)
+    return next((x for x in tree.lineage(a) if x in lineage_b), None)
+
+
+def test_load(taxa):
+    tree = TaxonomyTree.load(LEAVES)
+    # One request per level of the lineages, and one for the ranks.
+    assert taxa.request_count == 5
+    assert len(tree) == 11
+    assert 2157 not in tree
+    assert tree.lineage(562) == [562, 561, 543, 1224, 2, 1]
+    assert tree.parent(1) is None
+    assert tree.parent(562) == 561
+    assert tree.name(543) == "Enterobacteriaceae"
+    assert tree.rank(543) == "family"
+    assert tree.depth(1) == 0
+    assert tree.depth(28901) == 5
+
+
+def test_queries():
+    tree = TaxonomyTree(TAXA)
+    assert tree.lca(562, 28901) == 543
+    assert tree.lca(562, 1386) == 2
+    assert tree.lca(562, 2157) == 1
+    assert tree.lca(562, 561) == 561
+    assert tree.lca(562, 562) == 562
+    assert tree.lca(562, 99) is None
+    for a, b in itertools.product([x[0] for x in TAXA], repeat=2):
+        assert tree.lca(a, b) == _lca(tree, a, b)
+        assert tree.is_descendant(a, b) == (b in tree.lineage(a))
+
+    assert tree.ancestor_at_rank(562, "family") == 543
+    assert tree.ancestor_at_rank(28901, "Family") == 543
+    assert tree.ancestor_at_rank(543, "family") == 543
+    assert tree.ancestor_at_rank(1386, "family") is None
+    assert tree.ancestor_at_rank(1386, "phylum") == 1239
+    assert tree.ancestor_at_rank(2, "genus") is None
+    with pytest.raises(KeyError):
+        tree.lca(562, 12345)
+
+
+def test_save(tmp_path):
+    tree = TaxonomyTree(TAXA)
+    path = str(tmp_path / "taxonomy" / "tree.json")
+    tree.save(path)
+    loaded = TaxonomyTree.from_file(path)
+    for taxon_id, _, name, rank in TAXA:
+        assert loaded.lineage(taxon_id) == tree.lineage(taxon_id)
+        assert (loaded.name(taxon_id), loaded.rank(taxon_id)) == (name, rank)
+    assert loaded.lca(562, 1386) == 2
+
+
+def test_cycle():
+    with pytest.raises(ValueError):
+        TaxonomyTree([(1, 2, "a", None), (2, 1, "b", None)])